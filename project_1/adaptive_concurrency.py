@@ -0,0 +1,166 @@
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Optional
+from urllib.parse import urlparse
+
+from metrics import SCRAPER_CONCURRENCY_LIMIT, SCRAPER_IN_FLIGHT, SCRAPE_OUTCOMES
+
+logger = logging.getLogger(__name__)
+
+'''--- Adaptive Concurrency Controller ---
+Replaces the fixed semaphore and random sleeps of the detail crawl with a per-host AIMD controller.
+Every finished page reports an outcome ('ok', 'error' or 'blocked') and its latency:
+  - a run of successes at healthy latency raises the in-flight limit by one page per `limit` successes
+  - an error rate above the threshold, or latency well above the best observed, halves the limit
+  - a block signal (captcha page or missing h1.propertyName) halves the limit, doubles the
+    spacing between navigations and pauses the host for a cool-down
+The limit and the spacing always stay within the host's politeness bounds.
+'''
+
+
+class HostBounds:
+    """Politeness bounds for one host."""
+
+    def __init__(self, min_in_flight: int = 1, max_in_flight: int = 10,
+                 min_interval: float = 0.5, max_interval: float = 10.0, initial_in_flight: int = 3):
+        self.min_in_flight = min_in_flight
+        self.max_in_flight = max_in_flight
+        self.min_interval = min_interval  # Minimum seconds between two navigations to the host
+        self.max_interval = max_interval
+        self.initial_in_flight = max(min_in_flight, min(initial_in_flight, max_in_flight))
+
+
+class HostController:
+    """AIMD in-flight limit and navigation spacing for a single host."""
+
+    def __init__(self, host: str, bounds: HostBounds, window: int = 20, error_threshold: float = 0.2,
+                 latency_tolerance: float = 2.0, block_cooldown: float = 30.0, decrease_cooldown: float = 5.0):
+        self.host = host
+        self.bounds = bounds
+        self.limit = float(bounds.initial_in_flight)
+        self.interval = bounds.min_interval
+        self.error_threshold = error_threshold
+        self.latency_tolerance = latency_tolerance
+        self.block_cooldown = block_cooldown
+        self.decrease_cooldown = decrease_cooldown
+
+        self.in_flight = 0
+        self.outcomes = deque(maxlen=window)
+        self.latency_ewma: Optional[float] = None
+        self.best_latency: Optional[float] = None
+        self._next_start = 0.0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+        self._publish()
+
+    def _publish(self):
+        SCRAPER_CONCURRENCY_LIMIT.labels(host=self.host).set(int(self.limit))
+        SCRAPER_IN_FLIGHT.labels(host=self.host).set(self.in_flight)
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        async with self._condition:
+            while True:
+                now = loop.time()
+                start_at = max(self._next_start, self._paused_until)
+                if self.in_flight < int(self.limit) and now >= start_at:
+                    break
+                # Wake up on release/limit changes, or when the spacing/cool-down has elapsed
+                timeout = start_at - now if self.in_flight < int(self.limit) else None
+                try:
+                    await asyncio.wait_for(self._condition.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+            self.in_flight += 1
+            # Jitter the spacing so navigations don't arrive on a fixed beat
+            self._next_start = now + self.interval * random.uniform(0.5, 1.5)
+            self._publish()
+
+    async def release(self):
+        async with self._condition:
+            self.in_flight -= 1
+            self._publish()
+            self._condition.notify_all()
+
+    def _decrease(self, reason: str):
+        now = time.monotonic()
+        # Back off at most once per cool-down so one burst of failures doesn't collapse the limit to the minimum
+        if now - self._last_decrease < self.decrease_cooldown:
+            return
+        self._last_decrease = now
+        old_limit = self.limit
+        self.limit = max(float(self.bounds.min_in_flight), self.limit / 2)
+        self.outcomes.clear()
+        logger.warning(f"[{self.host}] {reason}: in-flight limit {int(old_limit)} -> {int(self.limit)}")
+
+    async def record(self, outcome: str, latency: Optional[float] = None):
+        SCRAPE_OUTCOMES.labels(host=self.host, outcome=outcome).inc()
+        self.outcomes.append(outcome)
+
+        if latency is not None and outcome == 'ok':
+            self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+            self.best_latency = latency if self.best_latency is None else min(self.best_latency, self.latency_ewma)
+
+        if outcome == 'blocked':
+            self._last_decrease = 0.0  # A block always backs off
+            self._decrease("Block signal")
+            self.interval = min(self.bounds.max_interval, max(self.interval, 0.5) * 2)
+            self._paused_until = asyncio.get_running_loop().time() + self.block_cooldown
+            logger.warning(f"[{self.host}] Pausing {self.block_cooldown:.0f}s, navigation spacing now {self.interval:.1f}s")
+        elif self.outcomes.count('error') / len(self.outcomes) > self.error_threshold and len(self.outcomes) >= 5:
+            self._decrease(f"Error rate {self.outcomes.count('error')}/{len(self.outcomes)}")
+        elif (self.latency_ewma and self.best_latency
+              and self.latency_ewma > self.best_latency * self.latency_tolerance):
+            self._decrease(f"Latency {self.latency_ewma:.1f}s vs best {self.best_latency:.1f}s")
+        elif outcome == 'ok':
+            # Additive increase: roughly +1 page per `limit` healthy completions, and relax the spacing
+            self.limit = min(float(self.bounds.max_in_flight), self.limit + 1 / self.limit)
+            self.interval = max(self.bounds.min_interval, self.interval * 0.95)
+
+        async with self._condition:
+            self._publish()
+            self._condition.notify_all()
+
+
+class AdaptiveScheduler:
+    """Hands out per-host slots; hosts without explicit bounds use the default bounds."""
+
+    def __init__(self, default_bounds: HostBounds = None, host_bounds: dict[str, HostBounds] = None, **controller_kwargs):
+        self.default_bounds = default_bounds or HostBounds()
+        self.host_bounds = host_bounds or {}
+        self.controller_kwargs = controller_kwargs
+        self.controllers: dict[str, HostController] = {}
+
+    def controller_for(self, url: str) -> HostController:
+        host = urlparse(url).hostname or ''
+        if host not in self.controllers:
+            bounds = self.host_bounds.get(host, self.default_bounds)
+            self.controllers[host] = HostController(host, bounds, **self.controller_kwargs)
+        return self.controllers[host]
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        """Waits for the host to allow another page and yields its controller for recording the outcome."""
+        controller = self.controller_for(url)
+        await controller.acquire()
+        try:
+            yield controller
+        finally:
+            await controller.release()
+
+
+def classify_outcome(result) -> str:
+    """Turns a finished scrape into a controller outcome."""
+    if not isinstance(result, dict):
+        return 'error'
+    if 'validation_status' not in result:
+        # Navigation errors are swallowed before the title is read; listings without unit cards return early
+        return 'error' if result.get('title') == 'N/A' else 'ok'
+    if result.get('title') == 'N/A':
+        return 'blocked'  # Captcha and interstitial pages have no h1.propertyName
+    return 'ok'
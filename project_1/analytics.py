@@ -0,0 +1,183 @@
+import time
+import heapq
+import logging
+from datetime import datetime
+from itertools import groupby
+from typing import Optional
+
+from sqlalchemy import insert, delete, func
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from dbmodels import Property, Pricing_and_floor_plans, Data_version, Rent_summary, Top_floor_plan
+from metrics import ANALYTICS_REFRESH_SECONDS
+
+logger = logging.getLogger(__name__)
+
+'''--- Analytics Summary ---
+Precomputed answers for the analytics routes, so a request reads at most TOP_K rows instead of sorting
+pricing_and_floor_plans:
+  - rent_summary: min/median/p90/max base_rent per (city, bedrooms)
+  - top_floor_plan: the TOP_K cheapest and most expensive floor plans, across all cities and per city
+refresh_analytics() rebuilds both from one ordered pass over the floor plans and swaps them in a single
+transaction, so readers see either the previous summary or the new one. The ingest entry points in db_ops,
+ingest_executor and bulk_load call it once per run; for an existing database run it by hand:
+
+    python analytics.py
+'''
+
+# Floor plans kept per ranking and scope; the upper bound of /top/{x} and /analytics/city/{city}/top
+TOP_K = 100
+RANKINGS = ('cheapest', 'most_expensive')
+# top_floor_plan.city_key of the rankings across all cities
+ALL_CITIES = ''
+# Data_version row counting the refreshes; 0 means the summary was never built
+ANALYTICS_VERSION = 'analytics'
+REFRESH_YIELD_PER = 5000
+
+
+def city_key(city: Optional[str]) -> Optional[str]:
+    """The normalised city the summary tables are keyed by."""
+    return city.strip().lower() if city and city.strip() else None
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Linear-interpolated percentile of ascending values, the same as PostgreSQL's percentile_cont."""
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+class TopK:
+    """The k rows with the smallest rank keys seen so far, in a bounded heap."""
+
+    def __init__(self, k: int = TOP_K):
+        self.k = k
+        self._heap = []
+
+    def push(self, key: tuple, row: dict):
+        # Negated keys make the heap's root the worst row kept, the one to drop next
+        entry = (tuple(-part for part in key), row)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry[0] > self._heap[0][0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def ranked(self) -> list[dict]:
+        return [row for _, row in sorted(self._heap, key=lambda entry: entry[0], reverse=True)]
+
+
+def rank_keys(row: dict) -> dict:
+    """Rank key per ranking, smaller first; ties go to the lower floor plan id."""
+    return {'cheapest': (row['base_rent'], row['floor_plan_id']),
+            'most_expensive': (-row['base_rent'], row['floor_plan_id'])}
+
+
+def floor_plans_statement():
+    """Every priced floor plan with its property's city, grouped by (city, bedrooms) and ascending in rent."""
+    key = func.lower(func.trim(Property.city))
+    return (
+        select(Pricing_and_floor_plans.id.label('floor_plan_id'), Pricing_and_floor_plans.property_id,
+               Pricing_and_floor_plans.bedrooms, Pricing_and_floor_plans.base_rent, Property.city)
+        .join(Property)
+        .where(Pricing_and_floor_plans.base_rent.is_not(None))
+        .order_by(key, Pricing_and_floor_plans.bedrooms, Pricing_and_floor_plans.base_rent)
+        .execution_options(yield_per=REFRESH_YIELD_PER)
+    )
+
+
+async def build_analytics(session: AsyncSession) -> tuple[list[dict], list[dict]]:
+    """Streams the floor plans once; returns the rent_summary and top_floor_plan rows."""
+    refreshed_at = datetime.utcnow()
+    summaries = []
+    tops = {}  # (city_key, ranking) -> TopK
+
+    def group_key(row):
+        return city_key(row['city']), row['bedrooms']
+
+    def add_to_tops(scope: str, row: dict):
+        for ranking, key in rank_keys(row).items():
+            tops.setdefault((scope, ranking), TopK()).push(key, row)
+
+    result = await session.stream(floor_plans_statement())
+    # Groups are small next to the table: only one (city, bedrooms) group's rents are held at a time
+    rows = []
+    async for row in result.mappings():
+        rows.append(dict(row))
+        if len(rows) >= REFRESH_YIELD_PER:
+            # Flush every complete group; the last one may continue in the next rows
+            last_key = group_key(rows[-1])
+            complete = [row for row in rows if group_key(row) != last_key]
+            rows = rows[len(complete):]
+            summaries.extend(summarise(complete, refreshed_at, add_to_tops))
+    summaries.extend(summarise(rows, refreshed_at, add_to_tops))
+
+    top_rows = [
+        {'city_key': scope, 'ranking': ranking, 'rank': rank, 'floor_plan_id': row['floor_plan_id'],
+         'property_id': row['property_id'], 'bedrooms': row['bedrooms'], 'base_rent': row['base_rent']}
+        for (scope, ranking), top in tops.items()
+        for rank, row in enumerate(top.ranked(), start=1)
+    ]
+    return summaries, top_rows
+
+
+def summarise(rows: list[dict], refreshed_at: datetime, add_to_tops) -> list[dict]:
+    """rent_summary rows of complete (city, bedrooms) groups, feeding every row to the top-K rankings."""
+    summaries = []
+    for (key, bedrooms), group in groupby(rows, key=lambda row: (city_key(row['city']), row['bedrooms'])):
+        group = list(group)
+        for row in group:
+            add_to_tops(ALL_CITIES, row)
+            if key:
+                add_to_tops(key, row)
+        if not key:
+            continue
+        rents = [row['base_rent'] for row in group]
+        summaries.append({
+            'city_key': key, 'city': group[0]['city'].strip(), 'bedrooms': bedrooms, 'floor_plans': len(rents),
+            'min_rent': rents[0], 'median_rent': percentile(rents, 0.5), 'p90_rent': percentile(rents, 0.9),
+            'max_rent': rents[-1], 'refreshed_at': refreshed_at,
+        })
+    return summaries
+
+
+async def refresh_analytics(session: AsyncSession) -> dict:
+    """Rebuilds rent_summary and top_floor_plan and commits them together with the refresh count."""
+    started = time.perf_counter()
+    # Locking the version row first serialises concurrent refreshes (on PostgreSQL; SQLite has one writer anyway)
+    version = (await session.exec(
+        select(Data_version).where(Data_version.name == ANALYTICS_VERSION).with_for_update())).first()
+    if version is None:
+        version = Data_version(name=ANALYTICS_VERSION, version=0)
+        session.add(version)
+
+    summaries, top_rows = await build_analytics(session)
+    await session.exec(delete(Rent_summary))
+    await session.exec(delete(Top_floor_plan))
+    if summaries:
+        await session.exec(insert(Rent_summary.__table__), params=summaries)
+    if top_rows:
+        await session.exec(insert(Top_floor_plan.__table__), params=top_rows)
+    version.version += 1
+    version.updated_at = datetime.utcnow()
+    await session.commit()
+
+    elapsed = time.perf_counter() - started
+    ANALYTICS_REFRESH_SECONDS.observe(elapsed)
+    logger.info(f"Analytics refreshed: {len(summaries)} rent summaries, {len(top_rows)} ranked floor plans "
+                f"in {elapsed:.2f}s")
+    return {'rent_summaries': len(summaries), 'ranked_floor_plans': len(top_rows), 'seconds': elapsed}
+
+
+if __name__ == '__main__':
+    import asyncio
+    from db_ops import create_db_and_tables, refresh_analytics_summary
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    async def main():
+        await create_db_and_tables()
+        await refresh_analytics_summary()
+
+    asyncio.run(main())
@@ -4,14 +4,30 @@ import sys
 import time
 import logging
 import json
-from playwright.async_api import async_playwright, Page, Error as PlaywrightError
+import re
+from typing import Optional
+from functools import partial
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor
+from playwright.async_api import async_playwright, Page, Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
 from tenacity import retry, wait_fixed, stop_after_attempt, retry_if_exception_type
 import psutil
 from metrics import (
     SCRAPER_SUCCESS, SCRAPER_FAILURES, LISTINGS_SCRAPED,
     SCRAPE_DURATION, VALIDATION_FAILURES, DUPLICATE_RECORDS,
-    DB_INSERT_FAILURES, RETRIES_ATTEMPTED, MEMORY_USAGE, CPU_USAGE, VALIDATION_SUCCESS
+    DB_INSERT_FAILURES, RETRIES_ATTEMPTED, MEMORY_USAGE, CPU_USAGE, VALIDATION_SUCCESS,
+    INCREMENTAL_DECISIONS
 )
+from scraper_selectors import (
+    PROPERTY_SELECTORS, SEARCH_CARD_SELECTORS, UNIT_CARD_LIMIT, empty_property_record, empty_unit_record
+)
+from html_extractor import extract_property_from_html, save_html_snapshot
+from browser_pool import BrowserContextPool, DEFAULT_BLOCKED_RESOURCE_TYPES, DEFAULT_BLOCKED_DOMAINS
+from run_journal import RunJournal, DEFAULT_JOURNAL_PATH
+from adaptive_concurrency import AdaptiveScheduler, HostBounds, classify_outcome
+from listing_fingerprints import FingerprintStore, DEFAULT_FINGERPRINT_DB_PATH
+from response_cache import ResponseCache, DEFAULT_CACHE_DIR, DEFAULT_TTL_DAYS, attach_recorder, attach_replay
+from dump_loader import NdjsonWriter
 # Configure logging for structured output
 #define the log file
 LOG_FILE_PATH= 'DataExtraction.log'
@@ -83,6 +99,190 @@ async def safe_get_attribute(locator, attribute: str) -> str:
     return "N/A"
 
 
+# --- Bulk Unit Card Extraction ---
+# Reading every unit card field through its own locator costs a count() plus a read per field,
+# so a listing with 30 cards needs hundreds of Playwright round-trips. When enabled (--bulk-unit-extraction),
+# all cards are read in one in-page evaluation instead. The output matches the per-field path:
+# missing element -> 'N/A', element present but empty -> None (tests/test_unit_card_extraction.py).
+USE_BULK_UNIT_EXTRACTION = False
+
+UNIT_CARDS_EXTRACTION_JS = """
+(cards, args) => {
+    const { selectors, limit } = args;
+    const innerText = (card, selector) => {
+        const el = card.querySelector(selector);
+        if (!el) return "N/A";
+        const text = (el.innerText || "").trim();
+        return text ? text : null;
+    };
+    const attribute = (card, name) => {
+        if (!card.hasAttribute(name)) return "N/A";
+        const value = (card.getAttribute(name) || "").trim();
+        return value ? value : null;
+    };
+    return cards.slice(0, limit).map((card) => {
+        let sqft = innerText(card, selectors.sqft_col);
+        if (sqft === "N/A") {
+            for (const span of card.querySelectorAll(selectors.details_sqft_text)) {
+                const text = (span.innerText || "").trim();
+                if (text.includes("Sq Ft")) {
+                    sqft = text.replace("Sq Ft", "").trim();
+                    break;
+                }
+            }
+        }
+        return {
+            apartment_name: innerText(card, selectors.apartment_name),
+            rent_price_range: innerText(card, selectors.rent_price_range),
+            bedrooms: attribute(card, selectors.bedrooms_attr),
+            bathrooms: attribute(card, selectors.bathrooms_attr),
+            sqft: sqft,
+            unit: innerText(card, selectors.unit),
+            base_rent: innerText(card, selectors.base_rent),
+            availability: innerText(card, selectors.availability),
+            details_link: attribute(card, selectors.details_link_attr),
+        };
+    });
+}
+"""
+
+
+async def extract_unit_cards_bulk(page: Page, selectors: dict, limit: int) -> list[dict]:
+    """
+    Extracts up to `limit` unit cards in a single in-page evaluation.
+    Returns one dict per card with the same keys and 'N/A' semantics as the per-field extraction.
+    """
+    unit_cards = await page.locator(selectors['unit_cards']).evaluate_all(
+        UNIT_CARDS_EXTRACTION_JS, {'selectors': selectors, 'limit': limit}
+    )
+    for unit_pricing_data in unit_cards:
+        # Same clean-up as the per-field path: keep only the last line of the availability text
+        availability_raw = unit_pricing_data['availability'] or 'N/A'
+        cleaned_availability = availability_raw.split('\n')[-1]
+        unit_pricing_data['availability'] = cleaned_availability.strip() if cleaned_availability else 'N/A'
+    return unit_cards
+
+
+# --- Browser Context Pool ---
+# When enabled, detail pages are crawled through CONTEXT_POOL_SIZE contexts that reuse their page,
+# rotate the User-Agent per context and abort images, media, fonts and third-party trackers.
+USE_CONTEXT_POOL = True
+CONTEXT_POOL_SIZE = 10
+BLOCKED_RESOURCE_TYPES = DEFAULT_BLOCKED_RESOURCE_TYPES
+BLOCKED_DOMAINS = DEFAULT_BLOCKED_DOMAINS
+
+
+# --- Adaptive Concurrency ---
+# When enabled (--adaptive), an AIMD controller replaces the fixed semaphore and the fixed post-navigation sleeps.
+# It adapts in-flight pages and navigation spacing to latency, errors and block signals within these bounds.
+# Replays always use it, with REPLAY_HOST_BOUNDS.
+USE_ADAPTIVE_CONCURRENCY = False
+HOST_BOUNDS = {
+    'www.apartments.com': HostBounds(min_in_flight=1, max_in_flight=CONTEXT_POOL_SIZE, min_interval=0.5,
+                                     max_interval=15.0, initial_in_flight=3),
+}
+
+
+# --- Markets ---
+DEFAULT_MARKET_URL = 'https://www.apartments.com/boston-ma/'
+OUTPUT_PATH = 'apartments_data2.json'
+CRASH_OUTPUT_PATH = 'apartments_data.json'
+# 'json' dumps one indented array when the run ends. 'ndjson' appends each listing to the output file
+# as it finishes (one JSON object per line), so nothing is lost on a crash; dump_loader.py reads both.
+OUTPUT_FORMAT = 'json'
+NDJSON_OUTPUT_PATH = 'apartments_data2.jsonl'
+
+
+# --- Incremental Re-scrape ---
+# When enabled, only detail pages that are new, whose search results card (price/beds) changed since
+# they were last scraped, or that were last scraped more than STALE_AFTER_DAYS ago are visited.
+INCREMENTAL_SCRAPE = False
+FINGERPRINT_DB_PATH = DEFAULT_FINGERPRINT_DB_PATH
+STALE_AFTER_DAYS = 7
+
+# Reads every property link on a search results page together with its card's price/beds summary
+LISTING_CARDS_EXTRACTION_JS = """
+(links, selectors) => links.map(link => {
+    const card = link.closest(selectors.card);
+    const text = (selector) => {
+        const el = card ? card.querySelector(selector) : null;
+        return el ? el.innerText.trim() : '';
+    };
+    return {href: link.getAttribute('href'), pricing: text(selectors.pricing), beds: text(selectors.beds)};
+})
+"""
+
+
+# --- Search Results Discovery ---
+# When enabled, the page count is read from page 1 and result pages 2..N are loaded directly by URL
+# on DISCOVERY_CONCURRENCY pages at once, instead of clicking through a.next one page at a time.
+PARALLEL_DISCOVERY = True
+DISCOVERY_CONCURRENCY = 4
+PAGE_RANGE_PATTERN = re.compile(r'of\s+(\d+)')
+
+
+# --- Response Cache ---
+# When enabled, every search results and detail page document is stored compressed in RESPONSE_CACHE_DIR.
+# Replay mode (--replay) serves pages from that cache instead of the network and blocks everything else.
+CACHE_RESPONSES = False
+RESPONSE_CACHE_DIR = DEFAULT_CACHE_DIR
+RESPONSE_CACHE_TTL_DAYS = DEFAULT_TTL_DAYS
+# Replay has no one to be polite to: run at full pool concurrency with no spacing or block cool-down
+REPLAY_HOST_BOUNDS = HostBounds(min_in_flight=CONTEXT_POOL_SIZE, max_in_flight=CONTEXT_POOL_SIZE,
+                                min_interval=0, max_interval=0, initial_in_flight=CONTEXT_POOL_SIZE)
+# Replays keep their own journal and output so they never resume or overwrite a live run
+REPLAY_JOURNAL_PATH = 'scrape_run.replay.journal.jsonl'
+REPLAY_OUTPUT_PATH = 'apartments_data_replay.json'
+
+
+# --- Run Journal ---
+# Frontier and finished listings are appended here as the run progresses so a crash can be resumed
+RUN_JOURNAL_PATH = DEFAULT_JOURNAL_PATH
+
+
+# --- Streaming Pipeline ---
+# Listings waiting for the database writer; when full, scraping pauses until a batch is committed
+STREAM_QUEUE_SIZE = 50
+STREAM_BATCH_SIZE = 25
+# Write each batch with set-based upserts instead of a round-trip per property (db_ops.save_batch_bulk)
+DB_BULK_INGEST = True
+# Concurrent writer tasks for saving a finished scrape (ingest_executor.py); 1 keeps the sequential writer
+DB_INGEST_WORKERS = 4
+
+
+# --- Extraction Backend ---
+# 'locator' reads every field through live Playwright locators.
+# 'html' only asks the browser for page.content() and parses the snapshot in a process pool
+# with html_extractor, off the event loop. Snapshots can optionally be kept for offline re-runs.
+# Chosen on the command line with --extraction-backend.
+EXTRACTION_BACKEND = 'locator'
+HTML_PARSE_WORKERS = 2
+HTML_SNAPSHOT_DIR = None  # e.g. 'snapshots' to store every fetched detail page
+
+_html_parse_pool = None
+
+
+def get_html_parse_pool() -> ProcessPoolExecutor:
+    """Lazily creates the process pool used by the 'html' extraction backend."""
+    global _html_parse_pool
+    if _html_parse_pool is None:
+        _html_parse_pool = ProcessPoolExecutor(max_workers=HTML_PARSE_WORKERS)
+    return _html_parse_pool
+
+
+def shutdown_html_parse_pool():
+    global _html_parse_pool
+    if _html_parse_pool is not None:
+        _html_parse_pool.shutdown()
+        _html_parse_pool = None
+
+
+async def extract_html_off_loop(html: str, url: str) -> dict:
+    """Parses a page snapshot in the worker pool so the event loop keeps driving the browser."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_html_parse_pool(), extract_property_from_html, html, url)
+
+
 # --- Retry Strategy for Page Navigation ---
 @retry(
     wait=wait_fixed(2),  # Wait 2 seconds between retries
@@ -103,12 +303,25 @@ async def scrap_page_with_different_structure(page:Page, url:str, existing_data:
 from prometheus_client import Counter, start_http_server
 #--------------------------------------------------------
 
-async def goto_with_retry(page: Page, url: str, timeout: int = 60000):
+# A detail page is ready for extraction once its title is in the DOM. The "load" event would also wait
+# for every image, script and tracker the context pool doesn't block.
+DETAIL_READY_SELECTOR = PROPERTY_SELECTORS['title']
+DETAIL_READY_TIMEOUT = 15000
+
+
+async def goto_with_retry(page: Page, url: str, timeout: int = 60000, ready_selector: str = DETAIL_READY_SELECTOR):
     """
     Attempts to navigate to a URL with retry logic for network errors or timeouts.
+    Returns once the DOM is parsed and ready_selector is attached.
     """
     logger.info(f"Attempting to go to: {url}")
-    await page.goto(url, timeout=timeout, wait_until="load")
+    await page.goto(url, timeout=timeout, wait_until="domcontentloaded")
+    if ready_selector:
+        try:
+            await page.wait_for_selector(ready_selector, state='attached', timeout=DETAIL_READY_TIMEOUT)
+        except PlaywrightTimeoutError:
+            # Other layouts and block pages have no title; scrape_apartment_page tells them apart
+            logger.warning(f"{ready_selector} not found on {url} within {DETAIL_READY_TIMEOUT} ms")
     logger.info(f"Successfully navigated to: {url}")
 
 
@@ -118,11 +331,12 @@ import logging
 from playwright.async_api import Page, TimeoutError
 
 
-async def scrape_all_pages(page: Page, main_url: str) -> list[str]:
+async def scrape_all_pages(page: Page, main_url: str, listing_cards: Optional[dict] = None) -> list[str]:
     """
     Navigates through all available pages, extracts all property links, and returns them.
     Includes robust retry logic, random delays, and handles pagination until no more pages are found.
     Ensures unique URLs are returned.
+    If a listing_cards dict is passed, it is filled with url -> {'pricing', 'beds'} from each link's card.
     """
     logger.info(f"Starting multi-page scraping from: {main_url}")
     property_urls_set = set()
@@ -146,19 +360,9 @@ async def scrape_all_pages(page: Page, main_url: str) -> list[str]:
             # Add a random delay to mimic human behavior and avoid bot detection.
             await page.wait_for_timeout(1000)
 
-            # Step 3: Extract links from the current page.
-            property_links_locators = page.locator('a.property-link')
-            count = await property_links_locators.count()
-            logger.info(f"Found {count} potential property links on page {current_page_number}.")
-
-
-            for i in range(count):
-                href = await property_links_locators.nth(i).get_attribute('href')
-                if href:
-                    # Ensure URLs are absolute.
-                    if not href.startswith('http'):
-                        href = page.url.rstrip('/') + '/' + href.lstrip('/')
-                    property_urls_set.add(href)
+            # Step 3: Extract links (and their card summaries) from the current page in one evaluation.
+            found = await extract_listing_links(page, property_urls_set, listing_cards)
+            logger.info(f"Found {found} potential property links on page {current_page_number}.")
 
             # Step 4: Check for the "next page" button and break the loop if it's not found.
 
@@ -184,55 +388,223 @@ async def scrape_all_pages(page: Page, main_url: str) -> list[str]:
     logger.info(f"Scraping complete. Extracted {len(property_urls)} unique property URLs.")
     return property_urls
 
-async def scrape_apartment_page(page: Page, url: str) -> dict:
+
+async def extract_listing_links(page: Page, property_urls_set: set, listing_cards: Optional[dict] = None) -> int:
+    """Adds every property link on a search results page to the set in one evaluation and returns how many were found."""
+    cards = await page.locator(SEARCH_CARD_SELECTORS['link']).evaluate_all(
+        LISTING_CARDS_EXTRACTION_JS, SEARCH_CARD_SELECTORS)
+    for card in cards:
+        href = card.pop('href')
+        if href:
+            # Ensure URLs are absolute.
+            if not href.startswith('http'):
+                href = page.url.rstrip('/') + '/' + href.lstrip('/')
+            property_urls_set.add(href)
+            if listing_cards is not None:
+                listing_cards[href] = card
+    return len(cards)
+
+
+async def read_page_count(page: Page) -> Optional[int]:
+    """Reads the total number of result pages from the "Page 1 of N" label, None if it is missing."""
+    page_range = page.locator(SEARCH_CARD_SELECTORS['page_range'])
+    if await page_range.count() == 0:
+        return None
+    match = PAGE_RANGE_PATTERN.search(await page_range.first.inner_text())
+    return int(match.group(1)) if match else None
+
+
+async def scrape_all_pages_parallel(page_context, main_url: str, listing_cards: Optional[dict] = None,
+                                    concurrency: int = DISCOVERY_CONCURRENCY, pace: bool = True) -> list[str]:
+    """
+    Same result as scrape_all_pages, but only page 1 is opened first: the page count is read from it and
+    the remaining result pages are loaded by URL ({main_url}{n}/) on `concurrency` pages at once.
+    With pace=False (replay) the pages are loaded back to back without the random delay.
+    Falls back to clicking through with scrape_all_pages if the page count cannot be read.
+    """
+    logger.info(f"Starting parallel multi-page discovery from: {main_url}")
+    property_urls_set = set()
+    first_page = await page_context.new_page()
+    try:
+        await first_page.goto(main_url, wait_until='domcontentloaded', timeout=60000)
+        await first_page.wait_for_selector(SEARCH_CARD_SELECTORS['link'], timeout=30000)
+        page_count = await read_page_count(first_page)
+        if page_count is None:
+            logger.warning("Could not read the page count, falling back to serial pagination.")
+            return await scrape_all_pages(first_page, main_url, listing_cards)
+        found = await extract_listing_links(first_page, property_urls_set, listing_cards)
+        logger.info(f"Found {found} potential property links on page 1 of {page_count}.")
+    except Exception as e:
+        logger.error(f"Error loading the first results page: {e}")
+        return list(property_urls_set)
+    finally:
+        await first_page.close()
+
+    page_numbers: asyncio.Queue = asyncio.Queue()
+    for page_number in range(2, page_count + 1):
+        page_numbers.put_nowait(page_number)
+    failed_pages = []
+
+    async def discovery_worker():
+        page = await page_context.new_page()
+        try:
+            while not page_numbers.empty():
+                page_number = page_numbers.get_nowait()
+                page_url = f"{main_url.rstrip('/')}/{page_number}/"
+                try:
+                    await page.goto(page_url, wait_until='domcontentloaded', timeout=60000)
+                    await page.wait_for_selector(SEARCH_CARD_SELECTORS['link'], timeout=30000)
+                    found = await extract_listing_links(page, property_urls_set, listing_cards)
+                    logger.info(f"Found {found} potential property links on page {page_number} of {page_count}.")
+                except Exception as e:
+                    logger.error(f"Error scraping results page {page_url}: {e}")
+                    failed_pages.append(page_number)
+                if pace:
+                    await add_random_delay(0.5, 1.5)  # Keep each discovery page from hitting the site back to back
+        finally:
+            await page.close()
+
+    await asyncio.gather(*(discovery_worker() for _ in range(min(concurrency, page_count - 1))))
+    if failed_pages:
+        logger.warning(f"{len(failed_pages)} results pages could not be read: {sorted(failed_pages)}")
+
+    property_urls = list(property_urls_set)
+    logger.info(f"Discovery complete. Extracted {len(property_urls)} unique property URLs from {page_count} pages.")
+    return property_urls
+
+
+async def extract_with_locators(page: Page, url: str, data: dict, selectors: dict = PROPERTY_SELECTORS) -> dict:
+    """
+    Fills `data` from a loaded standard detail page by reading each field through live Playwright locators.
+    """
+    # Wait for floor plan sections to load
+    #await page.wait_for_selector('div.pricingGridItem', timeout=60000)  # Ensure floor plan container is loaded
+    #await page.wait_for_selector('li.unitContainer', timeout=60000)  # Ensure at least one unit container is present
+
+    # --- Extract Main Property Details ---
+    data['title'] = await safe_inner_text(page.locator(selectors['title']).first)
+
+
+    # Extract and parse address components more robustly
+    data['street'] = await safe_inner_text(page.locator(selectors['street_address']).first)
+
+    data['state'] = await safe_inner_text(
+        page.locator(selectors['state_zip_container']).locator('span').nth(0))  # First span in stateZipContainer
+    data['zip_code'] = await safe_inner_text(
+        page.locator(selectors['state_zip_container']).locator('span').nth(1))  # Second span in stateZipContainer
+    state_zip_locator = page.locator(selectors['state_zip_container'])
+    city_name_raw_handle = await state_zip_locator.evaluate_handle(
+        '(element) => element.previousSibling.textContent'
+    )
+    city_name = await city_name_raw_handle.json_value()
+    data['city'] = await safe_inner_text(page.locator(selectors['city_span']).first)
+
+
+    # Reconstruct full address for consistency
+    data['address'] = f"{data['street']}, {data['city']}, {data['state']} {data['zip_code']}"
+    # Clean up "N/A" components if any
+    data['address'] = ", ".join(filter(lambda x: x != 'N/A', data['address'].split(', '))).strip()
+
+    data['property_reviews'] = await safe_inner_text(page.locator(selectors['property_reviews']).first)
+    data['listing_verification'] = await safe_inner_text(page.locator(selectors['listing_verification']).first)
+
+    # Extract Lease Options
+    lease_options = []
+    lease_options_container = page.locator(selectors['lease_options_container'])
+    if await lease_options_container.count() > 0:
+        lease_option_elements = lease_options_container.locator('.component-list .column')
+        for i in range(await lease_option_elements.count()):
+            option = await safe_inner_text(lease_option_elements.nth(i))
+            if option != "N/A":
+                lease_options.append(option)
+    data['lease_options'] = lease_options if lease_options else 'N/A'
+
+    # Extract Year Built
+    year_built_locator = page.locator(selectors['year_built_container'])
+    year_built_text = await safe_inner_text(year_built_locator)
+    year_built = 'N/A'
+    if "Built in" in year_built_text:
+        try:
+            # Extract year using regex for robustness if needed, or simple split
+            year_built = year_built_text.split('Built in ')[-1].split(' ')[0].strip()
+        except IndexError:
+            logging.warning(f"Could not parse year built from '{year_built_text}' for {url}")
+    data['year_built'] = year_built
+
+    # --- Extract Pricing and Floor Plans ---
+    all_units_data = []
+    unit_cards_locators = page.locator(selectors['unit_cards'])
+    unit_cards_count = await unit_cards_locators.count()
+
+
+    # Limit floor plans to a manageable number (e.g., 5) for efficiency and anti-bot.
+    # Adjust '5' to any number you need. For testing, starting with 1 or 2 is good.
+    limit_floor_plans = min(unit_cards_count, UNIT_CARD_LIMIT)  # Limit to 30 for performance, adjust as needed
+    if limit_floor_plans <= 0:
+        logger.warning(f"No unit cards found for {url}. Skipping pricing and floor plans extraction.")
+        data['pricing_and_floor_plans'] = []
+        return data
+    logger.info(f"Found {unit_cards_count} pricing and floor plans for {url}. Limiting to {limit_floor_plans}.")
+
+    if USE_BULK_UNIT_EXTRACTION:
+        # One in-page evaluation for all cards instead of ~9 round-trips per card
+        all_units_data = await extract_unit_cards_bulk(page, selectors, limit_floor_plans)
+    else:
+        floor_plans=0
+        for i in range(limit_floor_plans):
+            floor_plans+=1
+            logger.info(f"Extracting unit card {i + 1}/{limit_floor_plans} for {url}")
+            unit_card = unit_cards_locators.nth(i)
+            unit_pricing_data = empty_unit_record()
+
+            try:
+                # Extract data relative to the current unit_card using safe helpers
+                unit_pricing_data['apartment_name'] = await safe_inner_text(
+                    unit_card.locator(selectors['apartment_name']))
+                unit_pricing_data['rent_price_range'] = await safe_inner_text(
+                    unit_card.locator(selectors['rent_price_range']))
+                unit_pricing_data['bedrooms'] = await safe_get_attribute(unit_card, selectors['bedrooms_attr'])
+                unit_pricing_data['bathrooms'] = await safe_get_attribute(unit_card, selectors['bathrooms_attr'])
+
+                # Robust SQFT extraction logic
+                sqft_val = await safe_inner_text(unit_card.locator(selectors['sqft_col']))
+                if sqft_val == "N/A":  # Fallback if direct column not found or empty
+                    details_spans = unit_card.locator(selectors['details_sqft_text'])
+                    for j in range(await details_spans.count()):
+                        text = await safe_inner_text(details_spans.nth(j))
+                        if "Sq Ft" in text:
+                            sqft_val = text.replace("Sq Ft", "").strip()
+                            break
+                unit_pricing_data['sqft'] = sqft_val
+
+                unit_pricing_data['unit'] = await safe_inner_text(unit_card.locator(selectors['unit']))
+                unit_pricing_data['base_rent'] = await safe_inner_text(unit_card.locator(selectors['base_rent']))
+                availability_raw = await safe_inner_text(unit_card.locator(selectors['availability']))
+                cleaned_availability = availability_raw.split('\n')[-1]
+                unit_pricing_data['availability'] = cleaned_availability.strip() if cleaned_availability else 'N/A'
+                unit_pricing_data['details_link'] = await safe_get_attribute(unit_card, selectors['details_link_attr'])
+
+                all_units_data.append(unit_pricing_data)
+
+            except Exception as inner_e:
+                logger.warning(f"Failed to scrape some unit details for {url}, unit {i}: {inner_e}")
+                all_units_data.append(unit_pricing_data)  # Append partial data even on inner error
+
+    data['pricing_and_floor_plans'] = all_units_data
+    return data
+
+
+async def scrape_apartment_page(page: Page, url: str, pace: bool = True) -> dict:
     """
     Visits each URL extracted from the main page and scrapes detailed apartment information.
     Includes robust error handling for individual data points, and extracts a limited
     number of floor plans.
+    With pace=False the random delay after navigating is skipped: the adaptive controller spaces
+    navigations itself, and a replay served from the response cache has no site to be polite to.
     """
     logger.info(f"Scraping detailed page: {url}")
-    data = {
-        'title': 'N/A',
-        'property_link': url,
-        'address': 'N/A',
-        'property_reviews': '0',  # Default to '0' if no reviews found
-        'listing_verification': 'N/A',
-        'lease_options': 'N/A',
-        'year_built': 'N/A',
-        'price' : "Refer to the pricing and floor plan",
-        'street': 'N/A',
-        'city': 'N/A',
-        'state': 'N/A',
-        'zip_code': 'N/A',
-        'property_type': "Apartment",  # Added for consistency
-        'pricing_and_floor_plans': []  # This will be a list of dictionaries for each floor plan
-    }
-
-    # Define selectors for better maintainability
-    selectors = {
-        'pricecontainer' : '.priceBedRangeInfoContainer',
-        'title': 'h1.propertyName',
-        'address_container': '.propertyAddressContainer',  # Container for street, city, state, zip
-        'street_address': '.delivery-address span',
-        'city_state_zip_container': '.propertyAddressContainer h2',  # Container for city, state, zip (as a block)
-        'city_span': "h2 > span.nth-of-type(2)",
-        'state_zip_container': '.stateZipContainer',  # Specific state/zip container
-        'property_reviews': '.reviewRating',
-        'listing_verification': 'span.verifedText',  # its verifed and not verified the correct spelling
-        'lease_options_container': '.feesPoliciesCard:has-text("Lease Options")',
-        'year_built_container': '.feesPoliciesCard:has-text("Property Information") .component-list .column:has-text("Built in")',
-        'unit_cards': 'li.unitContainer',
-        'apartment_name': '.modelName',
-        'rent_price_range': '.rentLabel',
-        'bedrooms_attr': 'data-beds',  # Attribute, not a selector
-        'bathrooms_attr': 'data-baths',  # Attribute, not a selector
-        'sqft_col': '.sqftColumn span:not(.screenReaderOnly)',  # Direct sqft column
-        'details_sqft_text': '.detailsTextWrapper span',  # Fallback for sqft if not in column
-        'unit': '.unitColumn span[title]',
-        'base_rent': '.pricingColumn > span:not(.screenReaderOnly)',
-        'availability': '.availableColumn .dateAvailable:not(.screenReaderOnly)',
-        'details_link_attr': 'data-unitkey'  # Attribute, not a selector
-    }
+    data = empty_property_record(url)
+    selectors = PROPERTY_SELECTORS
 
 
     success_counter = 0
@@ -242,133 +614,30 @@ async def scrape_apartment_page(page: Page, url: str) -> dict:
 
         logging.info(f"Scraping listing number :{url}")
         await goto_with_retry(page, url)
-        await add_random_delay(2, 7)  # Longer delay after navigating to a detail page
-
-        # --- Wait for essential page elements to load ---
-        title_locators=page.locator(selectors['title'])
-        is_standard_page= await title_locators.count() > 0
+        if pace:
+            await add_random_delay(2, 7)  # Longer delay after navigating to a detail page
+
+        if EXTRACTION_BACKEND == 'html':
+            # The browser only hands over the rendered HTML; parsing runs in a worker process
+            html = await page.content()
+            if HTML_SNAPSHOT_DIR:
+                save_html_snapshot(HTML_SNAPSHOT_DIR, url, html)
+            data = await extract_html_off_loop(html, url)
+            is_standard_page = data['title'] != 'N/A'
+        else:
+            # --- Wait for essential page elements to load ---
+            title_locators=page.locator(selectors['title'])
+            is_standard_page= await title_locators.count() > 0
 
         #if there's the title selectors we scrap using our main scrap logic
 
         if is_standard_page:
             logger.info(f"Standard page structure detected for listing")
 
-
-
-            # Wait for floor plan sections to load
-            #await page.wait_for_selector('div.pricingGridItem', timeout=60000)  # Ensure floor plan container is loaded
-            #await page.wait_for_selector('li.unitContainer', timeout=60000)  # Ensure at least one unit container is present
-
-            # --- Extract Main Property Details ---
-            data['title'] = await safe_inner_text(page.locator(selectors['title']).first)
-
-
-            # Extract and parse address components more robustly
-            data['street'] = await safe_inner_text(page.locator(selectors['street_address']).first)
-
-            data['state'] = await safe_inner_text(
-                page.locator(selectors['state_zip_container']).locator('span').nth(0))  # First span in stateZipContainer
-            data['zip_code'] = await safe_inner_text(
-                page.locator(selectors['state_zip_container']).locator('span').nth(1))  # Second span in stateZipContainer
-            state_zip_locator = page.locator(selectors['state_zip_container'])
-            city_name_raw_handle = await state_zip_locator.evaluate_handle(
-                '(element) => element.previousSibling.textContent'
-            )
-            city_name = await city_name_raw_handle.json_value()
-            data['city'] = await safe_inner_text(page.locator(selectors['city_span']).first)
-
-
-            # Reconstruct full address for consistency
-            data['address'] = f"{data['street']}, {data['city']}, {data['state']} {data['zip_code']}"
-            # Clean up "N/A" components if any
-            data['address'] = ", ".join(filter(lambda x: x != 'N/A', data['address'].split(', '))).strip()
-
-            data['property_reviews'] = await safe_inner_text(page.locator(selectors['property_reviews']).first)
-            data['listing_verification'] = await safe_inner_text(page.locator(selectors['listing_verification']).first)
-
-            # Extract Lease Options
-            lease_options = []
-            lease_options_container = page.locator(selectors['lease_options_container'])
-            if await lease_options_container.count() > 0:
-                lease_option_elements = lease_options_container.locator('.component-list .column')
-                for i in range(await lease_option_elements.count()):
-                    option = await safe_inner_text(lease_option_elements.nth(i))
-                    if option != "N/A":
-                        lease_options.append(option)
-            data['lease_options'] = lease_options if lease_options else 'N/A'
-
-            # Extract Year Built
-            year_built_locator = page.locator(selectors['year_built_container'])
-            year_built_text = await safe_inner_text(year_built_locator)
-            year_built = 'N/A'
-            if "Built in" in year_built_text:
-                try:
-                    # Extract year using regex for robustness if needed, or simple split
-                    year_built = year_built_text.split('Built in ')[-1].split(' ')[0].strip()
-                except IndexError:
-                    logging.warning(f"Could not parse year built from '{year_built_text}' for {url}")
-            data['year_built'] = year_built
-
-            # --- Extract Pricing and Floor Plans ---
-            all_units_data = []
-            unit_cards_locators = page.locator(selectors['unit_cards'])
-            unit_cards_count = await unit_cards_locators.count()
-
-
-            # Limit floor plans to a manageable number (e.g., 5) for efficiency and anti-bot.
-            # Adjust '5' to any number you need. For testing, starting with 1 or 2 is good.
-            limit_floor_plans = min(unit_cards_count, 30)  # Limit to 30 for performance, adjust as needed
-            if limit_floor_plans <= 0:
-                logger.warning(f"No unit cards found for {url}. Skipping pricing and floor plans extraction.")
-                data['pricing_and_floor_plans'] = []
-                return data
-            logger.info(f"Found {unit_cards_count} pricing and floor plans for {url}. Limiting to {limit_floor_plans}.")
-
-            floor_plans=0
-            for i in range(limit_floor_plans):
-                floor_plans+=1
-                logger.info(f"Extracting unit card {i + 1}/{limit_floor_plans} for {url}")
-                unit_card = unit_cards_locators.nth(i)
-                unit_pricing_data = {
-                    'apartment_name':"N/A", 'rent_price_range': 'N/A', 'bedrooms': 'N/A',
-                    'bathrooms': 'N/A', 'sqft': 'N/A', 'unit': 'N/A',
-                    'base_rent': 'N/A', 'availability': 'N/A', 'details_link': 'N/A'
-                }
-
-                try:
-                    # Extract data relative to the current unit_card using safe helpers
-                    unit_pricing_data['apartment_name'] = await safe_inner_text(
-                        unit_card.locator(selectors['apartment_name']))
-                    unit_pricing_data['rent_price_range'] = await safe_inner_text(
-                        unit_card.locator(selectors['rent_price_range']))
-                    unit_pricing_data['bedrooms'] = await safe_get_attribute(unit_card, selectors['bedrooms_attr'])
-                    unit_pricing_data['bathrooms'] = await safe_get_attribute(unit_card, selectors['bathrooms_attr'])
-
-                    # Robust SQFT extraction logic
-                    sqft_val = await safe_inner_text(unit_card.locator(selectors['sqft_col']))
-                    if sqft_val == "N/A":  # Fallback if direct column not found or empty
-                        details_spans = unit_card.locator(selectors['details_sqft_text'])
-                        for j in range(await details_spans.count()):
-                            text = await safe_inner_text(details_spans.nth(j))
-                            if "Sq Ft" in text:
-                                sqft_val = text.replace("Sq Ft", "").strip()
-                                break
-                    unit_pricing_data['sqft'] = sqft_val
-
-                    unit_pricing_data['unit'] = await safe_inner_text(unit_card.locator(selectors['unit']))
-                    unit_pricing_data['base_rent'] = await safe_inner_text(unit_card.locator(selectors['base_rent']))
-                    availability_raw = await safe_inner_text(unit_card.locator(selectors['availability']))
-                    cleaned_availability = availability_raw.split('\n')[-1]
-                    unit_pricing_data['availability'] = cleaned_availability.strip() if cleaned_availability else 'N/A'
-                    unit_pricing_data['details_link'] = await safe_get_attribute(unit_card, selectors['details_link_attr'])
-
-                    all_units_data.append(unit_pricing_data)
-
-                except Exception as inner_e:
-                    logger.warning(f"Failed to scrape some unit details for {url}, unit {i}: {inner_e}")
-                    all_units_data.append(unit_pricing_data)  # Append partial data even on inner error
-
-            data['pricing_and_floor_plans'] = all_units_data
+            if EXTRACTION_BACKEND != 'html':
+                await extract_with_locators(page, url, data, selectors)
+            if not data['pricing_and_floor_plans']:
+                return data  # Listings without unit cards are returned before validation
 
             logger.info(f"Finished extraction for standard page: {url}")
             LISTINGS_SCRAPED.labels(source='apartments_com').inc()
@@ -410,16 +679,66 @@ async def scrape_apartment_page(page: Page, url: str) -> dict:
 
 
 # --- Main Orchestration Function (Uses Concurrency) ---
-async def main():
+async def scrape_and_tag(url: str, scrape_coroutine) -> tuple[str, object]:
+    """Awaits a single listing scrape and returns (url, result or exception) so results can be handled as they finish."""
+    try:
+        return url, await scrape_coroutine
+    except Exception as e:
+        return url, e
+
+
+async def main(resume: bool = True, journal_path: str = RUN_JOURNAL_PATH,
+               journal: Optional[RunJournal] = None, result_sink=None, main_url: str = DEFAULT_MARKET_URL,
+               output_path: str = OUTPUT_PATH, crash_output_path: str = CRASH_OUTPUT_PATH,
+               incremental: bool = INCREMENTAL_SCRAPE, cache_responses: bool = CACHE_RESPONSES,
+               replay: bool = False, output_format: str = OUTPUT_FORMAT, adaptive: bool = USE_ADAPTIVE_CONCURRENCY):
     """
     Orchestrates the scraping process, including launching the browser,
     scraping main page, and then detailed property pages concurrently.
     This function correctly uses asyncio.Semaphore for controlled concurrency
     and ensures distinct URLs are scraped.
+    Progress is written to a run journal as it happens, so a crashed run restarted with
+    resume=True skips the frontier discovery and every listing that already finished.
+    With a result_sink (an async callable), validated listings are streamed to it instead of being
+    collected and dumped to JSON; the sink's owner journals them once they are stored.
+    main_url is the market's search results page; market_coordinator.py runs one main() per market.
+    With incremental=True, detail pages whose search results card is unchanged since their last scrape are skipped.
+    With replay=True, every page is served from the response cache and nothing goes to the network.
+    With output_format='ndjson', listings are appended to output_path as they finish instead of dumped at the end.
+    With adaptive=True, detail pages are paced by the AIMD controller instead of the fixed pool and sleeps.
     """
     logger.info("Started the main function")
     start_time=time.time()
     scraped_final_data = []
+
+    journal = journal or RunJournal(journal_path)
+    if resume:
+        journal.load()
+        if journal.is_complete:
+            journal.archive()
+    else:
+        journal.archive()
+    scraped_final_data.extend(journal.successful_listings())
+    # A replay must not move the fingerprints of the live runs
+    use_fingerprints = incremental and not replay
+    fingerprints = FingerprintStore(FINGERPRINT_DB_PATH, stale_after_days=STALE_AFTER_DAYS) if use_fingerprints else None
+    response_cache = None
+    context_setup = None
+    if replay:
+        response_cache = ResponseCache(RESPONSE_CACHE_DIR, RESPONSE_CACHE_TTL_DAYS)
+        context_setup = partial(attach_replay, cache=response_cache)
+        logger.info(f"Replaying from the response cache {RESPONSE_CACHE_DIR}: {response_cache.stats()}")
+    elif cache_responses:
+        response_cache = ResponseCache(RESPONSE_CACHE_DIR, RESPONSE_CACHE_TTL_DAYS)
+        response_cache.evict_expired()
+        context_setup = partial(attach_recorder, cache=response_cache)
+    unchanged_content_count = 0
+    ndjson_writer = None
+    if output_format == 'ndjson' and result_sink is None:
+        ndjson_writer = NdjsonWriter(output_path)
+        for listing in scraped_final_data:  # Listings finished before a resume
+            ndjson_writer.write(listing)
+
     try:
         async with async_playwright() as p:
             # Launch Firefox, with anti-detection arguments
@@ -429,41 +748,85 @@ async def main():
             )
             # Create a new context with a random User-Agent for this session
             context = await browser.new_context(user_agent=random.choice(USER_AGENTS))
-
-            # Use a page from the context for the main page scraping
-            main_page_instance = await context.new_page()
-            main_url = 'https://www.apartments.com/boston-ma/'
-            property_urls = await scrape_all_pages(main_page_instance, main_url)
-            await main_page_instance.close()  # Close main page instance as it's not needed for detail scrapes
+            if context_setup is not None:
+                await context_setup(context)
+
+            if journal.frontier is not None:
+                property_urls = journal.frontier
+                logger.info(f"Resuming run from journal with {len(property_urls)} URLs, skipping pagination.")
+            else:
+                # Use a page from the context for the main page scraping
+                listing_cards = {} if fingerprints else None
+                if PARALLEL_DISCOVERY:
+                    property_urls = await scrape_all_pages_parallel(context, main_url, listing_cards, pace=not replay)
+                else:
+                    main_page_instance = await context.new_page()
+                    property_urls = await scrape_all_pages(main_page_instance, main_url, listing_cards)
+                    await main_page_instance.close()  # Close main page instance as it's not needed for detail scrapes
+                if fingerprints:
+                    property_urls = select_changed_listings(fingerprints, listing_cards, property_urls, main_url)
+                journal.record_frontier(property_urls)
 
             # Limit the number of properties to scrape for faster testing/development
 
             properties_to_scrape_limit = 500  # Set to 5 as a reasonable test sample
-            limited_property_urls = property_urls[:properties_to_scrape_limit]
+            limited_property_urls = journal.pending(property_urls[:properties_to_scrape_limit])
 
             logger.info(
-                f"Found {len(property_urls)} properties on main page. Proceeding to scrape {len(limited_property_urls)} properties for detail.")
-
-            # Use a semaphore to control concurrency
-            max_concurrent_pages = 10  # Reduced concurrency to 3 to be less aggressive. Adjust as needed.
-            semaphore = asyncio.Semaphore(max_concurrent_pages)
+                f"Found {len(property_urls)} properties on main page. Proceeding to scrape {len(limited_property_urls)} properties for detail "
+                f"({len(journal.listings)} already finished in the run journal).")
 
             tasks = []
-            # Create a task for each UNIQUE URL in the limited list
-            for url in limited_property_urls:
-                tasks.append(scrape_with_semaphore(context, url, semaphore))
-
-            # Run all scraping tasks concurrently
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-
-            # Process results and separate successful scrapes from failures/exceptions
-
-            for res in results:
-
+            page_source = partial(fresh_page, context)
+            if USE_CONTEXT_POOL:
+                # The pool size bounds concurrency, each context reuses one page for its URLs
+                pool = BrowserContextPool(
+                    browser, USER_AGENTS, size=CONTEXT_POOL_SIZE,
+                    blocked_resource_types=BLOCKED_RESOURCE_TYPES, blocked_domains=BLOCKED_DOMAINS,
+                    context_setup=context_setup
+                )
+                await pool.start()
+                page_source = pool.page
+            # A replay always goes through the scheduler: its bounds run the whole pool with no spacing
+            if adaptive or replay:
+                scheduler = detail_scheduler(replay)
+                for url in limited_property_urls:
+                    tasks.append(scrape_and_tag(url, scrape_with_scheduler(scheduler, page_source, url, result_sink)))
+            elif USE_CONTEXT_POOL:
+                for url in limited_property_urls:
+                    tasks.append(scrape_and_tag(url, scrape_with_pool(pool, url, result_sink)))
+            else:
+                # Use a semaphore to control concurrency
+                max_concurrent_pages = 10  # Reduced concurrency to 3 to be less aggressive. Adjust as needed.
+                semaphore = asyncio.Semaphore(max_concurrent_pages)
+
+                # Create a task for each UNIQUE URL in the limited list
+                for url in limited_property_urls:
+                    tasks.append(scrape_and_tag(url, scrape_with_semaphore(context, url, semaphore, result_sink)))
+
+            # Run all scraping tasks concurrently and journal each result as soon as it finishes
+            for finished in asyncio.as_completed(tasks):
+                url, res = await finished
+
+                is_success = isinstance(res, dict) and res.get('validation_status') == 'Success'
+                streamed = is_success and result_sink is not None
+
+                # Only listings that made it through validation count as done; anything else is retried on resume.
+                # Streamed listings are journaled by the writer once they are committed.
+                if isinstance(res, dict) and 'validation_status' in res:
+                    if not streamed:
+                        journal.record_listing(url, res)
+                else:
+                    journal.record_failure(url, str(res) if isinstance(res, Exception) else 'Scrape ended before validation')
 
-                if isinstance(res, dict) and res.get('validation_status') == 'Success':
-                    scraped_final_data.append(res)
+                if is_success:
+                    if not streamed:
+                        scraped_final_data.append(res)
+                        if ndjson_writer:
+                            ndjson_writer.write(res)
                     LISTINGS_SCRAPED.labels(source=main_url).inc()
+                    if fingerprints and not fingerprints.record_scraped(url, res):
+                        unchanged_content_count += 1
 
                 else:
                     error_msg = str(res) if isinstance(res,
@@ -471,32 +834,53 @@ async def main():
                     logger.error(f"A property scrape failed or was invalid: {error_msg}")
                     SCRAPER_FAILURES.labels(source=main_url).inc()
 
+            if USE_CONTEXT_POOL:
+                await pool.close()
+            if fingerprints:
+                logger.info(f"{unchanged_content_count} revisited listings had the same content as their last scrape.")
+
             # Ensure all pages opened within the context are closed
             for page_instance in context.pages:
                 if not page_instance.is_closed():
                     await page_instance.close()
             await browser.close()
 
+            if result_sink is not None:
+                # The streaming writer still has listings in flight; its owner marks the run complete
+                return scraped_final_data
+
             logger.info(f"Total successful property data entries collected: {len(scraped_final_data)}")
 
-            with open("apartments_data2.json", "w", encoding="utf-8") as f:
-                json.dump(scraped_final_data, f, ensure_ascii=False, indent=4)
+            if ndjson_writer is None:
+                with open(output_path, "w", encoding="utf-8") as f:
+                    json.dump(scraped_final_data, f, ensure_ascii=False, indent=4)
+            journal.record_complete()
             return scraped_final_data
 
     except Exception as e:
         RETRIES_ATTEMPTED.labels(source=main_url).inc()
         logger.critical(f"A critical error occurred in main execution: {e}", exc_info=True)
+        logger.info(f"Progress is kept in the run journal {journal.path}; rerun to resume.")
 
-
-        with open("apartments_data.json", "w", encoding="utf-8") as f:
-            json.dump(scraped_final_data,f, ensure_ascii=False, indent=4)
+        # An NDJSON output already holds every listing that finished
+        if result_sink is None and ndjson_writer is None:
+            with open(crash_output_path, "w", encoding="utf-8") as f:
+                json.dump(scraped_final_data,f, ensure_ascii=False, indent=4)
         return scraped_final_data
     # Return whatever data was collected before the critical error
     finally:
+        journal.close()
+        if ndjson_writer:
+            ndjson_writer.close()
+        if fingerprints:
+            fingerprints.close()
+        if response_cache:
+            response_cache.close()
+        shutdown_html_parse_pool()
         stop_time = time.time()
         total_time_taken = stop_time - start_time
         logger.info(f"It has taken {total_time_taken/60:.2f} minutes to complete.")
-        SCRAPE_DURATION.labels(source=url).observe(total_time_taken)
+        SCRAPE_DURATION.labels(source=main_url).observe(total_time_taken)
 
         #update resource packages
         MEMORY_USAGE.set(psutil.virtual_memory().used /1024 / 1024) #MB
@@ -504,7 +888,28 @@ async def main():
 
 
 
-async def scrape_with_semaphore(page_context, url: str, semaphore: asyncio.Semaphore) -> dict:
+def select_changed_listings(fingerprints: FingerprintStore, listing_cards: dict, property_urls: list[str],
+                            main_url: str) -> list[str]:
+    """Keeps the URLs whose detail page needs a visit: new, card summary changed, or stale."""
+    decisions = fingerprints.observe_cards({url: listing_cards.get(url, {}) for url in property_urls})
+    for decision in decisions.values():
+        INCREMENTAL_DECISIONS.labels(source=main_url, decision=decision).inc()
+    selected = [url for url in property_urls if decisions[url] != 'unchanged']
+    counts = {decision: list(decisions.values()).count(decision) for decision in ('new', 'changed', 'stale', 'unchanged')}
+    logger.info(f"Incremental scrape: visiting {len(selected)} of {len(property_urls)} listings {counts}")
+    return selected
+
+
+async def hand_to_sink(result: dict, result_sink) -> None:
+    """
+    Passes a validated listing to the streaming sink. Called while the caller still holds its
+    concurrency slot, so a full queue stops new pages from being opened (backpressure).
+    """
+    if result_sink is not None and result.get('validation_status') == 'Success':
+        await result_sink(result)
+
+
+async def scrape_with_semaphore(page_context, url: str, semaphore: asyncio.Semaphore, result_sink=None) -> dict:
     """
     Acquires a semaphore, creates a new page, scrapes, and releases the semaphore.
     This ensures controlled concurrency for distinct URLs.
@@ -513,6 +918,7 @@ async def scrape_with_semaphore(page_context, url: str, semaphore: asyncio.Semap
         page = await page_context.new_page()  # A new page is created for each concurrent scrape
         try:
             result = await scrape_apartment_page(page, url)  # Call the main scrape function
+            await hand_to_sink(result, result_sink)
             return result
         finally:
             if not page.is_closed():
@@ -520,6 +926,96 @@ async def scrape_with_semaphore(page_context, url: str, semaphore: asyncio.Semap
             await add_random_delay(1, 3)  # Add a slightly longer delay after each page scrape
 
 
+async def scrape_with_pool(pool: BrowserContextPool, url: str, result_sink=None) -> dict:
+    """
+    Borrows a page from the context pool, scrapes, and hands the context back.
+    The page is kept open so the next URL on this context reuses it.
+    """
+    async with pool.page() as page:
+        try:
+            result = await scrape_apartment_page(page, url)
+            await hand_to_sink(result, result_sink)
+            return result
+        finally:
+            await add_random_delay(1, 3)  # Same pacing as scrape_with_semaphore
+
+
+@asynccontextmanager
+async def fresh_page(page_context):
+    """Opens a new page on the shared context and closes it afterwards."""
+    page = await page_context.new_page()
+    try:
+        yield page
+    finally:
+        if not page.is_closed():
+            await page.close()
+
+
+def detail_scheduler(replay: bool = False) -> AdaptiveScheduler:
+    """Returns the adaptive controller for detail pages; a replay runs at full pool concurrency with no cool-down."""
+    if replay:
+        return AdaptiveScheduler(default_bounds=REPLAY_HOST_BOUNDS, block_cooldown=0)
+    return AdaptiveScheduler(host_bounds=HOST_BOUNDS)
+
+
+async def scrape_with_scheduler(scheduler: AdaptiveScheduler, page_source, url: str, result_sink=None) -> dict:
+    """
+    Waits for the adaptive controller to allow another page on the URL's host, scrapes it and reports
+    the outcome and latency back. No fixed sleeps: the controller's spacing replaces them.
+    """
+    async with scheduler.slot(url) as controller:
+        async with page_source() as page:
+            started = time.monotonic()
+            try:
+                result = await scrape_apartment_page(page, url, pace=False)
+            except Exception:
+                await controller.record('error')
+                raise
+            await controller.record(classify_outcome(result), time.monotonic() - started)
+            await hand_to_sink(result, result_sink)
+            return result
+
+
+# --- Streaming Scrape-to-Database Pipeline ---
+async def run_streaming_pipeline(resume: bool = True, queue_size: int = STREAM_QUEUE_SIZE,
+                                 batch_size: int = STREAM_BATCH_SIZE, incremental: bool = INCREMENTAL_SCRAPE,
+                                 cache_responses: bool = CACHE_RESPONSES, adaptive: bool = USE_ADAPTIVE_CONCURRENCY):
+    """
+    Runs the scraper and a database writer concurrently, connected by a bounded queue.
+    Memory is bounded by the queue size rather than the run size, and when the writer falls behind
+    the scrapers block on the full queue while holding their page, so no new pages are opened.
+    """
+    from db_ops import stream_scraped_data_to_db
+
+    queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    journal = RunJournal(RUN_JOURNAL_PATH, keep_listings=False)
+
+    def journal_committed(listings: list[dict]):
+        for listing in listings:
+            journal.record_stored(listing['property_link'])
+
+    writer = asyncio.create_task(
+        stream_scraped_data_to_db(queue, batch_size=batch_size, on_committed=journal_committed, bulk=DB_BULK_INGEST))
+    scraper = asyncio.create_task(main(resume=resume, journal=journal, result_sink=queue.put, incremental=incremental,
+                                        cache_responses=cache_responses, adaptive=adaptive))
+
+    # If the writer dies the queue never drains, so stop the scraper instead of letting it block forever
+    done, _ = await asyncio.wait({writer, scraper}, return_when=asyncio.FIRST_COMPLETED)
+    if writer in done:
+        scraper.cancel()
+        await asyncio.gather(scraper, return_exceptions=True)
+        writer.result()  # Re-raises the writer's error
+        raise RuntimeError("Database writer stopped before the scrape finished")
+
+    await scraper
+    await queue.put(None)
+    committed = await writer
+    journal.record_complete()
+    journal.close()
+    logger.info(f"Streaming pipeline finished, {committed} properties committed to the database.")
+    return committed
+
+
 # --- Performance Comparison Functions (for Day 4 "Cementing Task") ---
 async def run_scraper_mode(headless_mode: bool, p_instance):
     """Runs the scraper in a specified headless mode and returns execution time."""
@@ -578,11 +1074,57 @@ async def compare_performance():
 
 # --- Main Execution Block ---
 if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Scrape apartments.com listings and save them to the database")
+    parser.add_argument('--stream', action='store_true',
+                        help="Commit listings to the database in batches while scraping instead of at the end")
+    parser.add_argument('--no-resume', action='store_true', help="Ignore an unfinished run journal and start over")
+    parser.add_argument('--incremental', action='store_true', default=INCREMENTAL_SCRAPE,
+                        help="Only visit detail pages that are new, changed on the search results, or stale")
+    parser.add_argument('--cache-responses', action='store_true', default=CACHE_RESPONSES,
+                        help=f"Store every fetched page in the response cache ({RESPONSE_CACHE_DIR})")
+    parser.add_argument('--adaptive', action='store_true', default=USE_ADAPTIVE_CONCURRENCY,
+                        help="Pace detail pages with the adaptive concurrency controller instead of the fixed pool and delays")
+    parser.add_argument('--replay', action='store_true',
+                        help="Serve every page from the response cache instead of the network and don't save to the database")
+    parser.add_argument('--extraction-backend', choices=('locator', 'html'), default=EXTRACTION_BACKEND,
+                        help="Read detail pages through live locators or parse their HTML in a process pool")
+    parser.add_argument('--bulk-unit-extraction', action='store_true', default=USE_BULK_UNIT_EXTRACTION,
+                        help="With the locator backend, read all unit cards in one in-page evaluation")
+    parser.add_argument('--ndjson', action='store_true', default=OUTPUT_FORMAT == 'ndjson',
+                        help=f"Append listings to {NDJSON_OUTPUT_PATH} as they finish instead of dumping a JSON array at the end")
+    args = parser.parse_args()
+
+    if args.replay and args.stream:
+        parser.error("--replay does not write to the database, it can't be combined with --stream")
+    EXTRACTION_BACKEND = args.extraction_backend
+    USE_BULK_UNIT_EXTRACTION = args.bulk_unit_extraction
+
     from prometheus_client import start_http_server
     start_http_server(8001)
     logger.info("HTTP server started, beggining data extraction")
-    scraped_data_output = asyncio.run(main())
-    logger.info(f"\nFinal Scraped Data Summary: Collected {len(scraped_data_output)} successful property entries.")
-    from db_ops import save_scraped_data_to_db
-    asyncio.run(save_scraped_data_to_db(scraped_data_output))
+    if args.replay:
+        replayed = asyncio.run(main(resume=not args.no_resume, journal_path=REPLAY_JOURNAL_PATH,
+                                    output_path=REPLAY_OUTPUT_PATH, crash_output_path=REPLAY_OUTPUT_PATH, replay=True))
+        logger.info(f"Replay finished: {len(replayed)} successful property entries written to {REPLAY_OUTPUT_PATH}.")
+    elif args.stream:
+        asyncio.run(run_streaming_pipeline(resume=not args.no_resume, incremental=args.incremental,
+                                           cache_responses=args.cache_responses, adaptive=args.adaptive))
+    else:
+        if args.ndjson:
+            output_options = {'output_format': 'ndjson', 'output_path': NDJSON_OUTPUT_PATH}
+        else:
+            output_options = {'output_format': 'json'}
+        scraped_data_output = asyncio.run(main(resume=not args.no_resume, incremental=args.incremental,
+                                               cache_responses=args.cache_responses, adaptive=args.adaptive,
+                                               **output_options))
+        logger.info(f"\nFinal Scraped Data Summary: Collected {len(scraped_data_output)} successful property entries.")
+        from db_ops import save_scraped_data_to_db, bulk_save_scraped_data_to_db
+        if DB_INGEST_WORKERS > 1:
+            from ingest_executor import ingest_scraped_data
+            asyncio.run(ingest_scraped_data(scraped_data_output, workers=DB_INGEST_WORKERS, bulk=DB_BULK_INGEST))
+        elif DB_BULK_INGEST:
+            asyncio.run(bulk_save_scraped_data_to_db(scraped_data_output))
+        else:
+            asyncio.run(save_scraped_data_to_db(scraped_data_output))
     #asyncio.run(compare_performance())
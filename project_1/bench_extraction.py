@@ -0,0 +1,166 @@
+import os
+import sys
+import time
+import json
+import html
+import asyncio
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from html_extractor import extract_property_from_html, load_html_snapshot
+from scraper_selectors import empty_property_record
+
+'''--- Extraction backend benchmark ---
+Compares docs/sec of the Playwright locator backend and the offline HTML backend on a fixture corpus.
+By default the corpus is rendered from the bundled scrape dumps into apartments.com-shaped markup,
+or pass --snapshots DIR to benchmark against pages stored with HTML_SNAPSHOT_DIR.
+
+    python bench_extraction.py --dumps apartments_data.json apartments_data2.json --workers 4
+'''
+
+logger = logging.getLogger(__name__)
+
+
+# --- Fixture Corpus ---
+def _element(tag: str, css_class: str, value, attributes: str = '') -> str:
+    """Renders an element the way the live site does: 'N/A' means absent, None means present but empty."""
+    if value == 'N/A':
+        return ''
+    text = html.escape(value) if value else ''
+    return f'<{tag} class="{css_class}"{attributes}>{text}</{tag}>'
+
+
+def _attribute(name: str, value) -> str:
+    if value == 'N/A':
+        return ''
+    return f' {name}="{html.escape(value or "")}"'
+
+
+def render_listing_html(prop: dict) -> str:
+    """Renders one scraped listing back into markup that matches PROPERTY_SELECTORS."""
+    unit_cards = []
+    for fp in prop.get('pricing_and_floor_plans', []):
+        unit_cards.append(
+            '<li class="unitContainer"'
+            + _attribute('data-beds', fp.get('bedrooms'))
+            + _attribute('data-baths', fp.get('bathrooms'))
+            + _attribute('data-unitkey', fp.get('details_link'))
+            + '>'
+            + _element('div', 'modelName', fp.get('apartment_name'))
+            + _element('div', 'rentLabel', fp.get('rent_price_range'))
+            + '<div class="sqftColumn"><span class="screenReaderOnly">square feet</span>'
+            + _element('span', 'sqft', fp.get('sqft')) + '</div>'
+            + '<div class="unitColumn">' + _element('span', 'unitNumber', fp.get('unit'), _attribute('title', fp.get('unit'))) + '</div>'
+            + '<div class="pricingColumn"><span class="screenReaderOnly">price</span>'
+            + _element('span', 'rent', fp.get('base_rent')) + '</div>'
+            + '<div class="availableColumn"><span class="dateAvailable">'
+            + '<span class="screenReaderOnly">availability</span>\n' + html.escape(fp.get('availability') or '')
+            + '</span></div>'
+            + '</li>'
+        )
+
+    lease_options = prop.get('lease_options')
+    lease_columns = ''.join(
+        f'<li class="column">{html.escape(option)}</li>' for option in lease_options
+    ) if isinstance(lease_options, list) else ''
+    year_built = prop.get('year_built')
+    year_column = f'<li class="column">Built in {html.escape(year_built)}</li>' if year_built not in (None, 'N/A') else ''
+
+    return (
+        '<html><head><title>' + html.escape(prop.get('title') or '') + '</title></head><body>'
+        + _element('h1', 'propertyName', prop.get('title'))
+        + '<div class="propertyAddressContainer"><h2>'
+        + '<span class="delivery-address">' + _element('span', 'street', prop.get('street')) + '</span>'
+        + '<div class="stateZipContainer">'
+        + _element('span', 'state', prop.get('state')) + _element('span', 'zip', prop.get('zip_code'))
+        + '</div></h2></div>'
+        + _element('div', 'reviewRating', prop.get('property_reviews'))
+        + _element('span', 'verifedText', prop.get('listing_verification'))
+        + '<section class="feesPoliciesCard"><h3>Lease Options</h3><ul class="component-list">' + lease_columns + '</ul></section>'
+        + '<section class="feesPoliciesCard"><h3>Property Information</h3><ul class="component-list">' + year_column + '</ul></section>'
+        + '<ul class="unitList">' + ''.join(unit_cards) + '</ul>'
+        + '</body></html>'
+    )
+
+
+def load_corpus(dump_paths: list[str], snapshot_dir: str = None) -> list[tuple[str, str]]:
+    """Returns (url, html) pairs from stored snapshots, or rendered from the scrape dumps."""
+    if snapshot_dir:
+        return [
+            load_html_snapshot(os.path.join(snapshot_dir, name))
+            for name in sorted(os.listdir(snapshot_dir)) if name.endswith('.html')
+        ]
+    corpus = []
+    for path in dump_paths:
+        with open(path, encoding='utf-8') as f:
+            for prop in json.load(f):
+                corpus.append((prop['property_link'], render_listing_html(prop)))
+    return corpus
+
+
+# --- Backends ---
+def _extract_pair(pair: tuple[str, str]) -> dict:
+    url, page_html = pair
+    return extract_property_from_html(page_html, url)
+
+
+def bench_html_backend(corpus: list[tuple[str, str]], workers: int) -> tuple[float, list[dict]]:
+    start = time.perf_counter()
+    if workers <= 1:
+        results = [_extract_pair(pair) for pair in corpus]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_extract_pair, corpus, chunksize=max(1, len(corpus) // (workers * 4))))
+    return time.perf_counter() - start, results
+
+
+async def bench_locator_backend(corpus: list[tuple[str, str]]) -> tuple[float, list[dict]]:
+    """Loads every document into one Firefox page with set_content() and runs the locator extraction on it."""
+    from playwright.async_api import async_playwright
+    from apartment_scraper import extract_with_locators
+
+    results = []
+    async with async_playwright() as p:
+        browser = await p.firefox.launch(headless=True)
+        page = await browser.new_page()
+        start = time.perf_counter()
+        for url, page_html in corpus:
+            await page.set_content(page_html, wait_until='domcontentloaded')
+            results.append(await extract_with_locators(page, url, empty_property_record(url)))
+        elapsed = time.perf_counter() - start
+        await browser.close()
+    return elapsed, results
+
+
+def count_mismatches(left: list[dict], right: list[dict]) -> int:
+    return sum(1 for a, b in zip(left, right) if a != b)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare docs/sec of the locator and HTML extraction backends')
+    parser.add_argument('--dumps', nargs='+', default=['apartments_data.json', 'apartments_data2.json'])
+    parser.add_argument('--snapshots', help='Directory of stored page snapshots to use instead of the dumps')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--repeat', type=int, default=3, help='Repeat the corpus to get stable timings')
+    parser.add_argument('--skip-browser', action='store_true', help='Only benchmark the HTML backend')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    corpus = load_corpus(args.dumps, args.snapshots) * args.repeat
+    print(f"Corpus: {len(corpus)} documents")
+
+    elapsed, html_results = bench_html_backend(corpus, workers=1)
+    print(f"html backend (1 process):    {len(corpus) / elapsed:10.1f} docs/sec")
+    if args.workers > 1:
+        elapsed, _ = bench_html_backend(corpus, workers=args.workers)
+        print(f"html backend ({args.workers} processes):   {len(corpus) / elapsed:10.1f} docs/sec")
+
+    if not args.skip_browser:
+        elapsed, locator_results = asyncio.run(bench_locator_backend(corpus))
+        print(f"locator backend (1 page):    {len(corpus) / elapsed:10.1f} docs/sec")
+        print(f"Documents where the backends disagree: {count_mismatches(html_results, locator_results)}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+import json
+import time
+import argparse
+from typing import Any, Optional
+
+from parsing import parse_numeric, parse_numeric_columns, parse_range
+
+'''--- Numeric parsing benchmark ---
+Compares the original str.replace-chain parse_numeric_value with the memoised parser and the column parser
+on the numeric fields of the bundled scrape dumps, and lists the values where their results differ.
+
+    python bench_parsing.py --dumps apartments_data.json apartments_data2.json --repeat 20
+'''
+
+FLOOR_PLAN_FIELDS = ('bedrooms', 'bathrooms', 'sqft', 'base_rent')
+PROPERTY_FIELDS = ('year_built', 'property_reviews')
+
+
+def legacy_parse_numeric_value(text: Any) -> Optional[float]:
+    """parse_numeric_value as it was in db_ops before parsing.py, kept as the baseline."""
+    if text is None:
+        return None
+    if not isinstance(text, str):
+        try:
+            return float(text)
+        except (ValueError, TypeError):
+            return None
+
+    # Clean the string
+    clean_text = text.replace('Sq Ft', '').replace('Bed', '').replace('Bath', '').replace('+', '').strip()
+    clean_text = clean_text.replace('$', '').replace(',', '').replace('–', '-').strip()
+
+    try:
+        if '-' in clean_text:
+            parts = clean_text.split('-')
+            if parts[0].strip().isdigit():
+                return float(parts[0].strip())
+        return float(clean_text)
+    except ValueError:
+        return None
+
+
+def load_columns(dump_paths: list[str]) -> tuple[list[dict], list[dict]]:
+    properties, floor_plans = [], []
+    for path in dump_paths:
+        with open(path, encoding='utf-8') as f:
+            for prop in json.load(f):
+                properties.append(prop)
+                floor_plans.extend(prop.get('pricing_and_floor_plans', []))
+    return properties, floor_plans
+
+
+def time_per_value(parser, records: list[dict], fields: tuple, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for record in records:
+            for field in fields:
+                parser(record.get(field))
+    return time.perf_counter() - start
+
+
+def time_columns(records: list[dict], fields: tuple, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        parse_numeric_columns(records, fields)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark numeric parsing of scraped fields')
+    parser.add_argument('--dumps', nargs='+', default=['apartments_data.json', 'apartments_data2.json'])
+    parser.add_argument('--repeat', type=int, default=20, help='Passes over the dumps per timing')
+    args = parser.parse_args()
+
+    properties, floor_plans = load_columns(args.dumps)
+    values = args.repeat * (len(floor_plans) * len(FLOOR_PLAN_FIELDS) + len(properties) * len(PROPERTY_FIELDS))
+    print(f"{len(properties)} properties, {len(floor_plans)} floor plans, {values} values per parser")
+
+    def report(name: str, seconds: float):
+        print(f"{name:<34}{values / seconds:14,.0f} values/sec")
+
+    report("legacy parse_numeric_value", time_per_value(legacy_parse_numeric_value, floor_plans, FLOOR_PLAN_FIELDS, args.repeat)
+           + time_per_value(legacy_parse_numeric_value, properties, PROPERTY_FIELDS, args.repeat))
+
+    parse_range.cache_clear()
+    report("parse_numeric (memoised)", time_per_value(parse_numeric, floor_plans, FLOOR_PLAN_FIELDS, args.repeat)
+           + time_per_value(parse_numeric, properties, PROPERTY_FIELDS, args.repeat))
+    print(f"  cache: {parse_range.cache_info()}")
+
+    parse_range.cache_clear()
+    report("parse_numeric_columns", time_columns(floor_plans, FLOOR_PLAN_FIELDS, args.repeat)
+           + time_columns(properties, PROPERTY_FIELDS, args.repeat))
+
+    # Values the two parsers read differently, e.g. decimal ranges and "Studio"
+    differences = {}
+    for records, fields in ((floor_plans, FLOOR_PLAN_FIELDS), (properties, PROPERTY_FIELDS)):
+        for record in records:
+            for field in fields:
+                raw = record.get(field)
+                old, new = legacy_parse_numeric_value(raw), parse_numeric(raw)
+                if old != new:
+                    differences[(field, raw)] = (old, new)
+    print(f"Distinct values parsed differently: {len(differences)}")
+    for (field, raw), (old, new) in sorted(differences.items(), key=str)[:20]:
+        print(f"  {field:<18}{raw!r:<28} legacy={old!r:<10} new={new!r}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+import asyncio
+import random
+import logging
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Optional
+from urllib.parse import urlparse
+
+from playwright.async_api import Browser, BrowserContext, Page, Route, Request
+
+from metrics import CONTEXT_BYTES_TRANSFERRED, REQUESTS_BLOCKED, REQUESTS_ALLOWED
+
+logger = logging.getLogger(__name__)
+
+'''--- Browser Context Pool ---
+A fixed set of browser contexts for the detail-page crawl. Each context keeps one page that is reused
+across URLs, gets its own User-Agent from the rotation, aborts requests that match the block list,
+and reports the bytes it actually transferred so the effect of the block list is measurable.
+'''
+
+# Resource types that never contribute to the extracted fields
+DEFAULT_BLOCKED_RESOURCE_TYPES = frozenset({'image', 'media', 'font'})
+
+# Third-party trackers, ad networks and map tile hosts seen on apartments.com detail pages
+DEFAULT_BLOCKED_DOMAINS = frozenset({
+    'google-analytics.com', 'googletagmanager.com', 'googlesyndication.com', 'doubleclick.net',
+    'googleadservices.com', 'facebook.net', 'facebook.com', 'connect.facebook.net', 'bat.bing.com',
+    'hotjar.com', 'newrelic.com', 'nr-data.net', 'quantserve.com', 'scorecardresearch.com',
+    'adsrvr.org', 'criteo.com', 'taboola.com', 'tiqcdn.com', 'demdex.net', 'omtrdc.net',
+    'maps.googleapis.com', 'maps.gstatic.com', 'api.mapbox.com', 'tiles.mapbox.com', 'virtualearth.net',
+})
+
+
+def is_blocked_domain(url: str, blocked_domains: frozenset) -> bool:
+    """True if the host of `url` is one of the blocked domains or a subdomain of one."""
+    host = urlparse(url).hostname or ''
+    return any(host == domain or host.endswith('.' + domain) for domain in blocked_domains)
+
+
+class PooledContext:
+    """One browser context, its reusable page and its transfer statistics."""
+
+    def __init__(self, name: str, context: BrowserContext, user_agent: str):
+        self.name = name
+        self.context = context
+        self.user_agent = user_agent
+        self.page: Optional[Page] = None
+        self.pages_served = 0
+        self.bytes_transferred = 0
+        self.requests_blocked = 0
+
+    async def get_page(self) -> Page:
+        # Reuse the same tab across URLs; only open a new one if it was closed or crashed
+        if self.page is None or self.page.is_closed():
+            self.page = await self.context.new_page()
+        return self.page
+
+
+class BrowserContextPool:
+    """
+    Hands out pages from `size` browser contexts. Acquiring a page blocks until a context is idle,
+    so the pool size is also the crawl concurrency.
+    """
+
+    def __init__(
+            self,
+            browser: Browser,
+            user_agents: list[str],
+            size: int = 4,
+            blocked_resource_types: frozenset = DEFAULT_BLOCKED_RESOURCE_TYPES,
+            blocked_domains: frozenset = DEFAULT_BLOCKED_DOMAINS,
+            max_pages_per_context: Optional[int] = 50,
+            context_setup: Optional[Callable[[BrowserContext], Awaitable]] = None,
+    ):
+        self.browser = browser
+        self.user_agents = list(user_agents)
+        self.size = size
+        self.blocked_resource_types = frozenset(blocked_resource_types)
+        self.blocked_domains = frozenset(blocked_domains)
+        self.max_pages_per_context = max_pages_per_context
+        # Extra per-context hook (e.g. response cache recording/replay), run after the block list is installed
+        self.context_setup = context_setup
+        self._idle: asyncio.Queue[PooledContext] = asyncio.Queue()
+        self._slots: list[PooledContext] = []
+        self._user_agent_offset = random.randrange(len(self.user_agents))
+        self._contexts_created = 0
+
+    def _next_user_agent(self) -> str:
+        # Round-robin from a random offset so concurrent contexts never share a User-Agent
+        user_agent = self.user_agents[(self._user_agent_offset + self._contexts_created) % len(self.user_agents)]
+        self._contexts_created += 1
+        return user_agent
+
+    async def _new_slot(self, name: str) -> PooledContext:
+        user_agent = self._next_user_agent()
+        context = await self.browser.new_context(user_agent=user_agent)
+        slot = PooledContext(name, context, user_agent)
+
+        async def handle_route(route: Route):
+            request = route.request
+            if request.resource_type in self.blocked_resource_types:
+                reason = request.resource_type
+            elif is_blocked_domain(request.url, self.blocked_domains):
+                reason = 'domain'
+            else:
+                REQUESTS_ALLOWED.labels(context=name).inc()
+                await route.continue_()
+                return
+            slot.requests_blocked += 1
+            REQUESTS_BLOCKED.labels(context=name, reason=reason).inc()
+            await route.abort()
+
+        async def handle_request_finished(request: Request):
+            try:
+                sizes = await request.sizes()
+            except Exception as e:
+                logger.debug(f"Could not read transfer size for {request.url}: {e}")
+                return
+            transferred = sizes['responseHeadersSize'] + max(sizes['responseBodySize'], 0)
+            slot.bytes_transferred += transferred
+            CONTEXT_BYTES_TRANSFERRED.labels(context=name).inc(transferred)
+
+        await context.route('**/*', handle_route)
+        context.on('requestfinished', handle_request_finished)
+        if self.context_setup is not None:
+            await self.context_setup(context)
+        logger.info(f"Created browser context {name} with User-Agent: {user_agent}")
+        return slot
+
+    async def start(self):
+        for i in range(self.size):
+            slot = await self._new_slot(f"context-{i}")
+            self._slots.append(slot)
+            self._idle.put_nowait(slot)
+        logger.info(f"Browser context pool started with {self.size} contexts")
+
+    async def _recycle(self, slot: PooledContext) -> PooledContext:
+        """Replaces a context that has served its quota with a fresh one on the next User-Agent."""
+        logger.info(
+            f"Recycling {slot.name} after {slot.pages_served} pages "
+            f"({slot.bytes_transferred / 1024 / 1024:.1f} MB transferred, {slot.requests_blocked} requests blocked)")
+        await slot.context.close()
+        new_slot = await self._new_slot(slot.name)
+        self._slots[self._slots.index(slot)] = new_slot
+        return new_slot
+
+    @asynccontextmanager
+    async def page(self):
+        """Yields a ready-to-use page from an idle context and returns the context to the pool afterwards."""
+        slot = await self._idle.get()
+        try:
+            if self.max_pages_per_context and slot.pages_served >= self.max_pages_per_context:
+                slot = await self._recycle(slot)
+            page = await slot.get_page()
+            slot.pages_served += 1
+            yield page
+        finally:
+            self._idle.put_nowait(slot)
+
+    def stats(self) -> dict:
+        return {
+            slot.name: {
+                'user_agent': slot.user_agent,
+                'pages_served': slot.pages_served,
+                'bytes_transferred': slot.bytes_transferred,
+                'requests_blocked': slot.requests_blocked,
+            }
+            for slot in self._slots
+        }
+
+    async def close(self):
+        for slot in self._slots:
+            logger.info(
+                f"{slot.name}: {slot.pages_served} pages, {slot.bytes_transferred / 1024 / 1024:.1f} MB transferred, "
+                f"{slot.requests_blocked} requests blocked")
+            await slot.context.close()
+        self._slots.clear()
@@ -0,0 +1,181 @@
+import time
+import asyncio
+import logging
+import argparse
+from datetime import datetime
+from typing import Iterable, Iterator
+
+from db_ops import engine, property_row, create_db_and_tables, refresh_analytics_summary, BUMP_DATA_VERSION_SQL
+from dump_loader import iter_dump_listings
+from parsing import NUMERIC_FIELDS, parse_numeric_columns, to_optional_list
+
+logger = logging.getLogger(__name__)
+
+'''--- PostgreSQL COPY bulk load ---
+Backfills scrape dumps (apartments_data.json and friends, JSON arrays or NDJSON) without the per-row ORM path:
+  1. every listing is normalised like db_ops does; floor plan numbers are parsed a column at a time
+  2. rows are streamed into temporary staging tables with the asyncpg COPY protocol, CHUNK_SIZE listings at a time
+  3. property and pricing_and_floor_plans are merged from staging with set-based SQL in the same transaction
+Floor plans of loaded properties are replaced, like db_ops with FLOOR_PLAN_RECONCILE = False, so a backfill
+records no rent history.
+
+    python bulk_load.py apartments_data.json apartments_data2.json
+'''
+
+# Listings normalised and copied per COPY round, so memory stays bounded for multi-city dumps
+CHUNK_SIZE = 5000
+
+PROPERTY_COLUMNS = (
+    'property_link', 'title', 'address', 'street', 'city', 'state', 'zip_code', 'property_reviews',
+    'listing_verification', 'lease_option', 'year_built', 'validation_status', 'property_type', 'timestamp',
+)
+
+FLOOR_PLAN_COLUMNS = (
+    'apartment_name', 'rent_price_range', 'bedrooms', 'bathrooms', 'sqft', 'unit', 'base_rent', 'availability',
+    'details_link',
+)
+
+# seq keeps the dump order, so the last copy of a listing that appears in several dumps wins
+CREATE_STAGING_SQL = [
+    '''
+    CREATE TEMP TABLE staging_property (
+        seq bigint, property_link text, title text, address text, street text, city text, state text,
+        zip_code text, property_reviews double precision, listing_verification text, lease_option text,
+        year_built integer, validation_status text, property_type text, timestamp timestamp
+    ) ON COMMIT DROP
+    ''',
+    '''
+    CREATE TEMP TABLE staging_floor_plan (
+        seq bigint, property_link text, apartment_name text, rent_price_range text, bedrooms integer,
+        bathrooms double precision, sqft integer, unit text, base_rent double precision, availability text,
+        details_link text
+    ) ON COMMIT DROP
+    ''',
+]
+
+MERGE_PROPERTY_SQL = f'''
+    INSERT INTO property ({', '.join(PROPERTY_COLUMNS)})
+    SELECT DISTINCT ON (property_link) {', '.join(PROPERTY_COLUMNS)}
+    FROM staging_property
+    ORDER BY property_link, seq DESC
+    ON CONFLICT (property_link) DO UPDATE SET
+        {', '.join(f'{column} = EXCLUDED.{column}' for column in PROPERTY_COLUMNS if column != 'property_link')}
+    RETURNING (xmax = 0) AS inserted
+'''
+
+DELETE_FLOOR_PLANS_SQL = '''
+    DELETE FROM pricing_and_floor_plans f
+    USING property p
+    WHERE f.property_id = p.id
+      AND p.property_link IN (SELECT property_link FROM staging_property)
+'''
+
+# Only the floor plans that came with the winning copy of each listing
+INSERT_FLOOR_PLANS_SQL = f'''
+    INSERT INTO pricing_and_floor_plans (property_id, {', '.join(FLOOR_PLAN_COLUMNS)})
+    SELECT p.id, {', '.join(f's.{column}' for column in FLOOR_PLAN_COLUMNS)}
+    FROM staging_floor_plan s
+    JOIN (SELECT property_link, max(seq) AS seq FROM staging_property GROUP BY property_link) latest
+      ON latest.property_link = s.property_link AND latest.seq = s.seq
+    JOIN property p ON p.property_link = s.property_link
+'''
+
+
+def iter_chunks(listings: Iterable[dict], size: int = CHUNK_SIZE) -> Iterator[list[tuple[int, dict]]]:
+    """Groups listings into chunks of (seq, listing) pairs."""
+    chunk = []
+    for seq, prop_data in enumerate(listings):
+        chunk.append((seq, prop_data))
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def staging_records(chunk: list[tuple[int, dict]], now_utc_naive: datetime) -> tuple[list[tuple], list[tuple]]:
+    """Normalises a chunk of listings into staging_property and staging_floor_plan records."""
+    property_records, floor_plan_keys, floor_plans = [], [], []
+    for seq, prop_data in chunk:
+        if not prop_data.get('property_link'):
+            logger.warning(f"Skipping property due to missing property_link: {prop_data.get('title', 'N/A')}")
+            continue
+        row = property_row(prop_data, now_utc_naive)
+        property_records.append((seq,) + tuple(row[column] for column in PROPERTY_COLUMNS))
+        for fp_data in prop_data.get('pricing_and_floor_plans', []):
+            floor_plan_keys.append((seq, prop_data['property_link']))
+            floor_plans.append(fp_data)
+
+    # The chunk's floor plans are parsed a column at a time rather than value by value
+    numeric_fields = ('bedrooms', 'bathrooms', 'sqft', 'base_rent')
+    parsed = parse_numeric_columns(floor_plans, numeric_fields)
+    numeric_columns = {
+        field: to_optional_list(parsed[field].min, integer=NUMERIC_FIELDS[field]) for field in numeric_fields
+    }
+    floor_plan_records = []
+    for i, (key, fp_data) in enumerate(zip(floor_plan_keys, floor_plans)):
+        floor_plan_records.append(key + tuple(
+            numeric_columns[column][i] if column in numeric_columns else fp_data.get(column)
+            for column in FLOOR_PLAN_COLUMNS))
+    return property_records, floor_plan_records
+
+
+async def copy_load(listings: Iterable[dict], chunk_size: int = CHUNK_SIZE) -> dict:
+    """COPYs the listings into staging tables and merges them into the live tables in one transaction."""
+    if engine.dialect.name != 'postgresql':
+        raise RuntimeError(
+            f"COPY bulk load needs PostgreSQL, not {engine.dialect.name}; use db_ops.bulk_save_scraped_data_to_db")
+
+    # The merge's ON CONFLICT (property_link) needs the unique index of migration 0001
+    await create_db_and_tables()
+    started = time.perf_counter()
+    now_utc_naive = datetime.utcnow()
+    staged_rows = 0
+    async with engine.connect() as sa_connection:
+        # The asyncpg connection underneath the SQLAlchemy pool, for copy_records_to_table
+        connection = (await sa_connection.get_raw_connection()).driver_connection
+        async with connection.transaction():
+            for statement in CREATE_STAGING_SQL:
+                await connection.execute(statement)
+            for chunk in iter_chunks(listings, chunk_size):
+                property_records, floor_plan_records = staging_records(chunk, now_utc_naive)
+                await connection.copy_records_to_table(
+                    'staging_property', records=property_records, columns=('seq',) + PROPERTY_COLUMNS)
+                await connection.copy_records_to_table(
+                    'staging_floor_plan', records=floor_plan_records,
+                    columns=('seq', 'property_link') + FLOOR_PLAN_COLUMNS)
+                staged_rows += len(property_records) + len(floor_plan_records)
+            copied = time.perf_counter()
+            # The merge joins staging_property on property_link; give the planner real row counts
+            await connection.execute("ANALYZE staging_property")
+            await connection.execute("ANALYZE staging_floor_plan")
+
+            merged = await connection.fetch(MERGE_PROPERTY_SQL)
+            await connection.execute(DELETE_FLOOR_PLANS_SQL)
+            floor_plans_status = await connection.execute(INSERT_FLOOR_PLANS_SQL)
+        # After the merge commits, like db_ops.bump_data_version, so the API's search cache picks it up
+        await connection.execute(BUMP_DATA_VERSION_SQL)
+    await refresh_analytics_summary()
+
+    inserted = sum(1 for record in merged if record['inserted'])
+    counts = {
+        'properties_inserted': inserted,
+        'properties_updated': len(merged) - inserted,
+        'floor_plans': int(floor_plans_status.split()[-1]),  # "INSERT 0 <rows>"
+        'copy_seconds': copied - started,
+        'total_seconds': time.perf_counter() - started,
+    }
+    logger.info(
+        f"Bulk load: {counts['properties_inserted']} properties inserted, {counts['properties_updated']} updated, "
+        f"{counts['floor_plans']} floor plans in {counts['total_seconds']:.2f}s "
+        f"({staged_rows} staged rows, COPY {counts['copy_seconds']:.2f}s)")
+    return counts
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Backfill scrape dumps into PostgreSQL with COPY and a set-based merge")
+    parser.add_argument('dumps', nargs='+', help="Scrape dumps, e.g. apartments_data.json or an NDJSON .jsonl")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Listings per COPY round")
+    args = parser.parse_args()
+
+    asyncio.run(copy_load(iter_dump_listings(args.dumps), chunk_size=args.chunk_size))
@@ -1,18 +1,33 @@
+import io
 import os
+import csv
+import json
+import time
+import base64
 import logging
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional, List, Annotated
+from typing import Optional, List, Dict, Annotated, Literal
 
-from fastapi import FastAPI, Depends, Header, HTTPException
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, Path
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 
-from sqlmodel import SQLModel, select
+from sqlmodel import SQLModel, select, func, case
+from sqlalchemy import text, tuple_, exists
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
+from sqlalchemy.ext.asyncio import AsyncEngine
 from sqlalchemy.orm import sessionmaker
 from contextlib import asynccontextmanager
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from dotenv import load_dotenv
-from dbmodels import Property, Pricing_and_floor_plans
+from db_engine import get_engine, dispose_engines
+from dbmodels import (
+    Property, Pricing_and_floor_plans, Rent_observation, Data_version, Rent_summary, Top_floor_plan,
+    create_rent_observation_partition, rent_partition_months
+)
+from analytics import TOP_K, ALL_CITIES, ANALYTICS_VERSION, city_key
+from schema_migrations import apply_migrations
 from prometheus_client import Counter, Histogram, generate_latest
 from starlette.responses import Response
 
@@ -22,6 +37,7 @@ import pandas as pd
 
 REQUEST_COUNT = Counter("api_request_total", "Total API Request", ["endpoint"])
 REQUEST_LATENCY = Histogram("api_request_latency_seconds", "Request latency")
+SEARCH_CACHE_REQUESTS = Counter("api_search_cache_requests_total", "Property searches by cache result", ["result"])
 
 load_dotenv()
 
@@ -42,7 +58,8 @@ if not DATABASE_URL:
     logging.critical(f"DATABASE_URL environment variable is not set.")
     raise ValueError("DATABASE_URL environment variable is not set. Please set it to your PostgreSQL database URL.")
 
-engine: AsyncEngine = create_async_engine(DATABASE_URL, echo=False, future=True)
+# The 'api' pool, sized for many short reads and separate from the ingest writers' pool (db_engine.py)
+engine: AsyncEngine = get_engine('api', DATABASE_URL)
 
 async_session_maker = sessionmaker(
     engine, expire_on_commit=False, class_=AsyncSession
@@ -57,7 +74,12 @@ async def get_session() -> AsyncSession:
 async def create_db_and_tables():
     async with engine.begin() as conn:
         await conn.run_sync(SQLModel.metadata.create_all)
+        await conn.run_sync(apply_migrations)
         logging.info('create_db_table function performed successfully')
+    # Each partition in its own committed transaction, like db_ops.ensure_rent_partitions
+    for month in rent_partition_months(datetime.utcnow().date()):
+        async with engine.begin() as conn:
+            await conn.run_sync(create_rent_observation_partition, month)
 
 
 # -------------------------
@@ -88,13 +110,63 @@ class PropertyRead(BaseModel):
 class FloorPlanRead(BaseModel):
     id: int
     property_id: int
-    bedrooms: int
+    bedrooms: Optional[int]  # None when the listing didn't say
+    base_rent: Optional[float]  # None for "Call for Rent"
+
+    class Config:
+        from_attributes = True
+
+
+# Upper bound of property_ids per /properties/floor-plans/batch request
+MAX_BATCH_PROPERTY_IDS = 500
+
+
+class FloorPlanBatchRequest(BaseModel):
+    property_ids: List[int] = Field(min_length=1, max_length=MAX_BATCH_PROPERTY_IDS)
+
+
+class FloorPlanBatchRead(BaseModel):
+    floor_plans: Dict[int, List[FloorPlanRead]]  # Every existing requested property, [] if it has no floor plans
+    missing: List[int]  # Requested IDs with no property
+
+
+class RentObservationRead(BaseModel):
+    unit_key: str
+    unit: Optional[str]
+    bedrooms: Optional[int]
     base_rent: float
+    previous_rent: Optional[float]
+    observed_at: datetime
 
     class Config:
         from_attributes = True
 
 
+class CityRentChangeRead(BaseModel):
+    city: str
+    days: int
+    properties: int
+    rent_changes: int
+    increases: int
+    decreases: int
+    average_change_percent: Optional[float]
+
+
+class RentSummaryRead(BaseModel):
+    bedrooms: Optional[int]
+    floor_plans: int
+    min_rent: float
+    median_rent: float
+    p90_rent: float
+    max_rent: float
+
+
+class CityAnalyticsRead(BaseModel):
+    city: str
+    refreshed_at: datetime  # When the summary was last rebuilt (after an ingest run)
+    rents: List[RentSummaryRead]  # One per bedroom count, in bedroom order
+
+
 # -------------------------
 # Global Model
 # -------------------------
@@ -122,6 +194,7 @@ async def lifespan(app: FastAPI):
 
     yield
     logging.info("Application Shutdown: Cleaning up process")
+    await dispose_engines()
 
 
 # -------------------------
@@ -161,6 +234,357 @@ async def metrics():
 logging.info("Prometheus metrics endpoint and middleware attached.")
 
 
+# -------------------------
+# Listing Pagination
+# -------------------------
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+# Columns /all-property-listings returns when no fields= projection is given (the PropertyRead fields)
+DEFAULT_LISTING_FIELDS = ('id', 'title', 'city', 'year_built', 'timestamp')
+LISTING_FIELDS = tuple(Property.__table__.columns.keys())
+# The total count header is an estimate, refreshed at most this often
+COUNT_CACHE_SECONDS = 60
+
+_property_count_cache = {'value': None, 'expires_at': 0.0}
+
+
+def encode_cursor(row, order_by: str) -> str:
+    """Opaque cursor of the last row on a page: its sort key."""
+    key = {'id': row['id']}
+    if order_by == 'timestamp':
+        key['timestamp'] = row['timestamp'].isoformat()
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, order_by: str) -> dict:
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        key['id'] = int(key['id'])
+        if order_by == 'timestamp':
+            key['timestamp'] = datetime.fromisoformat(key['timestamp'])
+        return key
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+# OpenAPI description of /all-property-listings: rows are projected by fields=, so there is no fixed model
+LISTINGS_PAGE_RESPONSE = {
+    200: {
+        "description": "A page of properties, each holding the fields= columns (default: the PropertyRead "
+                       "fields) plus the sort key",
+        "content": {"application/json": {"schema": {"type": "array", "items": {"type": "object"}}}},
+        "headers": {
+            "X-Next-Cursor": {"description": "Pass as ?cursor= for the next page; absent on the last page",
+                              "schema": {"type": "string"}},
+            "X-Total-Count": {"description": "Estimated number of properties", "schema": {"type": "integer"}},
+        },
+    },
+}
+
+
+def listing_columns(fields: Optional[str], order_by: str) -> list[str]:
+    """Columns to select for a fields= projection; the sort key is always included so the cursor can be built."""
+    requested = [field.strip() for field in fields.split(',') if field.strip()] if fields else list(DEFAULT_LISTING_FIELDS)
+    unknown = [field for field in requested if field not in LISTING_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown fields {unknown}; choose from {list(LISTING_FIELDS)}")
+    sort_key = ['id', 'timestamp'] if order_by == 'timestamp' else ['id']
+    return list(dict.fromkeys(requested + sort_key))
+
+
+async def estimated_property_count(session: AsyncSession) -> int:
+    """
+    Row count of property for the X-Total-Count header. On PostgreSQL the planner's estimate (pg_class.reltuples)
+    is used instead of a full count(*); either way the value is cached for COUNT_CACHE_SECONDS.
+    """
+    if _property_count_cache['value'] is not None and time.monotonic() < _property_count_cache['expires_at']:
+        return _property_count_cache['value']
+    count = None
+    if session.bind.dialect.name == 'postgresql':
+        count = (await session.exec(text("SELECT reltuples::bigint FROM pg_class WHERE relname = 'property'"))).scalar()
+    if count is None or count < 0:  # reltuples is -1 until the table has been vacuumed or analyzed
+        count = (await session.exec(select(func.count()).select_from(Property))).one()
+    _property_count_cache.update(value=count, expires_at=time.monotonic() + COUNT_CACHE_SECONDS)
+    return count
+
+
+# -------------------------
+# Export
+# -------------------------
+# Rows fetched from the server-side cursor per round, and roughly the rows in each streamed chunk
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_PROPERTY_COLUMNS = (
+    'id', 'property_link', 'title', 'address', 'street', 'city', 'state', 'zip_code', 'property_reviews',
+    'listing_verification', 'lease_option', 'year_built', 'property_type', 'timestamp',
+)
+EXPORT_FLOOR_PLAN_COLUMNS = (
+    'id', 'apartment_name', 'rent_price_range', 'bedrooms', 'bathrooms', 'sqft', 'unit', 'base_rent',
+    'availability', 'details_link',
+)
+# CSV has one row per floor plan, the property's columns repeated in front of the floor plan's
+EXPORT_CSV_HEADER = list(EXPORT_PROPERTY_COLUMNS) + [f"floor_plan_{column}" for column in EXPORT_FLOOR_PLAN_COLUMNS]
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+async def stream_export(statement, export_format: str):
+    """
+    Streams the export statement's rows as NDJSON (one property per line, floor plans nested) or CSV.
+    Opens its own session: a dependency's session is already closed while a StreamingResponse is sent.
+    Rows are ordered by property, so a property is complete when the next one starts and memory stays
+    at one fetch of EXPORT_CHUNK_SIZE rows.
+    """
+    property_width = len(EXPORT_PROPERTY_COLUMNS)
+    if export_format == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_CSV_HEADER)
+        yield buffer.getvalue()  # The first byte goes out before the query has even run
+
+    async with async_session_maker() as session:
+        result = await session.stream(statement.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+        current = None
+        async for rows in result.partitions():
+            if export_format == 'csv':
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows(rows)
+                yield buffer.getvalue()
+                continue
+
+            lines = []
+            for row in rows:
+                if current is None or current['id'] != row[0]:
+                    if current is not None:
+                        lines.append(json.dumps(current, default=_json_default))
+                    current = dict(zip(EXPORT_PROPERTY_COLUMNS, row[:property_width]))
+                    current['pricing_and_floor_plans'] = []
+                if row[property_width] is not None:  # Outer join: a property without floor plans
+                    current['pricing_and_floor_plans'].append(
+                        dict(zip(EXPORT_FLOOR_PLAN_COLUMNS, row[property_width:])))
+            if lines:
+                yield '\n'.join(lines) + '\n'
+        if current is not None:
+            yield json.dumps(current, default=_json_default) + '\n'
+
+
+# -------------------------
+# Search Cache
+# -------------------------
+SEARCH_CACHE_SIZE = 256
+# How long a read of the listings data version is trusted; 0 re-reads it on every search
+SEARCH_VERSION_TTL_SECONDS = 1.0
+
+
+class SearchCache:
+    """
+    LRU of search results keyed by the normalised filters. Every entry belongs to one listings data version
+    (dbmodels.Data_version); the ingest paths bump it after each commit, which retires every older entry.
+    """
+
+    def __init__(self, max_entries: int = SEARCH_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, key: tuple, version: int):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version:
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: tuple, version: int, value):
+        self._entries[key] = (version, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+search_cache = SearchCache()
+_listings_version = {'value': None, 'checked_at': float('-inf')}
+
+
+async def listings_data_version(session: AsyncSession) -> Optional[int]:
+    """The current listings data version, re-read at most every SEARCH_VERSION_TTL_SECONDS."""
+    if time.monotonic() - _listings_version['checked_at'] >= SEARCH_VERSION_TTL_SECONDS:
+        result = await session.exec(select(Data_version.version).where(Data_version.name == 'listings'))
+        _listings_version.update(value=result.first(), checked_at=time.monotonic())
+    return _listings_version['value']
+
+
+def _escape_like(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+# -------------------------
+# Query Builders
+# -------------------------
+# The routes' statements, kept separate so explain_routes.py can print the plan of exactly what a route runs
+def listings_page_statement(columns: List[str] = DEFAULT_LISTING_FIELDS, order_by: str = 'id',
+                            after: Optional[dict] = None, limit: int = DEFAULT_PAGE_SIZE):
+    """
+    One page of properties, only the requested columns. Keyset pagination: the page starts after the cursor's
+    sort key, so a deep page costs the same as the first one. id pages run oldest first, timestamp pages newest first.
+    """
+    statement = select(*(Property.__table__.c[column] for column in columns))
+    if order_by == 'timestamp':
+        if after:
+            statement = statement.where(tuple_(Property.timestamp, Property.id) < (after['timestamp'], after['id']))
+        statement = statement.order_by(Property.timestamp.desc(), Property.id.desc())
+    else:
+        if after:
+            statement = statement.where(Property.id > after['id'])
+        statement = statement.order_by(Property.id)
+    return statement.limit(limit)
+
+
+def floor_plans_batch_statement(property_ids: List[int]):
+    """
+    Floor plans of many properties in one query. Properties are outer-joined, so an ID that exists without
+    floor plans still comes back (with None) and the existence check needs no second query.
+    """
+    return (
+        select(Property.id, Pricing_and_floor_plans)
+        .join(Pricing_and_floor_plans, isouter=True)
+        .where(Property.id.in_(property_ids))
+        .order_by(Property.id, Pricing_and_floor_plans.id)
+    )
+
+
+def group_floor_plans(rows, property_ids: List[int]) -> tuple[Dict[int, list], List[int]]:
+    """Groups floor_plans_batch_statement rows by property, in request order, and lists the IDs that don't exist."""
+    found = {}
+    for property_id, floor_plan in rows:
+        plans = found.setdefault(property_id, [])
+        if floor_plan is not None:
+            plans.append(floor_plan)
+    grouped = {property_id: found[property_id] for property_id in property_ids if property_id in found}
+    return grouped, [property_id for property_id in property_ids if property_id not in found]
+
+
+def price_history_statement(property_id: int, unit: Optional[str] = None, since: Optional[datetime] = None,
+                            until: Optional[datetime] = None):
+    statement = select(Rent_observation).where(Rent_observation.property_id == property_id)
+    if unit:
+        statement = statement.where(Rent_observation.unit == unit)
+    if since:
+        statement = statement.where(Rent_observation.observed_at >= since)
+    if until:
+        statement = statement.where(Rent_observation.observed_at < until)
+    return statement.order_by(Rent_observation.unit_key, Rent_observation.observed_at)
+
+
+def city_rent_change_statement(city: str, window_start: datetime):
+    change_percent = (Rent_observation.base_rent - Rent_observation.previous_rent) / Rent_observation.previous_rent * 100
+    return (
+        select(
+            func.count(func.distinct(Rent_observation.property_id)),
+            func.count(Rent_observation.previous_rent),
+            func.count(case((Rent_observation.base_rent > Rent_observation.previous_rent, 1))),
+            func.count(case((Rent_observation.base_rent < Rent_observation.previous_rent, 1))),
+            func.avg(case((Rent_observation.previous_rent > 0, change_percent))),
+        )
+        .where(func.lower(Rent_observation.city) == city.lower())
+        .where(Rent_observation.observed_at >= window_start)
+    )
+
+
+def search_statement(city: Optional[str] = None, min_bedrooms: Optional[int] = None,
+                     max_base_rent: Optional[float] = None, year_built: Optional[int] = None,
+                     city_match: str = 'contains', sort: str = 'id', limit: int = DEFAULT_PAGE_SIZE, offset: int = 0):
+    """
+    Properties matching the filters, one page in a deterministic order (ties broken by id).
+    Floor plan filters are a semi-join: a property matches when one of its floor plans satisfies all of them,
+    found through the (property_id, base_rent) index without joining and regrouping every floor plan row.
+    City matching is on lower(city): 'exact' and 'prefix' use its indexes, 'contains' the trigram index.
+    """
+    statement = select(*(Property.__table__.c[column] for column in DEFAULT_LISTING_FIELDS))
+
+    if city:
+        normalised_city = city.strip().lower()
+        if city_match == 'exact':
+            statement = statement.where(func.lower(Property.city) == normalised_city)
+        elif city_match == 'prefix':
+            statement = statement.where(func.lower(Property.city).like(f"{_escape_like(normalised_city)}%", escape='\\'))
+        else:
+            statement = statement.where(Property.city.ilike(f"%{_escape_like(normalised_city)}%", escape='\\'))
+    if year_built is not None:
+        statement = statement.where(Property.year_built == year_built)
+
+    floor_plan_filters = []
+    if min_bedrooms is not None:
+        floor_plan_filters.append(Pricing_and_floor_plans.bedrooms >= min_bedrooms)
+    if max_base_rent is not None:
+        floor_plan_filters.append(Pricing_and_floor_plans.base_rent <= max_base_rent)
+    if floor_plan_filters:
+        statement = statement.where(exists().where(Pricing_and_floor_plans.property_id == Property.id,
+                                                   *floor_plan_filters))
+
+    if sort == 'newest':
+        statement = statement.order_by(Property.timestamp.desc(), Property.id.desc())
+    elif sort == 'year_built':
+        statement = statement.order_by(Property.year_built.desc().nulls_last(), Property.id)
+    elif sort == 'rent':
+        # Cheapest floor plan that matches the floor plan filters
+        cheapest = (select(func.min(Pricing_and_floor_plans.base_rent))
+                    .where(Pricing_and_floor_plans.property_id == Property.id, *floor_plan_filters)
+                    .scalar_subquery())
+        statement = statement.order_by(cheapest.asc().nulls_last(), Property.id)
+    else:
+        statement = statement.order_by(Property.id)
+    return statement.limit(limit).offset(offset)
+
+
+def top_floor_plans_statement(x: int, most_expensive: bool = False):
+    """Live ranking over pricing_and_floor_plans; only used until the analytics summary is first built."""
+    order = Pricing_and_floor_plans.base_rent.desc() if most_expensive else Pricing_and_floor_plans.base_rent.asc()
+    return (select(Pricing_and_floor_plans)
+            .where(Pricing_and_floor_plans.base_rent.is_not(None))
+            .order_by(order, Pricing_and_floor_plans.id).limit(x))
+
+
+def ranked_floor_plans_statement(x: int, ranking: str = 'cheapest', city: Optional[str] = None):
+    """The first x rows of a precomputed ranking (analytics.py), across all cities or in one: a primary key range."""
+    return (
+        select(Top_floor_plan.floor_plan_id.label('id'), Top_floor_plan.property_id, Top_floor_plan.bedrooms,
+               Top_floor_plan.base_rent)
+        .where(Top_floor_plan.city_key == (city_key(city) if city else ALL_CITIES),
+               Top_floor_plan.ranking == ranking, Top_floor_plan.rank <= x)
+        .order_by(Top_floor_plan.rank)
+    )
+
+
+def rent_summary_statement(city: str):
+    return (select(Rent_summary)
+            .where(Rent_summary.city_key == city_key(city))
+            .order_by(Rent_summary.bedrooms.asc().nulls_last()))
+
+
+def export_statement(city: Optional[str] = None, state: Optional[str] = None,
+                     updated_since: Optional[datetime] = None):
+    """Properties outer-joined with their floor plans, in property order, for stream_export."""
+    statement = (
+        select(*(Property.__table__.c[column] for column in EXPORT_PROPERTY_COLUMNS),
+               *(Pricing_and_floor_plans.__table__.c[column] for column in EXPORT_FLOOR_PLAN_COLUMNS))
+        .join(Pricing_and_floor_plans, isouter=True)
+    )
+    if city:
+        statement = statement.where(func.lower(Property.city) == city.lower())
+    if state:
+        statement = statement.where(func.upper(Property.state) == state.upper())
+    if updated_since:
+        statement = statement.where(Property.timestamp >= updated_since)
+    return statement.order_by(Property.id, Pricing_and_floor_plans.id)
+
+
+def listings_since_statement(since: datetime):
+    return select(Property).where(Property.timestamp >= since)
+
+
 # -------------------------
 # Routes
 # -------------------------
@@ -169,13 +593,28 @@ async def welcome():
     return {"Message": "Welcome to the Real estate API"}
 
 
-@app.get("/all-property-listings", response_model=List[PropertyRead], tags=["Properties"])
+@app.get("/all-property-listings", response_model=None, responses=LISTINGS_PAGE_RESPONSE, tags=["Properties"])
 async def get_listings(
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
+        order_by: Literal['id', 'timestamp'] = 'id',
+        fields: Optional[str] = Query(None, description="Comma-separated property columns, e.g. id,title,city"),
         session: AsyncSession = Depends(get_session),
         is_authorized: str = Depends(Authorisation())
 ):
-    result = await session.exec(select(Property))
-    return result.all()
+    """
+    A page of properties. Pass the X-Next-Cursor header of a page as ?cursor= to get the next one;
+    it is absent on the last page. X-Total-Count is an estimate of all properties.
+    """
+    columns = listing_columns(fields, order_by)
+    after = decode_cursor(cursor, order_by) if cursor else None
+    rows = (await session.exec(listings_page_statement(columns, order_by, after, limit))).mappings().all()
+
+    headers = {'X-Total-Count': str(await estimated_property_count(session))}
+    if len(rows) == limit:
+        headers['X-Next-Cursor'] = encode_cursor(rows[-1], order_by)
+    # Rows go out as selected; no ORM objects and no per-row PropertyRead validation
+    return JSONResponse(content=jsonable_encoder([dict(row) for row in rows]), headers=headers)
 
 
 @app.get("/properties/{property_id}/floor-plans", response_model=List[FloorPlanRead], tags=["Floor Plans"])
@@ -184,16 +623,64 @@ async def get_floor_plans(
         session: AsyncSession = Depends(get_session),
         is_authorized: str = Depends(Authorisation())
 ):
-    property_exists = await session.exec(select(Property).where(Property.id == property_id))
+    rows = (await session.exec(floor_plans_batch_statement([property_id]))).all()
+    floor_plans, missing = group_floor_plans(rows, [property_id])
+    if missing:
+        raise HTTPException(status_code=404, detail="Property with that ID is not available")
+    return floor_plans[property_id]
+
+
+@app.post("/properties/floor-plans/batch", response_model=FloorPlanBatchRead, tags=["Floor Plans"])
+async def get_floor_plans_batch(
+        request: FloorPlanBatchRequest,
+        session: AsyncSession = Depends(get_session),
+        is_authorized: str = Depends(Authorisation())
+):
+    """
+    Floor plans of up to MAX_BATCH_PROPERTY_IDS properties from a single query, grouped by property ID.
+    Unknown IDs are listed under `missing` instead of failing the request.
+    """
+    property_ids = list(dict.fromkeys(request.property_ids))
+    rows = (await session.exec(floor_plans_batch_statement(property_ids))).all()
+    floor_plans, missing = group_floor_plans(rows, property_ids)
+    return FloorPlanBatchRead(floor_plans=floor_plans, missing=missing)
+
+
+@app.get("/properties/{property_id}/price-history", response_model=List[RentObservationRead], tags=["Rent History"])
+async def get_price_history(
+        property_id: int,
+        unit: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        session: AsyncSession = Depends(get_session),
+        is_authorized: str = Depends(Authorisation())
+):
+    """Rent changes of a property, or of one of its units, in time order. Served from the (property_id, observed_at) index."""
+    property_exists = await session.exec(select(Property.id).where(Property.id == property_id))
     if not property_exists.first():
         raise HTTPException(status_code=404, detail="Property with that ID is not available")
 
-    result = await session.exec(
-        select(Pricing_and_floor_plans).where(Pricing_and_floor_plans.property_id == property_id)
-    )
+    result = await session.exec(price_history_statement(property_id, unit, since, until))
     return result.all()
 
 
+@app.get("/cities/{city}/rent-change", response_model=CityRentChangeRead, tags=["Rent History"])
+async def get_city_rent_change(
+        city: str,
+        days: int = Query(30, ge=1, le=365),
+        session: AsyncSession = Depends(get_session),
+        is_authorized: str = Depends(Authorisation())
+):
+    """Rent changes recorded in a city over the last `days` days. Served from the (lower(city), observed_at) index."""
+    window_start = datetime.utcnow() - timedelta(days=days)
+    statement = city_rent_change_statement(city, window_start)
+    properties, rent_changes, increases, decreases, average_change = (await session.exec(statement)).one()
+    return CityRentChangeRead(
+        city=city, days=days, properties=properties, rent_changes=rent_changes, increases=increases,
+        decreases=decreases, average_change_percent=round(average_change, 2) if average_change is not None else None,
+    )
+
+
 @app.get("/properties/search", response_model=List[PropertyRead], tags=["Properties"])
 async def search_properties(
         session: AsyncSession = Depends(get_session),
@@ -202,46 +689,91 @@ async def search_properties(
         min_bedrooms: Optional[int] = None,
         max_base_rent: Optional[float] = None,
         year_built: Optional[int] = None,
+        city_match: Literal['contains', 'prefix', 'exact'] = 'contains',
+        sort: Literal['id', 'newest', 'year_built', 'rent'] = 'id',
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        offset: int = Query(0, ge=0),
 ):
-    statement = select(Property).join(Pricing_and_floor_plans, isouter=True)
-
-    if city:
-        statement = statement.where(Property.city.ilike(f"%{city}%"))
-    if min_bedrooms is not None:
-        statement = statement.where(Pricing_and_floor_plans.bedrooms >= min_bedrooms)
-    if max_base_rent is not None:
-        statement = statement.where(Pricing_and_floor_plans.base_rent <= max_base_rent)
-    if year_built is not None:
-        statement = statement.where(Property.year_built == year_built)
-
-    statement = statement.group_by(Property.id)
-
-    result = await session.exec(statement)
-    return result.all()
+    """
+    Properties matching every given filter; min_bedrooms and max_base_rent must hold for the same floor plan.
+    city matches anywhere in the city name (city_match=contains); prefix and exact are cheaper on large tables.
+    Results are cached until the next ingest commit; X-Cache says whether this one came from the cache.
+    """
+    key = (city.strip().lower() if city else None, min_bedrooms, max_base_rent, year_built,
+           city_match, sort, limit, offset)
+    version = await listings_data_version(session)
+    content = search_cache.get(key, version) if version is not None else None
+    SEARCH_CACHE_REQUESTS.labels(result='hit' if content is not None else 'miss').inc()
+
+    if content is None:
+        statement = search_statement(city, min_bedrooms, max_base_rent, year_built, city_match, sort, limit, offset)
+        rows = (await session.exec(statement)).mappings().all()
+        content = jsonable_encoder([dict(row) for row in rows])
+        if version is not None:
+            search_cache.put(key, version, content)
+        return JSONResponse(content=content, headers={'X-Cache': 'miss'})
+    return JSONResponse(content=content, headers={'X-Cache': 'hit'})
+
+
+async def analytics_built(session: AsyncSession) -> bool:
+    """Whether analytics.refresh_analytics() has run on this database."""
+    version = (await session.exec(select(Data_version.version).where(Data_version.name == ANALYTICS_VERSION))).first()
+    return bool(version)
+
+
+async def ranked_floor_plans(session: AsyncSession, x: int, ranking: str) -> list:
+    rows = (await session.exec(ranked_floor_plans_statement(x, ranking))).mappings().all()
+    if not rows and not await analytics_built(session):
+        # A database ingested before the summary existed; served live until the next ingest run builds it
+        result = await session.exec(top_floor_plans_statement(x, most_expensive=ranking == 'most_expensive'))
+        return result.all()
+    return rows
 
 
 @app.get("/top/{x}/most-affordable-properties", response_model=List[FloorPlanRead], tags=["Analytics"])
 async def get_top_x_most_affordable_properties(
-        x: int,
+        x: int = Path(ge=1, le=TOP_K),
         session: AsyncSession = Depends(get_session),
         is_authorized: str = Depends(Authorisation())
 ):
-    result = await session.exec(
-        select(Pricing_and_floor_plans).order_by(Pricing_and_floor_plans.base_rent.asc()).limit(x)
-    )
-    return result.all()
+    """The x cheapest floor plans, from the summary rebuilt after each ingest run."""
+    return await ranked_floor_plans(session, x, 'cheapest')
 
 
 @app.get("/top/{x}/most-expensive-properties", response_model=List[FloorPlanRead], tags=["Analytics"])
 async def get_top_x_most_expensive_properties(
-        x: int,
+        x: int = Path(ge=1, le=TOP_K),
         session: AsyncSession = Depends(get_session),
         is_authorized: str = Depends(Authorisation())
 ):
-    result = await session.exec(
-        select(Pricing_and_floor_plans).order_by(Pricing_and_floor_plans.base_rent.desc()).limit(x)
-    )
-    return result.all()
+    """The x most expensive floor plans, from the summary rebuilt after each ingest run."""
+    return await ranked_floor_plans(session, x, 'most_expensive')
+
+
+@app.get("/analytics/city/{city}", response_model=CityAnalyticsRead, tags=["Analytics"])
+async def get_city_analytics(
+        city: str,
+        session: AsyncSession = Depends(get_session),
+        is_authorized: str = Depends(Authorisation())
+):
+    """Rent min/median/p90/max per bedroom count in a city (case-insensitive)."""
+    summaries = (await session.exec(rent_summary_statement(city))).all()
+    if not summaries:
+        raise HTTPException(status_code=404, detail="No rent summary for that city")
+    return CityAnalyticsRead(city=summaries[0].city, refreshed_at=summaries[0].refreshed_at,
+                             rents=[RentSummaryRead.model_validate(summary, from_attributes=True) for summary in summaries])
+
+
+@app.get("/analytics/city/{city}/top", response_model=List[FloorPlanRead], tags=["Analytics"])
+async def get_city_top_floor_plans(
+        city: str,
+        ranking: Literal['cheapest', 'most_expensive'] = 'cheapest',
+        limit: int = Query(10, ge=1, le=TOP_K),
+        session: AsyncSession = Depends(get_session),
+        is_authorized: str = Depends(Authorisation())
+):
+    """The cheapest or most expensive floor plans in a city, from the summary rebuilt after each ingest run."""
+    return (await session.exec(ranked_floor_plans_statement(limit, ranking, city))).mappings().all()
 
 
 @app.get("/this-weeks-listings", response_model=List[PropertyRead], tags=["Properties"])
@@ -250,10 +782,30 @@ async def get_this_weeks_listings(
         is_authorized: str = Depends(Authorisation())
 ):
     one_week_ago = datetime.now() - timedelta(days=7)
-    result = await session.exec(select(Property).where(Property.timestamp >= one_week_ago))
+    result = await session.exec(listings_since_statement(one_week_ago))
     return result.all()
 
 
+@app.get("/export/listings", tags=["Export"])
+async def export_listings(
+        format: Literal['ndjson', 'csv'] = 'ndjson',
+        city: Optional[str] = None,
+        state: Optional[str] = None,
+        updated_since: Optional[datetime] = None,
+        is_authorized: str = Depends(Authorisation())
+):
+    """
+    Every matching property with its floor plans in one streamed response, instead of a listing page plus a
+    floor plan request per property. NDJSON has one property per line; CSV has one row per floor plan.
+    """
+    media_type = 'application/x-ndjson' if format == 'ndjson' else 'text/csv'
+    return StreamingResponse(
+        stream_export(export_statement(city, state, updated_since), format),
+        media_type=media_type,
+        headers={'Content-Disposition': f'attachment; filename="listings.{format}"'},
+    )
+
+
 # loading model from joblib and exposing the predictions
 @app.get("/predict-rent", response_model=float, tags=["Prediction"])
 async def predict_rent(
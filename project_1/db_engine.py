@@ -0,0 +1,124 @@
+import os
+import time
+import logging
+from typing import Optional
+
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
+
+from metrics import DB_POOL_CHECKED_OUT, DB_POOL_OVERFLOW, DB_POOL_CHECKOUT_SECONDS, DB_POOL_TIMEOUTS
+
+logger = logging.getLogger(__name__)
+
+'''--- Database Engines ---
+One async engine per workload, so API reads and ingest writes never queue behind each other's connections:
+  - 'api': db_app.py, many short reads, fails fast when the pool is exhausted
+  - 'ingest': db_ops.py, bulk_load.py and the scraper's streaming writer, few long write transactions
+Pool settings per role come from POOL_SETTINGS and can be overridden with environment variables named
+DB_<ROLE>_<SETTING>, e.g. DB_API_POOL_SIZE=20 or DB_INGEST_STATEMENT_CACHE_SIZE=0 (needed behind pgbouncer
+in transaction mode). Pools report checked-out connections, overflow and checkout time to Prometheus.
+'''
+
+
+class PoolSettings:
+    """Connection pool settings of one engine role."""
+
+    def __init__(self, pool_size: int = 5, max_overflow: int = 10, pool_timeout: float = 30.0,
+                 pool_recycle: int = 1800, pre_ping: bool = True, statement_cache_size: int = 100):
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_timeout = pool_timeout  # Seconds to wait for a free connection before TimeoutError
+        self.pool_recycle = pool_recycle  # Seconds before a connection is replaced, below server/proxy idle timeouts
+        self.pre_ping = pre_ping  # Test connections on checkout, so a restarted database doesn't fail the next request
+        self.statement_cache_size = statement_cache_size  # asyncpg prepared statements kept per connection
+
+    def __repr__(self):
+        return f"PoolSettings({', '.join(f'{key}={value!r}' for key, value in vars(self).items())})"
+
+
+POOL_SETTINGS = {
+    # Requests should get an error quickly rather than pile up behind a saturated pool
+    'api': PoolSettings(pool_size=10, max_overflow=10, pool_timeout=5.0),
+    # Ingest batches hold a connection for a whole transaction; a few are enough and may wait longer
+    'ingest': PoolSettings(pool_size=4, max_overflow=2, pool_timeout=60.0),
+}
+
+
+def pool_settings(role: str) -> PoolSettings:
+    """The role's POOL_SETTINGS with DB_<ROLE>_<SETTING> environment overrides applied."""
+    settings = POOL_SETTINGS.get(role, PoolSettings())
+    overrides = {}
+    for key, default in vars(settings).items():
+        value = os.getenv(f"DB_{role.upper()}_{key.upper()}")
+        if value is None:
+            continue
+        if isinstance(default, bool):
+            overrides[key] = value.lower() in ('1', 'true', 'yes')
+        else:
+            overrides[key] = type(default)(value)
+    return PoolSettings(**{**vars(settings), **overrides})
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that reports its saturation to Prometheus, labelled with the pool's logging name."""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            DB_POOL_TIMEOUTS.labels(pool=self.logging_name).inc()
+            raise
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.labels(pool=self.logging_name).observe(time.perf_counter() - started)
+            self._report_usage()
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        self._report_usage()
+
+    def _report_usage(self):
+        DB_POOL_CHECKED_OUT.labels(pool=self.logging_name).set(self.checkedout())
+        # overflow() counts down from -pool_size while the pool itself is still filling
+        DB_POOL_OVERFLOW.labels(pool=self.logging_name).set(max(self.overflow(), 0))
+
+
+def create_engine_for(role: str, database_url: str, settings: Optional[PoolSettings] = None) -> AsyncEngine:
+    """Creates the async engine of a role with its pool settings."""
+    settings = settings or pool_settings(role)
+    url = make_url(database_url)
+    options = {'echo': False, 'pool_pre_ping': settings.pre_ping, 'pool_logging_name': role}
+
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        # In-memory SQLite lives in a single connection (StaticPool); there is nothing to size
+        return create_async_engine(url, **options)
+
+    options.update(poolclass=InstrumentedAsyncQueuePool, pool_size=settings.pool_size,
+                   max_overflow=settings.max_overflow, pool_timeout=settings.pool_timeout,
+                   pool_recycle=settings.pool_recycle)
+    if url.get_driver_name() == 'asyncpg':
+        # SQLAlchemy's own prepared statement cache, and asyncpg's for raw connections (bulk_load's COPY path)
+        url = url.update_query_dict({'prepared_statement_cache_size': str(settings.statement_cache_size)})
+        options['connect_args'] = {'statement_cache_size': settings.statement_cache_size}
+
+    logger.info(f"Creating '{role}' database engine with {settings}")
+    return create_async_engine(url, **options)
+
+
+_engines: dict[str, AsyncEngine] = {}
+
+
+def get_engine(role: str, database_url: str) -> AsyncEngine:
+    """The process-wide engine of a role, created on first use."""
+    if role not in _engines:
+        _engines[role] = create_engine_for(role, database_url)
+    return _engines[role]
+
+
+async def dispose_engines():
+    """Closes every pooled connection, e.g. on application shutdown."""
+    for role, engine in list(_engines.items()):
+        await engine.dispose()
+        del _engines[role]
@@ -1,18 +1,30 @@
 import json
+import hashlib
 import logging
-from datetime import datetime, timezone
-from typing import List, Dict, Any, Optional
+from datetime import datetime, timezone, date
+from typing import List, Dict, Any, Optional, Callable, Iterable
 import os
 import asyncio
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlalchemy.exc import IntegrityError
-from sqlmodel import SQLModel, create_engine, select
+from sqlalchemy.exc import IntegrityError, DBAPIError
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_random_exponential
+from collections import Counter
+from itertools import islice
+from sqlalchemy import insert, update, literal_column, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import SQLModel, create_engine, select, delete
 from dotenv import load_dotenv
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.asyncio import create_async_engine
 
 '''---import your SQLModel models here for the tables---'''
-from dbmodels import Property, Pricing_and_floor_plans
+from parsing import parse_numeric
+from db_engine import get_engine
+from dbmodels import (
+    Property, Pricing_and_floor_plans, Rent_observation, create_rent_observation_partition, rent_partition_months
+)
+from schema_migrations import apply_migrations, lock_migrations
+from analytics import refresh_analytics
+from metrics import DB_INSERT_FAILURES, FLOOR_PLAN_CHANGES, RENT_OBSERVATIONS
 
 # Configure logging for database operations
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -24,8 +36,8 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable is not set. Please set it to your PostgreSQL database URL.")
 
-# Use an async engine for async operations
-engine = create_async_engine(DATABASE_URL, echo=False)
+# Use an async engine for async operations; the 'ingest' pool, separate from the API's (db_engine.py)
+engine = get_engine('ingest', DATABASE_URL)
 
 async_session_maker = sessionmaker(
     engine, expire_on_commit=False, class_=AsyncSession
@@ -46,137 +58,360 @@ async def create_db_and_tables():
     Asynchronously creates all tables defined in SQLModel.
     """
     async with engine.begin() as conn:
+        # create_all races the same way as the migrations when processes start together
+        await conn.run_sync(lock_migrations)
         await conn.run_sync(SQLModel.metadata.create_all)
+        await conn.run_sync(apply_migrations)
+    await ensure_rent_partitions(rent_partition_months(datetime.utcnow().date()))
 
 
 # --- Helper Function for Parsing Scraped Numeric Values ---
 def parse_numeric_value(text: Any) -> Optional[float]:
     """
     Attempts to extract a numeric (float or int) value from a string.
+    Ranges such as "$2,872 – $3,100" give their lower bound; see parsing.py (memoised, precompiled patterns).
     Note: This is not an async function, as it is CPU-bound, not I/O-bound.
     """
-    if text is None:
-        return None
-    if not isinstance(text, str):
-        try:
-            return float(text)
-        except (ValueError, TypeError):
-            return None
+    return parse_numeric(text)
 
-    # Clean the string
-    clean_text = text.replace('Sq Ft', '').replace('Bed', '').replace('Bath', '').replace('+', '').strip()
-    clean_text = clean_text.replace('$', '').replace(',', '').replace('–', '-').strip()
 
-    try:
-        if '-' in clean_text:
-            parts = clean_text.split('-')
-            if parts[0].strip().isdigit():
-                return float(parts[0].strip())
-        return float(clean_text)
-    except ValueError:
-        return None
+# --- Floor Plan Reconciliation ---
+# Instead of deleting and re-inserting every floor plan of an updated property, stored rows are matched to
+# the scraped ones by unit (or details_link, or the plan's descriptors when neither is known). Only new units are
+# inserted, changed ones updated and vanished ones deleted; unchanged rows are not written at all.
+FLOOR_PLAN_RECONCILE = True
+
+FLOOR_PLAN_FIELDS = (
+    'apartment_name', 'rent_price_range', 'bedrooms', 'bathrooms', 'sqft', 'unit', 'base_rent', 'availability',
+    'details_link',
+)
+# Identity of a floor plan with neither unit nor details_link. Only fields that describe the plan itself:
+# a changed rent or availability has to update the row, not replace it with a new one.
+FLOOR_PLAN_IDENTITY_FIELDS = ('apartment_name', 'bedrooms', 'bathrooms', 'sqft')
+
+
+def _as_int(value: Optional[float]) -> Optional[int]:
+    return int(value) if value is not None else None
+
+
+def floor_plan_rows(prop_data: Dict[str, Any], property_id: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            'property_id': property_id,
+            'apartment_name': fp_data.get('apartment_name'),
+            'rent_price_range': fp_data.get('rent_price_range'),
+            'bedrooms': _as_int(parse_numeric_value(fp_data.get('bedrooms'))),
+            'bathrooms': parse_numeric_value(fp_data.get('bathrooms')),
+            'sqft': _as_int(parse_numeric_value(fp_data.get('sqft'))),
+            'unit': fp_data.get('unit'),
+            'base_rent': parse_numeric_value(fp_data.get('base_rent')),
+            'availability': fp_data.get('availability'),
+            'details_link': fp_data.get('details_link'),
+        }
+        for fp_data in prop_data.get('pricing_and_floor_plans', [])
+    ]
+
+
+def _known(value) -> bool:
+    return value not in (None, 'N/A', '')
+
+
+def floor_plan_keys(rows: List[Dict[str, Any]]) -> List[tuple]:
+    """
+    Identity of each floor plan row within its property: the unit number, else the details link, else the plan's
+    name, bedrooms, bathrooms and sqft. Listings can show the same unit twice, so the n-th repeat of a key gets occurrence n.
+    """
+    seen = Counter()
+    keys = []
+    for row in rows:
+        if _known(row.get('unit')):
+            identity = ('unit', row['unit'])
+        elif _known(row.get('details_link')):
+            identity = ('details_link', row['details_link'])
+        else:
+            identity = ('fields',) + tuple(row.get(field) for field in FLOOR_PLAN_IDENTITY_FIELDS)
+        keys.append(identity + (seen[identity],))
+        seen[identity] += 1
+    return keys
+
+
+def unit_key_string(key: tuple) -> str:
+    """Stores a floor_plan_keys() identity as the rent history unit_key, e.g. 'unit:4607:0'."""
+    kind, *values, occurrence = key
+    value = str(values[0]) if kind != 'fields' else ''
+    if kind == 'fields' or len(value) > 80:
+        value = hashlib.sha1(json.dumps(values, default=str).encode('utf-8')).hexdigest()[:16]
+    return f"{kind}:{value}:{occurrence}"
+
+
+# --- Rent History ---
+# Months whose rent_observation partition has been committed, so the DDL runs once per month per process
+_rent_partition_months = set()
+# Partition DDL locks rent_observation; give up on a busy table quickly and try again
+RENT_PARTITION_LOCK_TIMEOUT = '5s'
+RENT_PARTITION_ATTEMPTS = 5
+# PostgreSQL SQLSTATEs worth another attempt: lock_not_available (lock_timeout), deadlock_detected
+RENT_PARTITION_RETRY_SQLSTATES = {'55P03', '40P01'}
+
+
+def _is_lock_error(error: BaseException) -> bool:
+    return isinstance(error, DBAPIError) and (
+        getattr(error.orig, 'sqlstate', None) or getattr(error.orig, 'pgcode', None)) in RENT_PARTITION_RETRY_SQLSTATES
+
+
+async def ensure_rent_partitions(months: Iterable[date]):
+    """
+    Creates the months' rent_observation partitions, each in its own short transaction on a separate
+    connection, and records a month only once its partition is committed. Ingest runs call this before
+    their first batch (ensure_current_rent_partitions), never inside a batch transaction.
+    """
+    for month in months:
+        month = month.replace(day=1)
+        if month in _rent_partition_months:
+            continue
+        async for attempt in AsyncRetrying(retry=retry_if_exception(_is_lock_error),
+                                           stop=stop_after_attempt(RENT_PARTITION_ATTEMPTS),
+                                           wait=wait_random_exponential(multiplier=0.2, max=5), reraise=True):
+            with attempt:
+                async with engine.begin() as connection:
+                    if connection.dialect.name == 'postgresql':
+                        await connection.execute(text(f"SET LOCAL lock_timeout = '{RENT_PARTITION_LOCK_TIMEOUT}'"))
+                    await connection.run_sync(create_rent_observation_partition, month)
+        _rent_partition_months.add(month)
+
+
+async def ensure_current_rent_partitions():
+    """This month's and next month's partitions, so a run crossing the month boundary still has one."""
+    await ensure_rent_partitions(rent_partition_months(datetime.utcnow().date()))
+
+
+async def record_rent_observations(session: AsyncSession, observations: List[Dict[str, Any]]):
+    """Appends rent observations. Their month's partition is created before the ingest run starts."""
+    if not observations:
+        return
+    month = observations[0]['observed_at'].date().replace(day=1)
+    if month not in _rent_partition_months and engine.dialect.name == 'postgresql':
+        # Creating it now would wait on this open transaction's own lock on rent_observation. The rows go to
+        # the default partition; create_rent_observation_partition moves them when the month is created.
+        logging.warning(f"No rent_observation partition for {month:%Y-%m} yet, rent history goes to the default partition")
+    await session.exec(insert(Rent_observation.__table__), params=observations)
+    RENT_OBSERVATIONS.inc(len(observations))
+
+
+async def replace_floor_plans(session: AsyncSession, listings_by_property_id: Dict[int, Dict[str, Any]]) -> Counter:
+    """
+    Deletes every stored floor plan of the properties and inserts the scraped ones.
+    Unit identity is lost this way, so no rent history is recorded.
+    """
+    deleted = (await session.exec(delete(Pricing_and_floor_plans).where(
+        Pricing_and_floor_plans.property_id.in_(list(listings_by_property_id))))).rowcount
+    new_rows = [
+        row for property_id, prop_data in listings_by_property_id.items()
+        for row in floor_plan_rows(prop_data, property_id)
+    ]
+    if new_rows:
+        # executemany; SQLAlchemy batches it into multi-row INSERT ... VALUES statements
+        await session.exec(insert(Pricing_and_floor_plans.__table__), params=new_rows)
+    return Counter({'inserted': len(new_rows), 'deleted': max(deleted, 0)})
+
+
+async def reconcile_floor_plans(session: AsyncSession, listings_by_property_id: Dict[int, Dict[str, Any]]) -> Counter:
+    """
+    Brings the stored floor plans of the properties in line with the scraped ones using one SELECT and at most
+    one INSERT, UPDATE and DELETE statement. Returns the inserted/updated/deleted/unchanged counts.
+    New units and units whose base_rent changed are appended to the rent history.
+    """
+    observed_at = datetime.utcnow()
+    stored_by_property = {property_id: [] for property_id in listings_by_property_id}
+    stored_rows = await session.exec(
+        select(Pricing_and_floor_plans)
+        .where(Pricing_and_floor_plans.property_id.in_(list(listings_by_property_id)))
+        .order_by(Pricing_and_floor_plans.id))
+    for floor_plan in stored_rows.all():
+        stored_by_property[floor_plan.property_id].append(
+            {'id': floor_plan.id, **{field: getattr(floor_plan, field) for field in FLOOR_PLAN_FIELDS}})
+
+    to_insert, to_update, to_delete, observations = [], [], [], []
+    unchanged = 0
+    for property_id, prop_data in listings_by_property_id.items():
+        stored = dict(zip(floor_plan_keys(stored_by_property[property_id]), stored_by_property[property_id]))
+        scraped_rows = floor_plan_rows(prop_data, property_id)
+        for key, row in zip(floor_plan_keys(scraped_rows), scraped_rows):
+            existing = stored.pop(key, None)
+            if existing is None:
+                to_insert.append(row)
+            elif any(existing[field] != row[field] for field in FLOOR_PLAN_FIELDS):
+                to_update.append({'id': existing['id'], **{field: row[field] for field in FLOOR_PLAN_FIELDS}})
+            else:
+                unchanged += 1
+            previous_rent = existing['base_rent'] if existing else None
+            if row['base_rent'] is not None and (existing is None or previous_rent != row['base_rent']):
+                observations.append({
+                    'property_id': property_id, 'unit_key': unit_key_string(key), 'observed_at': observed_at,
+                    'unit': row['unit'], 'bedrooms': row['bedrooms'], 'city': prop_data.get('city'),
+                    'base_rent': row['base_rent'], 'previous_rent': previous_rent,
+                })
+        to_delete.extend(existing['id'] for existing in stored.values())
+
+    if to_delete:
+        await session.exec(delete(Pricing_and_floor_plans).where(Pricing_and_floor_plans.id.in_(to_delete)))
+    if to_update:
+        # ORM bulk UPDATE by primary key: one executemany statement
+        await session.exec(update(Pricing_and_floor_plans), params=to_update)
+    if to_insert:
+        await session.exec(insert(Pricing_and_floor_plans.__table__), params=to_insert)
+    await record_rent_observations(session, observations)
+    return Counter({'inserted': len(to_insert), 'updated': len(to_update), 'deleted': len(to_delete),
+                    'unchanged': unchanged, 'rent_observations': len(observations)})
+
+
+async def sync_floor_plans(session: AsyncSession, listings_by_property_id: Dict[int, Dict[str, Any]]) -> Counter:
+    """Writes the scraped floor plans of the properties with the configured strategy and records the counts."""
+    if FLOOR_PLAN_RECONCILE:
+        counts = await reconcile_floor_plans(session, listings_by_property_id)
+    else:
+        counts = await replace_floor_plans(session, listings_by_property_id)
+    for operation in ('inserted', 'updated', 'deleted', 'unchanged'):
+        FLOOR_PLAN_CHANGES.labels(operation=operation).inc(counts[operation])
+    return counts
+
+
+def log_floor_plan_counts(counts: Counter):
+    logging.info(f"Floor plans: {counts['inserted']} inserted, {counts['updated']} updated, "
+                 f"{counts['deleted']} deleted, {counts['unchanged']} unchanged, "
+                 f"{counts['rent_observations']} rent changes recorded")
 
 
 # --- Data Saving Function ---
+async def upsert_property(session: AsyncSession, prop_data: Dict[str, Any], now_utc_naive: datetime,
+                          floor_plan_counts: Optional[Counter] = None) -> Property:
+    """
+    Inserts or updates one scraped property and syncs its floor plans, without committing.
+    Floor plan insert/update/delete counts are added to floor_plan_counts if given.
+    """
+    property_link = prop_data.get('property_link')
+    existing_property = (await session.exec(
+        select(Property).where(Property.property_link == property_link))).first()
+
+    lease_options_str = json.dumps(prop_data['lease_options']) if isinstance(prop_data.get('lease_options'),
+                                                                             list) else None
+    parsed_property_reviews = parse_numeric_value(prop_data.get('property_reviews'))
+    parsed_year_built = parse_numeric_value(prop_data.get('year_built'))
+
+    if existing_property:
+        logging.info(f"Updating existing property: {prop_data.get('title', 'N/A')}")
+        existing_property.title = prop_data.get('title')
+        existing_property.address = prop_data.get('address')
+        existing_property.street = prop_data.get('street')
+        existing_property.city = prop_data.get('city')
+        existing_property.state = prop_data.get('state')
+        existing_property.zip_code = prop_data.get('zip_code')
+        existing_property.property_reviews = parsed_property_reviews
+        existing_property.listing_verification = prop_data.get('listing_verification')
+        existing_property.lease_option = lease_options_str
+        existing_property.year_built = parsed_year_built
+        existing_property.validation_status = prop_data.get('validation_status', 'pending')
+        existing_property.property_type = prop_data.get('property_type', 'apartment')
+
+        # Update the timestamp with the new naive datetime
+        existing_property.timestamp = now_utc_naive
+
+        session.add(existing_property)
+        await session.flush()
+    else:
+        logging.info(f"Inserting new property: {prop_data.get('title', 'N/A')}")
+        new_property = Property(
+            property_link=property_link,
+            title=prop_data.get('title'),
+            address=prop_data.get('address'),
+            street=prop_data.get('street'),
+            city=prop_data.get('city'),
+            state=prop_data.get('state'),
+            zip_code=prop_data.get('zip_code'),
+            property_reviews=parsed_property_reviews,
+            listing_verification=prop_data.get('listing_verification'),
+            lease_options=lease_options_str,
+            year_built=parsed_year_built,
+            validation_status=prop_data.get('validation_status', 'pending'),
+            property_type=prop_data.get('property_type', 'apartment'),
+
+            # Use the new naive datetime for the new property
+            timestamp=now_utc_naive
+        )
+        session.add(new_property)
+        await session.flush()
+        existing_property = new_property
+
+    counts = await sync_floor_plans(session, {existing_property.id: prop_data})
+    if floor_plan_counts is not None:
+        floor_plan_counts.update(counts)
+    return existing_property
+
+
+# --- Data Version ---
+# Bumped after every ingest commit; db_app's search cache is keyed by it (dbmodels.Data_version)
+BUMP_DATA_VERSION_SQL = (
+    "UPDATE data_version SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE name = 'listings'")
+
+
+async def bump_data_version(session: AsyncSession):
+    """
+    Marks the listings as changed. Runs in its own short transaction after the ingest commit, so a reader that
+    sees the new version also sees the new rows, and the version row is never locked for a whole batch.
+    """
+    try:
+        await session.exec(text(BUMP_DATA_VERSION_SQL))
+        await session.commit()
+    except Exception as e:
+        await session.rollback()
+        logging.warning(f"Could not bump the listings data version, API search results may be stale: {e}")
+
+
+# --- Analytics Summary ---
+# Rebuild analytics.py's summary tables at the end of every ingest run (not per batch: a refresh reads every floor plan)
+REFRESH_ANALYTICS_AFTER_INGEST = True
+
+
+async def refresh_analytics_summary():
+    """Rebuilds the analytics summary. A failed refresh is logged; the ingest itself is already committed."""
+    if not REFRESH_ANALYTICS_AFTER_INGEST:
+        return
+    async with async_session_maker() as session:
+        try:
+            await refresh_analytics(session)
+        except Exception as e:
+            await session.rollback()
+            logging.error(f"Analytics refresh failed, the /top and /analytics routes serve the previous summary: {e}",
+                          exc_info=True)
+
+
 async def save_scraped_data_to_db(scraped_data: List[Dict[str, Any]]):
     """
     Asynchronously saves a list of scraped property data to the database,
     handling upsert logic.
     """
     logging.info(f"Starting to save {len(scraped_data)} properties to the database...")
+    floor_plan_counts = Counter()
+    await ensure_current_rent_partitions()
 
-    async for session in get_session():
-        for prop_data in scraped_data:
-            property_link = prop_data.get('property_link')
-            if not property_link:
-                logging.warning(f"Skipping property due to missing property_link: {prop_data.get('title', 'N/A')}")
-                continue
+    for prop_data in scraped_data:
+        property_link = prop_data.get('property_link')
+        if not property_link:
+            logging.warning(f"Skipping property due to missing property_link: {prop_data.get('title', 'N/A')}")
+            continue
 
-            # **CRITICAL CHANGE**: Convert the datetime to timezone-naive.
-            # We're getting the current time in UTC and then stripping the timezone info.
-            now_utc_naive = datetime.utcnow()
+        # **CRITICAL CHANGE**: Convert the datetime to timezone-naive.
+        # We're getting the current time in UTC and then stripping the timezone info.
+        now_utc_naive = datetime.utcnow()
 
+        # A session per property: its identity map and connection are released as soon as it commits
+        async with async_session_maker() as session:
             try:
-                existing_property = (await session.exec(
-                    select(Property).where(Property.property_link == property_link))).first()
-
-                lease_options_str = json.dumps(prop_data['lease_options']) if isinstance(prop_data.get('lease_options'),
-                                                                                         list) else None
-                parsed_property_reviews = parse_numeric_value(prop_data.get('property_reviews'))
-                parsed_year_built = parse_numeric_value(prop_data.get('year_built'))
-
-                if existing_property:
-                    logging.info(f"Updating existing property: {prop_data.get('title', 'N/A')}")
-                    existing_property.title = prop_data.get('title')
-                    existing_property.address = prop_data.get('address')
-                    existing_property.street = prop_data.get('street')
-                    existing_property.city = prop_data.get('city')
-                    existing_property.state = prop_data.get('state')
-                    existing_property.zip_code = prop_data.get('zip_code')
-                    existing_property.property_reviews = parsed_property_reviews
-                    existing_property.listing_verification = prop_data.get('listing_verification')
-                    existing_property.lease_option = lease_options_str
-                    existing_property.year_built = parsed_year_built
-                    existing_property.validation_status = prop_data.get('validation_status', 'pending')
-                    existing_property.property_type = prop_data.get('property_type', 'apartment')
-
-                    # Update the timestamp with the new naive datetime
-                    existing_property.timestamp = now_utc_naive
-
-                    session.add(existing_property)
-                    from sqlmodel import delete
-                    delete_stmt=delete(Pricing_and_floor_plans).where(Pricing_and_floor_plans.property_id==existing_property.id)
-
-                    await session.exec(delete_stmt)
-                    await session.flush()
-                else:
-                    logging.info(f"Inserting new property: {prop_data.get('title', 'N/A')}")
-                    new_property = Property(
-                        property_link=property_link,
-                        title=prop_data.get('title'),
-                        address=prop_data.get('address'),
-                        street=prop_data.get('street'),
-                        city=prop_data.get('city'),
-                        state=prop_data.get('state'),
-                        zip_code=prop_data.get('zip_code'),
-                        property_reviews=parsed_property_reviews,
-                        listing_verification=prop_data.get('listing_verification'),
-                        lease_options=lease_options_str,
-                        year_built=parsed_year_built,
-                        validation_status=prop_data.get('validation_status', 'pending'),
-                        property_type=prop_data.get('property_type', 'apartment'),
-
-                        # Use the new naive datetime for the new property
-                        timestamp=now_utc_naive
-                    )
-                    session.add(new_property)
-                    await session.flush()
-                    existing_property = new_property
-
-                for fp_data in prop_data.get('pricing_and_floor_plans', []):
-                    parsed_bedrooms = parse_numeric_value(fp_data.get('bedrooms'))
-                    parsed_bathrooms = parse_numeric_value(fp_data.get('bathrooms'))
-                    parsed_sqft = parse_numeric_value(fp_data.get('sqft'))
-                    parsed_base_rent = parse_numeric_value(fp_data.get('base_rent'))
-
-                    new_floor_plan = Pricing_and_floor_plans(
-                        property=existing_property,
-                        apartment_name=fp_data.get('apartment_name'),
-                        rent_price_range=fp_data.get('rent_price_range'),
-                        bedrooms=parsed_bedrooms,
-                        bathrooms=parsed_bathrooms,
-                        sqft=parsed_sqft,
-                        unit=fp_data.get('unit'),
-                        base_rent=parsed_base_rent,
-                        availability=fp_data.get('availability'),
-                        details_link=fp_data.get('details_link'),
-
-                        # Use the new naive datetime for the floor plan
-                        timestamp=now_utc_naive
-                    )
-                    session.add(new_floor_plan)
-
+                property_counts = Counter()
+                await upsert_property(session, prop_data, now_utc_naive, property_counts)
                 await session.commit()
+                await bump_data_version(session)
+                floor_plan_counts.update(property_counts)
                 logging.info(f"Successfully processed and committed property: {property_link}")
 
             except IntegrityError as ie:
@@ -185,6 +420,244 @@ async def save_scraped_data_to_db(scraped_data: List[Dict[str, Any]]):
             except Exception as e:
                 await session.rollback()
                 logging.error(f"Error saving property {property_link} to database: {e}", exc_info=True)
+    log_floor_plan_counts(floor_plan_counts)
+    await refresh_analytics_summary()
+
+
+async def save_batch_to_db(session: AsyncSession, batch: List[Dict[str, Any]],
+                           floor_plan_counts: Optional[Counter] = None) -> List[Dict[str, Any]]:
+    """
+    Saves a batch of properties with a single commit. Each property runs in its own savepoint,
+    so one bad listing is rolled back without losing the rest of the batch.
+    Returns the listings that were committed.
+    """
+    now_utc_naive = datetime.utcnow()
+    saved = []
+    for prop_data in batch:
+        property_link = prop_data.get('property_link')
+        if not property_link:
+            logging.warning(f"Skipping property due to missing property_link: {prop_data.get('title', 'N/A')}")
+            continue
+        try:
+            property_counts = Counter()
+            async with session.begin_nested():
+                await upsert_property(session, prop_data, now_utc_naive, property_counts)
+            saved.append(prop_data)
+            if floor_plan_counts is not None:
+                floor_plan_counts.update(property_counts)
+        except IntegrityError as ie:
+            DB_INSERT_FAILURES.labels(table='property').inc()
+            logging.error(f"Integrity Error for {property_link}: {ie}")
+        except Exception as e:
+            DB_INSERT_FAILURES.labels(table='property').inc()
+            logging.error(f"Error saving property {property_link} to database: {e}", exc_info=True)
+    await session.commit()
+    if saved:
+        await bump_data_version(session)
+    return saved
+
+
+# --- Bulk Ingest ---
+# One INSERT ... ON CONFLICT (property_link) DO UPDATE per batch of properties, then one set-based sync of
+# their floor plans, all in a single transaction: a handful of round-trips per batch instead of several per property.
+BULK_BATCH_SIZE = 100
+
+# Columns refreshed when a property already exists, the same ones upsert_property updates
+PROPERTY_UPSERT_COLUMNS = (
+    'title', 'address', 'street', 'city', 'state', 'zip_code', 'property_reviews', 'listing_verification',
+    'lease_option', 'year_built', 'validation_status', 'property_type', 'timestamp',
+)
+
+DIALECT_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+
+def bulk_upsert_supported(dialect_name: str) -> bool:
+    """Whether bulk_upsert_batch can run on the dialect; other databases use the per-property ORM path."""
+    return dialect_name in DIALECT_INSERTS
+
+
+def property_row(prop_data: Dict[str, Any], now_utc_naive: datetime) -> Dict[str, Any]:
+    """Maps a scraped listing to a property table row, parsed the same way as upsert_property."""
+    lease_options = prop_data.get('lease_options')
+    return {
+        'property_link': prop_data['property_link'],
+        'title': prop_data.get('title'),
+        'address': prop_data.get('address'),
+        'street': prop_data.get('street'),
+        'city': prop_data.get('city'),
+        'state': prop_data.get('state'),
+        'zip_code': prop_data.get('zip_code'),
+        'property_reviews': parse_numeric_value(prop_data.get('property_reviews')),
+        'listing_verification': prop_data.get('listing_verification'),
+        'lease_option': json.dumps(lease_options) if isinstance(lease_options, list) else None,
+        'year_built': _as_int(parse_numeric_value(prop_data.get('year_built'))),
+        'validation_status': prop_data.get('validation_status', 'pending'),
+        'property_type': prop_data.get('property_type', 'apartment'),
+        'timestamp': now_utc_naive,
+    }
+
+
+async def bulk_upsert_batch(session: AsyncSession, batch: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Upserts a batch of properties and replaces their floor plans with set-based statements, without committing.
+    Returns the batch counts: inserted and updated properties, floor plan changes, and the saved listings.
+    """
+    dialect_name = session.bind.dialect.name
+    if not bulk_upsert_supported(dialect_name):
+        raise ValueError(f"Bulk upsert needs INSERT ... ON CONFLICT, which is not available for the "
+                         f"'{dialect_name}' dialect (supported: {', '.join(DIALECT_INSERTS)})")
+
+    now_utc_naive = datetime.utcnow()
+    # ON CONFLICT can't touch the same row twice in one statement, so keep the last copy of each link
+    listings = {}
+    for prop_data in batch:
+        if not prop_data.get('property_link'):
+            logging.warning(f"Skipping property due to missing property_link: {prop_data.get('title', 'N/A')}")
+            continue
+        listings[prop_data['property_link']] = prop_data
+    if not listings:
+        return {'inserted': 0, 'updated': 0, 'floor_plans': Counter(), 'saved': []}
+
+    property_table = Property.__table__
+    stmt = DIALECT_INSERTS[dialect_name](property_table).values(
+        [property_row(prop_data, now_utc_naive) for prop_data in listings.values()])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[property_table.c.property_link],
+        set_={column: stmt.excluded[column] for column in PROPERTY_UPSERT_COLUMNS},
+    )
+    if dialect_name == 'postgresql':
+        # xmax is 0 only for rows this statement inserted, so inserts and updates are told apart for free
+        stmt = stmt.returning(property_table.c.id, property_table.c.property_link, literal_column('(xmax = 0)'))
+        returned = (await session.exec(stmt)).all()
+        property_ids = {link: property_id for property_id, link, _ in returned}
+        inserted = sum(1 for *_, was_inserted in returned if was_inserted)
+    else:
+        existing = set((await session.exec(
+            select(Property.property_link).where(Property.property_link.in_(list(listings))))).all())
+        returned = (await session.exec(stmt.returning(property_table.c.id, property_table.c.property_link))).all()
+        property_ids = {link: property_id for property_id, link in returned}
+        inserted = len(property_ids) - len(existing)
+
+    floor_plan_counts = await sync_floor_plans(
+        session, {property_ids[link]: prop_data for link, prop_data in listings.items()})
+
+    return {
+        'inserted': inserted,
+        'updated': len(property_ids) - inserted,
+        'floor_plans': floor_plan_counts,
+        'saved': list(listings.values()),
+    }
+
+
+async def save_batch_bulk(session: AsyncSession, batch: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Commits a batch through bulk_upsert_batch. If the set-based statements fail, the batch is rolled back
+    and retried property by property with save_batch_to_db, so one bad listing doesn't cost the batch.
+    On a database without bulk upsert support the batch goes straight to save_batch_to_db.
+    """
+    if not bulk_upsert_supported(session.bind.dialect.name):
+        floor_plan_counts = Counter()
+        saved = await save_batch_to_db(session, batch, floor_plan_counts)
+        return {'inserted': None, 'updated': None, 'floor_plans': floor_plan_counts, 'saved': saved}
+    try:
+        counts = await bulk_upsert_batch(session, batch)
+        await session.commit()
+    except Exception as e:
+        await session.rollback()
+        DB_INSERT_FAILURES.labels(table='property_bulk').inc()
+        logging.error(f"Bulk upsert of {len(batch)} properties failed, retrying them one by one: {e}")
+        floor_plan_counts = Counter()
+        saved = await save_batch_to_db(session, batch, floor_plan_counts)
+        return {'inserted': None, 'updated': None, 'floor_plans': floor_plan_counts, 'saved': saved}
+    await bump_data_version(session)
+    return counts
+
+
+async def bulk_save_scraped_data_to_db(scraped_data: Iterable[Dict[str, Any]],
+                                       batch_size: int = BULK_BATCH_SIZE) -> List[Dict[str, Any]]:
+    """
+    Bulk counterpart of save_scraped_data_to_db: one transaction per batch of batch_size properties.
+    scraped_data can be any iterable, e.g. dump_loader.iter_dump_listings(), and is only read a batch at a time.
+    Returns the per-batch counts of inserted and updated properties and floor plan changes.
+    """
+    logging.info(f"Starting bulk save in batches of {batch_size}...")
+    batch_counts = []
+    floor_plan_counts = Counter()
+    listings = iter(scraped_data)
+    # ON CONFLICT (property_link) needs the unique index of migration 0001; also this month's rent partitions
+    await create_db_and_tables()
+    while batch := list(islice(listings, batch_size)):
+        # A session per batch, like the streaming writer: loaded objects don't pile up in one identity map
+        async with async_session_maker() as session:
+            counts = await save_batch_bulk(session, batch)
+        counts = {'batch': len(batch_counts), **{key: value for key, value in counts.items() if key != 'saved'},
+                  'saved': len(counts['saved'])}
+        batch_counts.append(counts)
+        floor_plan_counts.update(counts['floor_plans'])
+        logging.info(f"Batch {counts['batch']}: {counts['inserted']} inserted, {counts['updated']} updated "
+                     f"({counts['saved']} properties saved), floor plans {dict(counts['floor_plans'])}")
+    log_floor_plan_counts(floor_plan_counts)
+    await refresh_analytics_summary()
+    return batch_counts
+
+
+# --- Streaming Writer ---
+async def stream_scraped_data_to_db(
+        queue: asyncio.Queue,
+        batch_size: int = 25,
+        flush_interval: float = 5.0,
+        on_committed: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+        bulk: bool = False,
+) -> int:
+    """
+    Consumes listings from a bounded queue and commits them in batches while scraping continues.
+    A batch is flushed when it reaches batch_size or when no listing arrived for flush_interval seconds.
+    Put None on the queue to flush the last batch and stop. Returns the number of listings committed.
+    With bulk=True each batch is written with set-based statements (save_batch_bulk).
+    """
+    committed = 0
+    batch = []
+    finished = False
+    floor_plan_counts = Counter()
+    if bulk:
+        # ON CONFLICT (property_link) needs the unique index of migration 0001; also this month's rent partitions
+        await create_db_and_tables()
+    else:
+        await ensure_current_rent_partitions()
+
+    while not finished:
+        timed_out = False
+        try:
+            item = await asyncio.wait_for(queue.get(), timeout=flush_interval)
+            if item is None:
+                finished = True
+            else:
+                batch.append(item)
+        except asyncio.TimeoutError:
+            timed_out = True
+
+        if batch and (finished or timed_out or len(batch) >= batch_size):
+            async with async_session_maker() as session:
+                if bulk:
+                    counts = await save_batch_bulk(session, batch)
+                    saved = counts['saved']
+                    floor_plan_counts.update(counts['floor_plans'])
+                else:
+                    saved = await save_batch_to_db(session, batch, floor_plan_counts)
+            committed += len(saved)
+            logging.info(f"Committed batch of {len(saved)}/{len(batch)} properties ({committed} so far, {queue.qsize()} waiting)")
+            if on_committed:
+                on_committed(saved)
+            batch = []
+
+    logging.info(f"Streaming writer finished, {committed} properties committed.")
+    log_floor_plan_counts(floor_plan_counts)
+    if committed:
+        await refresh_analytics_summary()
+    return committed
 
 
 # Main execution block remains the same
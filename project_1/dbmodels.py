@@ -1,12 +1,17 @@
 from typing import Optional
-from datetime import datetime, timezone
+from datetime import datetime, timezone, date
 
+from sqlalchemy import Index, func, text
 from sqlmodel import SQLModel, Relationship, Field
 
 class Property(SQLModel, table=True):
+    __table_args__ = (
+        Index('ix_property_timestamp_id', 'timestamp', 'id'),
+    )
+
     id: int = Field(default=None, primary_key=True)
     title: str = Field(max_length=200)
-    property_link: str = Field(max_length=500)
+    property_link: str = Field(max_length=500, unique=True, index=True)
     address: str = Field(max_length=500)
     listing_verification: str = Field(max_length=100)
     property_reviews: Optional[float] = Field(default=0)
@@ -19,12 +24,17 @@ class Property(SQLModel, table=True):
     validation_status: Optional[str] = Field(max_length=50, default="pending")
     property_type: Optional[str] = Field(max_length=100, default="apartment")
     lease_option: Optional[str] = Field(max_length=1000, default=None)
-    timestamp: datetime = Field(default_factory=lambda :datetime.now(timezone.utc), nullable=False)
+    timestamp: datetime = Field(default_factory=lambda :datetime.now(timezone.utc), nullable=False, index=True)
 
     pricing_and_floor_plans: list["Pricing_and_floor_plans"] = Relationship(back_populates="property")
 
 
 class Pricing_and_floor_plans(SQLModel, table=True):
+    __table_args__ = (
+        Index('ix_pricing_and_floor_plans_property_id_base_rent', 'property_id', 'base_rent'),
+        Index('ix_pricing_and_floor_plans_bedrooms_base_rent', 'bedrooms', 'base_rent'),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     property_id: int = Field(foreign_key="property.id", nullable=False)
     apartment_name: str = Field(max_length=200)
@@ -33,8 +43,120 @@ class Pricing_and_floor_plans(SQLModel, table=True):
     bathrooms: Optional[float] = Field(default=None, nullable=True)
     sqft: Optional[int] = Field(default=None, nullable=True)
     unit: Optional[str] = Field(max_length=50, default=None, nullable=True)
-    base_rent: Optional[float] = Field(default=None, nullable=True)
+    base_rent: Optional[float] = Field(default=None, nullable=True, index=True)
     availability: str = Field(max_length=50, default=None)
     details_link: str = Field(max_length=500, default=None)
 
-    property: Optional[Property] = Relationship(back_populates="pricing_and_floor_plans")
\ No newline at end of file
+    property: Optional[Property] = Relationship(back_populates="pricing_and_floor_plans")
+
+
+# Case-insensitive city lookups; PostgreSQL also gets a trigram index for ILIKE '%x%' (schema_migrations.py)
+Index('ix_property_city_lower', func.lower(Property.city))
+
+
+class Rent_observation(SQLModel, table=True):
+    """
+    Append-only rent history: one row each time a unit's base_rent changes (or the unit first appears).
+    On PostgreSQL the table is range-partitioned by month on observed_at.
+    """
+    __table_args__ = (
+        Index('ix_rent_observation_property_observed_at', 'property_id', 'observed_at'),
+        {'postgresql_partition_by': 'RANGE (observed_at)'},
+    )
+
+    property_id: int = Field(foreign_key="property.id", primary_key=True)
+    unit_key: str = Field(max_length=100, primary_key=True)  # Floor plan identity within the property
+    observed_at: datetime = Field(primary_key=True)
+    unit: Optional[str] = Field(max_length=50, default=None, nullable=True)
+    bedrooms: Optional[int] = Field(default=None, nullable=True)
+    city: Optional[str] = Field(max_length=100, default=None)
+    base_rent: float
+    previous_rent: Optional[float] = Field(default=None, nullable=True)
+
+
+# City-level rent change queries filter on lower(city) and a window of observed_at
+Index('ix_rent_observation_city_observed_at', func.lower(Rent_observation.city), Rent_observation.observed_at)
+
+
+class Data_version(SQLModel, table=True):
+    """
+    Change counters bumped by every ingest commit. The API's search cache keys results by the 'listings'
+    version, so a write anywhere (scraper, bulk load, another process) invalidates it.
+    """
+    name: str = Field(max_length=50, primary_key=True)
+    version: int = Field(default=0)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class Rent_summary(SQLModel, table=True):
+    """Rent distribution of one city and bedroom count, rebuilt by analytics.refresh_analytics()."""
+    __table_args__ = (
+        Index('ix_rent_summary_city_key_bedrooms', 'city_key', 'bedrooms'),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    city_key: str = Field(max_length=100)  # lower(trim(city))
+    city: str = Field(max_length=100)
+    bedrooms: Optional[int] = Field(default=None, nullable=True)  # None for listings that didn't say
+    floor_plans: int
+    min_rent: float
+    median_rent: float
+    p90_rent: float
+    max_rent: float
+    refreshed_at: datetime
+
+
+class Top_floor_plan(SQLModel, table=True):
+    """
+    The cheapest and most expensive floor plans, ranked 1..analytics.TOP_K across all cities (city_key '')
+    and per city. Rebuilt by analytics.refresh_analytics(); the primary key is the lookup order.
+    """
+    city_key: str = Field(max_length=100, primary_key=True)
+    ranking: str = Field(max_length=20, primary_key=True)  # 'cheapest' or 'most_expensive'
+    rank: int = Field(primary_key=True)
+    floor_plan_id: int
+    property_id: int
+    bedrooms: Optional[int] = Field(default=None, nullable=True)
+    base_rent: float
+
+
+def rent_partition_months(today: date, months_ahead: int = 1) -> list[date]:
+    """First days of the current month and the next `months_ahead`, the partitions an ingest run may write to."""
+    months = [today.replace(day=1)]
+    for _ in range(months_ahead):
+        last = months[-1]
+        months.append(date(last.year + (last.month == 12), last.month % 12 + 1, 1))
+    return months
+
+
+def create_rent_observation_partition(connection, month: date):
+    """
+    Creates the monthly partition of rent_observation that holds `month`, plus a default partition for
+    anything outside the created ranges. Rows of the month already in the default partition are moved into
+    the new one (PostgreSQL refuses to create a partition that the default's rows would violate).
+    PostgreSQL only; takes a sync connection (use with run_sync) and should be committed on its own.
+    """
+    if connection.dialect.name != 'postgresql':
+        return
+    start = month.replace(day=1)
+    end = date(start.year + (start.month == 12), start.month % 12 + 1, 1)
+    name = f"rent_observation_{start:%Y_%m}"
+    bounds = f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    # Concurrent ingest workers and API processes create the same partitions; one at a time
+    connection.execute(text("SELECT pg_advisory_xact_lock(hashtext('rent_observation_partitions'))"))
+
+    if connection.execute(text("SELECT to_regclass(:name)"), {'name': name}).scalar() is None:
+        stranded = connection.execute(text(
+            "SELECT to_regclass('rent_observation_default') IS NOT NULL AND EXISTS ("
+            "SELECT 1 FROM rent_observation_default WHERE observed_at >= :start AND observed_at < :end)"),
+            {'start': start, 'end': end}).scalar()
+        if stranded:
+            connection.execute(text(f"CREATE TABLE {name} (LIKE rent_observation INCLUDING DEFAULTS)"))
+            connection.execute(text(
+                f"WITH moved AS (DELETE FROM rent_observation_default "
+                f"WHERE observed_at >= :start AND observed_at < :end RETURNING *) "
+                f"INSERT INTO {name} SELECT * FROM moved"), {'start': start, 'end': end})
+            connection.execute(text(f"ALTER TABLE rent_observation ATTACH PARTITION {name} {bounds}"))
+        else:
+            connection.execute(text(f"CREATE TABLE {name} PARTITION OF rent_observation {bounds}"))
+    connection.execute(text("CREATE TABLE IF NOT EXISTS rent_observation_default PARTITION OF rent_observation DEFAULT"))
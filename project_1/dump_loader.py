@@ -0,0 +1,143 @@
+import json
+import asyncio
+import logging
+import argparse
+from typing import Any, Dict, Iterable, Iterator, TextIO
+
+logger = logging.getLogger(__name__)
+
+'''--- Streaming Scrape Dumps ---
+Scrape dumps come in two formats:
+  - the legacy indented JSON array apartment_scraper.main() writes with json.dump(..., indent=4)
+  - newline-delimited JSON (one listing per line), which the scraper appends as results arrive with --ndjson
+iter_listings() reads either one a listing at a time: NDJSON line by line, arrays by decoding one element
+at a time out of a READ_SIZE window, so memory depends on the largest listing rather than the dump size.
+
+    python dump_loader.py apartments_data.json apartments_data2.jsonl --batch-size 100
+'''
+
+# Characters read from a JSON array dump per refill of the decode window
+READ_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+
+
+# --- Writing ---
+class NdjsonWriter:
+    """Writes listings to a newline-delimited JSON file, one line per listing, flushed as they arrive."""
+
+    def __init__(self, path: str, append: bool = False):
+        self.path = path
+        self._file = open(path, 'a' if append else 'w', encoding='utf-8')
+        self.written = 0
+
+    def write(self, listing: Dict[str, Any]):
+        self._file.write(json.dumps(listing, ensure_ascii=False) + '\n')
+        # Flushed per listing so a crashed run leaves every finished listing on disk
+        self._file.flush()
+        self.written += 1
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+# --- Reading ---
+def _skip_whitespace(buffer: str, position: int) -> int:
+    while position < len(buffer) and buffer[position] in ' \t\r\n':
+        position += 1
+    return position
+
+
+def iter_json_array(f: TextIO, read_size: int = READ_SIZE) -> Iterator[Any]:
+    """Yields the elements of a top-level JSON array one at a time without loading the whole array."""
+    buffer = f.read(read_size)
+    position = _skip_whitespace(buffer, 0)
+    if buffer[position:position + 1] != '[':
+        raise ValueError(f"Expected a JSON array, found {buffer[position:position + 20]!r}")
+    position += 1
+    eof = False
+    while True:
+        position = _skip_whitespace(buffer, position)
+        if position < len(buffer) and buffer[position] == ',':
+            position = _skip_whitespace(buffer, position + 1)
+        if position < len(buffer) and buffer[position] == ']':
+            return
+        try:
+            if position >= len(buffer):
+                raise json.JSONDecodeError("Window ended", buffer, position)
+            element, end = _decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            # The element runs past the window: drop what was consumed and read more
+            if eof:
+                raise
+            buffer = buffer[position:]
+            position = 0
+            chunk = f.read(read_size)
+            eof = not chunk
+            buffer += chunk
+            if eof and not buffer.strip():
+                raise ValueError("JSON array dump ended without a closing ']'")
+            continue
+        yield element
+        position = end
+
+
+def iter_ndjson(f: TextIO) -> Iterator[Any]:
+    for line_number, line in enumerate(f, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            # A run killed mid-write can leave a truncated last line; everything before it is kept
+            logger.warning(f"Skipping unreadable line {line_number} of {getattr(f, 'name', 'dump')}: {e}")
+
+
+def iter_listings(path: str) -> Iterator[Dict[str, Any]]:
+    """Yields the listings of a dump file, detecting a JSON array or NDJSON from its first character."""
+    with open(path, encoding='utf-8') as f:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        if not first:
+            return
+        f.seek(0)
+        if first == '[':
+            yield from iter_json_array(f)
+        else:
+            yield from iter_ndjson(f)
+
+
+def iter_dump_listings(paths: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Chains the listings of several dumps, logging a count per file once it has been read."""
+    for path in paths:
+        count = 0
+        for listing in iter_listings(path):
+            count += 1
+            yield listing
+        logger.info(f"Read {count} listings from {path}")
+
+
+async def load_dumps(paths: Iterable[str], batch_size: int) -> list[dict]:
+    """Streams dumps into the database through db_ops' bulk ingest path, batch_size listings per transaction."""
+    from db_ops import bulk_save_scraped_data_to_db
+
+    return await bulk_save_scraped_data_to_db(iter_dump_listings(paths), batch_size=batch_size)
+
+
+if __name__ == '__main__':
+    from db_ops import BULK_BATCH_SIZE
+
+    parser = argparse.ArgumentParser(description="Stream JSON array or NDJSON scrape dumps into the database")
+    parser.add_argument('dumps', nargs='+', help="Scrape dumps, e.g. apartments_data.json apartments_data2.jsonl")
+    parser.add_argument('--batch-size', type=int, default=BULK_BATCH_SIZE, help="Listings per transaction")
+    args = parser.parse_args()
+
+    asyncio.run(load_dumps(args.dumps, args.batch_size))
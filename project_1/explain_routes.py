@@ -0,0 +1,160 @@
+import re
+import asyncio
+import logging
+import argparse
+from datetime import datetime, timedelta
+
+from sqlalchemy import text, func, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from dbmodels import Pricing_and_floor_plans, Property
+from dump_loader import iter_dump_listings
+from db_app import (
+    engine, listings_page_statement, floor_plans_batch_statement, price_history_statement, city_rent_change_statement,
+    search_statement, ranked_floor_plans_statement, rent_summary_statement, listings_since_statement, export_statement,
+)
+
+logger = logging.getLogger(__name__)
+
+'''--- Route Query Plans ---
+Prints the plan of every db_app route's query against the configured database, built with the same
+query builders the routes use. On PostgreSQL this is EXPLAIN (ANALYZE, BUFFERS), on SQLite EXPLAIN QUERY PLAN.
+--seed loads scrape dumps first; --copies repeats them under new property links and cities, because on a
+hundred rows the planner rightly prefers a sequential scan and the indexes never show up.
+
+    python explain_routes.py --seed apartments_data.json apartments_data2.json --copies 200
+'''
+
+# Cities the seeded copies are spread over, so city filters select a realistic fraction of the rows
+SEED_CITIES = ['Boston', 'Cambridge', 'Somerville', 'Brookline', 'Quincy', 'Newton', 'Medford', 'Malden']
+
+# Indexes added by schema_migrations.py, reported when a plan uses them
+ROUTE_INDEXES = (
+    'ix_property_property_link', 'ix_property_city_trgm', 'ix_property_city_lower', 'ix_property_city_lower_prefix',
+    'ix_property_timestamp_id', 'ix_property_timestamp',
+    'ix_pricing_and_floor_plans_property_id_base_rent', 'ix_pricing_and_floor_plans_bedrooms_base_rent',
+    'ix_pricing_and_floor_plans_base_rent',
+    'ix_rent_observation_property_observed_at', 'ix_rent_observation_city_observed_at',
+    'ix_rent_summary_city_key_bedrooms',
+)
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN of a SQLAlchemy statement, compiled per dialect with its bound parameters intact."""
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain, 'postgresql')
+def _explain_postgresql(element, compiler, **kw):
+    return f"EXPLAIN (ANALYZE, BUFFERS) {compiler.process(element.statement, **kw)}"
+
+
+@compiles(Explain, 'sqlite')
+def _explain_sqlite(element, compiler, **kw):
+    return f"EXPLAIN QUERY PLAN {compiler.process(element.statement, **kw)}"
+
+
+@compiles(Explain)
+def _explain_default(element, compiler, **kw):
+    return f"EXPLAIN {compiler.process(element.statement, **kw)}"
+
+
+def seed_listings(dump_paths: list[str], copies: int):
+    """The dumps' listings, then `copies` more rounds of them with distinct links and SEED_CITIES."""
+    yield from iter_dump_listings(dump_paths)
+    for copy in range(1, copies + 1):
+        for i, listing in enumerate(iter_dump_listings(dump_paths)):
+            yield {**listing, 'property_link': f"{listing['property_link']}#seed-{copy}",
+                   'city': SEED_CITIES[(copy + i) % len(SEED_CITIES)]}
+
+
+async def seed_database(dump_paths: list[str], copies: int):
+    from db_ops import create_db_and_tables, bulk_save_scraped_data_to_db
+
+    await create_db_and_tables()
+    await bulk_save_scraped_data_to_db(seed_listings(dump_paths, copies), batch_size=500)
+
+
+async def sample_parameters(connection) -> dict:
+    """Route parameters that hit real rows: the property with the most floor plans and the most common city."""
+    property_id = (await connection.execute(
+        select(Pricing_and_floor_plans.property_id)
+        .group_by(Pricing_and_floor_plans.property_id)
+        .order_by(func.count().desc()).limit(1))).scalar()
+    city = (await connection.execute(
+        select(Property.city).where(Property.city.is_not(None))
+        .group_by(Property.city).order_by(func.count().desc()).limit(1))).scalar()
+    return {'property_id': property_id or 1, 'city': city or 'Boston'}
+
+
+def route_statements(params: dict) -> list[tuple[str, object]]:
+    now = datetime.utcnow()
+    property_id, city = params['property_id'], params['city']
+    return [
+        ("GET /all-property-listings", listings_page_statement()),
+        ("GET /all-property-listings?order_by=timestamp&cursor=...",
+         listings_page_statement(order_by='timestamp', after={'timestamp': now, 'id': property_id})),
+        (f"GET /properties/{property_id}/floor-plans", floor_plans_batch_statement([property_id])),
+        ("POST /properties/floor-plans/batch (100 IDs)",
+         floor_plans_batch_statement(list(range(property_id, property_id + 100)))),
+        (f"GET /properties/{property_id}/price-history", price_history_statement(property_id)),
+        (f"GET /cities/{city}/rent-change?days=30", city_rent_change_statement(city, now - timedelta(days=30))),
+        (f"GET /properties/search?city={city[:3]}", search_statement(city=city[:3])),
+        (f"GET /properties/search?city={city[:3]}&city_match=prefix", search_statement(city=city[:3], city_match='prefix')),
+        (f"GET /properties/search?city={city}&city_match=exact", search_statement(city=city, city_match='exact')),
+        ("GET /properties/search?min_bedrooms=2&max_base_rent=3000",
+         search_statement(min_bedrooms=2, max_base_rent=3000)),
+        (f"GET /properties/search?city={city[:3]}&max_base_rent=3000&sort=rent",
+         search_statement(city=city[:3], max_base_rent=3000, sort='rent')),
+        ("GET /properties/search?year_built=2015", search_statement(year_built=2015)),
+        ("GET /top/10/most-affordable-properties", ranked_floor_plans_statement(10)),
+        ("GET /top/10/most-expensive-properties", ranked_floor_plans_statement(10, 'most_expensive')),
+        (f"GET /analytics/city/{city}", rent_summary_statement(city)),
+        (f"GET /analytics/city/{city}/top?limit=10", ranked_floor_plans_statement(10, 'cheapest', city)),
+        ("GET /this-weeks-listings", listings_since_statement(now - timedelta(days=7))),
+        ("GET /export/listings", export_statement()),
+        (f"GET /export/listings?city={city}", export_statement(city=city)),
+    ]
+
+
+def plan_lines(rows, dialect: str) -> list[str]:
+    if dialect == 'sqlite':
+        # (id, parent, notused, detail); indent by nesting depth
+        depth, lines = {0: -1}, []
+        for node_id, parent, _, detail in rows:
+            depth[node_id] = depth.get(parent, -1) + 1
+            lines.append(f"{'  ' * depth[node_id]}{detail}")
+        return lines
+    return [row[0] for row in rows]
+
+
+async def explain_routes():
+    async with engine.connect() as connection:
+        dialect = connection.dialect.name
+        # Fresh statistics, so the plans reflect the seeded data
+        await connection.execute(text("ANALYZE"))
+        params = await sample_parameters(connection)
+        for route, statement in route_statements(params):
+            lines = plan_lines((await connection.execute(Explain(statement))).all(), dialect)
+            plan = '\n'.join(lines)
+            used = [index for index in ROUTE_INDEXES if re.search(rf'\b{index}\b', plan)]
+            print(f"\n=== {route}\n    indexes: {', '.join(used) or 'none'}")
+            for line in lines:
+                print(f"    {line}")
+        await connection.rollback()  # EXPLAIN ANALYZE executes the statement; keep nothing
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Print the query plan of every db_app route")
+    parser.add_argument('--seed', nargs='*', default=[], help="Scrape dumps to load before explaining")
+    parser.add_argument('--copies', type=int, default=0, help="Extra synthetic copies of the seed dumps")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.seed:
+        asyncio.run(seed_database(args.seed, args.copies))
+    asyncio.run(explain_routes())
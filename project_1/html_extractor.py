@@ -0,0 +1,204 @@
+import os
+import re
+import sys
+import json
+import hashlib
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Optional
+
+from selectolax.lexbor import LexborHTMLParser
+
+from scraper_selectors import PROPERTY_SELECTORS, UNIT_CARD_LIMIT, empty_property_record, empty_unit_record
+
+logger = logging.getLogger(__name__)
+
+'''--- Offline extraction backend ---
+Parses a captured page HTML snapshot (page.content()) with the same PROPERTY_SELECTORS used by the
+Playwright locator backend, so parsing can run in worker processes and be re-run against stored
+snapshots without touching the network. Return values mirror safe_inner_text/safe_get_attribute:
+missing element -> 'N/A', element present but empty -> None.
+'''
+
+# Playwright's :has-text("...") pseudo-class is not CSS, so it is evaluated here by hand
+HAS_TEXT_PATTERN = re.compile(r""":has-text\((["'])(.*?)\1\)""")
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+SNAPSHOT_URL_PREFIX = '<!-- snapshot-url: '
+
+
+def _normalised_text(node) -> str:
+    return WHITESPACE_PATTERN.sub(' ', node.text(deep=True)).strip().lower()
+
+
+def query_all(root, selector: str) -> list:
+    """Runs a CSS selector that may contain Playwright :has-text() filters and returns matching nodes in document order."""
+    match = HAS_TEXT_PATTERN.search(selector)
+    if not match:
+        return root.css(selector)
+
+    head, tail = selector[:match.start()], selector[match.end():]
+    needle = WHITESPACE_PATTERN.sub(' ', match.group(2)).strip().lower()
+    # A compound continuation (e.g. ':has-text("x").active') is applied as a filter on the same node
+    compound, _, descendant = tail.partition(' ')
+    candidates = [node for node in root.css(head or '*') if needle in _normalised_text(node)]
+    if compound:
+        candidates = [node for node in candidates if node.css_matches(f'*{compound}')]
+    if not descendant.strip():
+        return candidates
+
+    results, seen = [], set()
+    for node in candidates:
+        for child in query_all(node, descendant.strip()):
+            if child.mem_id not in seen:
+                seen.add(child.mem_id)
+                results.append(child)
+    return results
+
+
+def _inner_text(node) -> Optional[str]:
+    text = node.text(deep=True, separator='\n', strip=True).strip()
+    return text if text else None
+
+
+def safe_text(root, selector: str, index: int = 0) -> Optional[str]:
+    """Text of the index-th match of `selector`, 'N/A' if it does not exist or the selector is invalid."""
+    try:
+        nodes = query_all(root, selector)
+        if len(nodes) > index:
+            return _inner_text(nodes[index])
+    except Exception as e:
+        logger.debug(f"Could not get text for '{selector}': {e}")
+    return "N/A"
+
+
+def safe_attribute(node, attribute: str) -> Optional[str]:
+    """Attribute value of `node`, 'N/A' if the attribute is not present."""
+    if attribute not in node.attributes:
+        return "N/A"
+    attr_value = node.attributes.get(attribute)
+    return attr_value.strip() if attr_value and attr_value.strip() else None
+
+
+def extract_unit_card(card, selectors: dict = PROPERTY_SELECTORS) -> dict:
+    """Extracts a single li.unitContainer node into the unit record shape."""
+    unit_pricing_data = empty_unit_record()
+    unit_pricing_data['apartment_name'] = safe_text(card, selectors['apartment_name'])
+    unit_pricing_data['rent_price_range'] = safe_text(card, selectors['rent_price_range'])
+    unit_pricing_data['bedrooms'] = safe_attribute(card, selectors['bedrooms_attr'])
+    unit_pricing_data['bathrooms'] = safe_attribute(card, selectors['bathrooms_attr'])
+
+    sqft_val = safe_text(card, selectors['sqft_col'])
+    if sqft_val == "N/A":  # Fallback if direct column not found or empty
+        for span in card.css(selectors['details_sqft_text']):
+            text = _inner_text(span) or ''
+            if "Sq Ft" in text:
+                sqft_val = text.replace("Sq Ft", "").strip()
+                break
+    unit_pricing_data['sqft'] = sqft_val
+
+    unit_pricing_data['unit'] = safe_text(card, selectors['unit'])
+    unit_pricing_data['base_rent'] = safe_text(card, selectors['base_rent'])
+    availability_raw = safe_text(card, selectors['availability']) or 'N/A'
+    cleaned_availability = availability_raw.split('\n')[-1]
+    unit_pricing_data['availability'] = cleaned_availability.strip() if cleaned_availability else 'N/A'
+    unit_pricing_data['details_link'] = safe_attribute(card, selectors['details_link_attr'])
+    return unit_pricing_data
+
+
+def extract_property_from_html(html: str, url: str, selectors: dict = PROPERTY_SELECTORS) -> dict:
+    """
+    Parses a detail page snapshot into the same dict shape scrape_apartment_page produces.
+    Pages without the standard title are returned with default values, like the locator backend.
+    Note: This is not an async function, as it is CPU-bound, not I/O-bound.
+    """
+    data = empty_property_record(url)
+    tree = LexborHTMLParser(html)
+    if safe_text(tree, selectors['title']) == "N/A":
+        return data
+
+    data['title'] = safe_text(tree, selectors['title'])
+    data['street'] = safe_text(tree, selectors['street_address'])
+    data['state'] = safe_text(tree, f"{selectors['state_zip_container']} span", 0)  # First span in stateZipContainer
+    data['zip_code'] = safe_text(tree, f"{selectors['state_zip_container']} span", 1)  # Second span in stateZipContainer
+    data['city'] = safe_text(tree, selectors['city_span'])
+
+    # Reconstruct full address for consistency
+    data['address'] = f"{data['street']}, {data['city']}, {data['state']} {data['zip_code']}"
+    # Clean up "N/A" components if any
+    data['address'] = ", ".join(filter(lambda x: x != 'N/A', data['address'].split(', '))).strip()
+
+    data['property_reviews'] = safe_text(tree, selectors['property_reviews'])
+    data['listing_verification'] = safe_text(tree, selectors['listing_verification'])
+
+    lease_options = []
+    for container in query_all(tree, selectors['lease_options_container'])[:1]:
+        for column in container.css('.component-list .column'):
+            option = _inner_text(column)
+            if option is not None:
+                lease_options.append(option)
+    data['lease_options'] = lease_options if lease_options else 'N/A'
+
+    year_built_text = safe_text(tree, selectors['year_built_container']) or ''
+    year_built = 'N/A'
+    if "Built in" in year_built_text:
+        year_built = year_built_text.split('Built in ')[-1].split(' ')[0].strip()
+    data['year_built'] = year_built
+
+    unit_cards = tree.css(selectors['unit_cards'])
+    if not unit_cards:
+        logger.warning(f"No unit cards found for {url}. Skipping pricing and floor plans extraction.")
+        return data
+    data['pricing_and_floor_plans'] = [
+        extract_unit_card(card, selectors) for card in unit_cards[:UNIT_CARD_LIMIT]
+    ]
+    return data
+
+
+# --- Snapshot Storage ---
+def save_html_snapshot(snapshot_dir: str, url: str, html: str) -> str:
+    """Writes a page snapshot to disk with its source URL in a leading comment and returns the path."""
+    os.makedirs(snapshot_dir, exist_ok=True)
+    path = os.path.join(snapshot_dir, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.html')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"{SNAPSHOT_URL_PREFIX}{url} -->\n")
+        f.write(html)
+    return path
+
+
+def load_html_snapshot(path: str) -> tuple[str, str]:
+    """Reads a snapshot written by save_html_snapshot and returns (url, html)."""
+    with open(path, encoding='utf-8') as f:
+        html = f.read()
+    url = path
+    if html.startswith(SNAPSHOT_URL_PREFIX):
+        first_line, _, html = html.partition('\n')
+        url = first_line[len(SNAPSHOT_URL_PREFIX):].rsplit(' -->', 1)[0]
+    return url, html
+
+
+def extract_snapshot_file(path: str) -> dict:
+    url, html = load_html_snapshot(path)
+    return extract_property_from_html(html, url)
+
+
+def extract_snapshot_files(paths: Iterable[str], workers: int = os.cpu_count() or 1) -> List[dict]:
+    """Re-runs extraction over stored snapshots in a process pool, preserving input order."""
+    paths = list(paths)
+    if workers <= 1:
+        return [extract_snapshot_file(path) for path in paths]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(extract_snapshot_file, paths, chunksize=max(1, len(paths) // (workers * 4))))
+
+
+if __name__ == '__main__':
+    # Usage: python html_extractor.py snapshot_dir output.json
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    snapshot_dir, output_path = sys.argv[1], sys.argv[2]
+    snapshot_paths = sorted(
+        os.path.join(snapshot_dir, name) for name in os.listdir(snapshot_dir) if name.endswith('.html')
+    )
+    extracted = extract_snapshot_files(snapshot_paths)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(extracted, f, ensure_ascii=False, indent=4)
+    logger.info(f"Extracted {len(extracted)} listings from {snapshot_dir} into {output_path}")
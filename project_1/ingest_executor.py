@@ -0,0 +1,186 @@
+import time
+import zlib
+import asyncio
+import logging
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy.exc import DBAPIError, IntegrityError, OperationalError
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_random_exponential
+
+from db_ops import (
+    async_session_maker, bulk_upsert_batch, save_batch_to_db, create_db_and_tables, log_floor_plan_counts,
+    bump_data_version, refresh_analytics_summary, ensure_current_rent_partitions, bulk_upsert_supported, engine,
+    BULK_BATCH_SIZE,
+)
+from db_engine import pool_settings
+from metrics import DB_INSERT_FAILURES, INGEST_BATCHES, INGEST_ROWS, INGEST_BATCH_SECONDS, INGEST_ROWS_PER_SECOND
+
+logger = logging.getLogger(__name__)
+
+'''--- Concurrent Ingest Executor ---
+Writes listings with K writer tasks instead of one sequential session. Listings are partitioned by a hash of
+property_link, so every copy of a listing goes to the same worker and two workers never write the same
+property row (no lock waits or deadlocks between them). Each worker commits per batch with its own session
+from the 'ingest' pool. A batch that fails with an integrity, serialization or deadlock error is rolled
+back and retried; once it runs out of attempts, or fails for any other reason, it is written property by
+property with savepoints (db_ops.save_batch_to_db), so one bad listing never costs the batch.
+'''
+
+# Writer tasks; each holds at most one pooled connection, so keep this within the ingest pool size
+INGEST_WORKERS = pool_settings('ingest').pool_size
+RETRY_ATTEMPTS = 4
+
+# PostgreSQL SQLSTATEs that mean "run the transaction again": serialization_failure, deadlock_detected
+RETRYABLE_SQLSTATES = {'40001', '40P01'}
+
+
+def partition_for(property_link: str, workers: int) -> int:
+    """Stable worker index of a listing (crc32, unlike hash(), doesn't change between processes)."""
+    return zlib.crc32(property_link.encode('utf-8')) % workers
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Errors a later attempt of the same batch can succeed on: a concurrent writer won the race, or lost a lock."""
+    if isinstance(error, IntegrityError):
+        return True
+    if isinstance(error, DBAPIError):
+        sqlstate = getattr(error.orig, 'sqlstate', None) or getattr(error.orig, 'pgcode', None)
+        if sqlstate in RETRYABLE_SQLSTATES:
+            return True
+        # SQLite reports a concurrent writer as "database is locked"
+        return isinstance(error, OperationalError) and 'locked' in str(error.orig)
+    return False
+
+
+class IngestExecutor:
+    """
+    Partitioned concurrent writer. submit() listings (it waits while the worker's queue is full), then close()
+    to flush the last batches; or use ingest_scraped_data() for a finished scrape.
+    """
+
+    def __init__(self, workers: int = INGEST_WORKERS, batch_size: int = BULK_BATCH_SIZE, bulk: bool = True,
+                 on_committed: Optional[Callable[[List[Dict[str, Any]]], None]] = None):
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        # Databases without INSERT ... ON CONFLICT get the per-property savepoint path
+        self.bulk = bulk and bulk_upsert_supported(engine.dialect.name)
+        self.on_committed = on_committed
+        self.counts = Counter()
+        self.floor_plan_counts = Counter()
+        self._queues = [asyncio.Queue(maxsize=batch_size * 2) for _ in range(self.workers)]
+        self._tasks = []
+        self._started = None
+
+    async def start(self):
+        if self.bulk:
+            # ON CONFLICT (property_link) needs the unique index of migration 0001; also this month's rent partitions
+            await create_db_and_tables()
+        else:
+            await ensure_current_rent_partitions()
+        self._started = time.perf_counter()
+        self._tasks = [asyncio.create_task(self._worker(index, queue)) for index, queue in enumerate(self._queues)]
+
+    async def submit(self, prop_data: Dict[str, Any]):
+        property_link = prop_data.get('property_link')
+        if not property_link:
+            logger.warning(f"Skipping property due to missing property_link: {prop_data.get('title', 'N/A')}")
+            return
+        index = partition_for(property_link, self.workers)
+        # A dead worker never drains its queue; surface its error instead of blocking forever
+        if self._tasks[index].done():
+            self._tasks[index].result()
+        await self._queues[index].put(prop_data)
+
+    async def close(self) -> Dict[str, Any]:
+        """Flushes every worker's last batch, waits for them and returns the run's counts."""
+        for task, queue in zip(self._tasks, self._queues):
+            if not task.done():
+                await queue.put(None)
+        await asyncio.gather(*self._tasks)
+        elapsed = time.perf_counter() - self._started
+        rows_per_second = self.counts['saved'] / elapsed if elapsed > 0 else 0.0
+        INGEST_ROWS_PER_SECOND.set(rows_per_second)
+        logger.info(f"Ingest executor: {self.counts['saved']} properties committed by {self.workers} workers in "
+                    f"{elapsed:.2f}s ({rows_per_second:.0f} rows/s), batches {dict(self.counts)}")
+        log_floor_plan_counts(self.floor_plan_counts)
+        return {**self.counts, 'seconds': elapsed, 'rows_per_second': rows_per_second}
+
+    async def _worker(self, index: int, queue: asyncio.Queue):
+        batch = []
+        while True:
+            item = await queue.get()
+            if item is not None:
+                batch.append(item)
+            if batch and (item is None or len(batch) >= self.batch_size):
+                await self._write_batch(index, batch)
+                batch = []
+            if item is None:
+                return
+
+    async def _write_once(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """One attempt at the batch in a fresh session; rolled back and re-raised on failure."""
+        async with async_session_maker() as session:
+            try:
+                if self.bulk:
+                    counts = await bulk_upsert_batch(session, batch)
+                    await session.commit()
+                    await bump_data_version(session)
+                    self.floor_plan_counts.update(counts['floor_plans'])
+                    return counts['saved']
+                floor_plan_counts = Counter()
+                saved = await save_batch_to_db(session, batch, floor_plan_counts)
+                self.floor_plan_counts.update(floor_plan_counts)
+                return saved
+            except Exception:
+                await session.rollback()
+                raise
+
+    async def _write_batch(self, index: int, batch: List[Dict[str, Any]]):
+        started = time.perf_counter()
+        outcome = 'committed'
+        try:
+            async for attempt in AsyncRetrying(
+                    retry=retry_if_exception(is_retryable),
+                    stop=stop_after_attempt(RETRY_ATTEMPTS),
+                    wait=wait_random_exponential(multiplier=0.1, max=2),
+                    reraise=True):
+                with attempt:
+                    if attempt.retry_state.attempt_number > 1:
+                        outcome = 'retried'
+                        logger.warning(f"Worker {index}: retrying batch of {len(batch)} "
+                                       f"(attempt {attempt.retry_state.attempt_number}/{RETRY_ATTEMPTS})")
+                    try:
+                        saved = await self._write_once(batch)
+                    except Exception:
+                        DB_INSERT_FAILURES.labels(table='ingest_batch').inc()
+                        raise
+        except Exception as e:
+            outcome = 'fallback'
+            logger.error(f"Worker {index}: batch of {len(batch)} failed ({e}), writing it property by property")
+            async with async_session_maker() as session:
+                floor_plan_counts = Counter()
+                saved = await save_batch_to_db(session, batch, floor_plan_counts)
+                self.floor_plan_counts.update(floor_plan_counts)
+
+        INGEST_BATCH_SECONDS.observe(time.perf_counter() - started)
+        INGEST_BATCHES.labels(outcome=outcome).inc()
+        INGEST_ROWS.inc(len(saved))
+        self.counts[outcome] += 1
+        self.counts['saved'] += len(saved)
+        if self.on_committed:
+            self.on_committed(saved)
+
+
+async def ingest_scraped_data(scraped_data: Iterable[Dict[str, Any]], workers: int = INGEST_WORKERS,
+                              batch_size: int = BULK_BATCH_SIZE, bulk: bool = True) -> Dict[str, Any]:
+    """Concurrent counterpart of db_ops.bulk_save_scraped_data_to_db for a finished scrape or a dump."""
+    executor = IngestExecutor(workers=workers, batch_size=batch_size, bulk=bulk)
+    await executor.start()
+    try:
+        for prop_data in scraped_data:
+            await executor.submit(prop_data)
+    finally:
+        counts = await executor.close()
+    await refresh_analytics_summary()
+    return counts
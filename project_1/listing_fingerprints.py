@@ -0,0 +1,114 @@
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+'''--- Listing Fingerprints ---
+Per-URL fingerprints that let an incremental run skip detail pages that have not changed:
+  - card_hash: hash of the price/beds summary shown on the search results card, refreshed every run
+  - scraped_card_hash: the card_hash at the time the detail page was last scraped successfully
+  - content_hash: hash of the fields extracted from the detail page
+A detail page is opened when the listing is new, its card summary differs from the one it was last
+scraped with, or its last scrape is older than the staleness window. Stored in SQLite so several
+market workers can share one file.
+'''
+
+DEFAULT_FINGERPRINT_DB_PATH = 'listing_fingerprints.sqlite3'
+
+# Fields that change on every scrape without the listing changing
+VOLATILE_FIELDS = frozenset({'timestamp', 'validation_status'})
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS listing_fingerprints (
+    url TEXT PRIMARY KEY,
+    card_hash TEXT,
+    scraped_card_hash TEXT,
+    content_hash TEXT,
+    first_seen_at REAL NOT NULL,
+    last_seen_at REAL NOT NULL,
+    last_scraped_at REAL
+)
+'''
+
+
+def _hash(value) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def card_fingerprint(card: dict) -> Optional[str]:
+    """Hash of a search results card summary, None if the card showed nothing to compare."""
+    summary = {key: ' '.join(value.split()) for key, value in card.items() if value}
+    return _hash(summary) if summary else None
+
+
+def content_fingerprint(listing: dict) -> str:
+    """Hash of the extracted listing fields, ignoring bookkeeping fields."""
+    return _hash({key: value for key, value in listing.items() if key not in VOLATILE_FIELDS})
+
+
+class FingerprintStore:
+    def __init__(self, path: str = DEFAULT_FINGERPRINT_DB_PATH, stale_after_days: float = 7.0):
+        self.path = path
+        self.stale_after_seconds = stale_after_days * 24 * 3600
+        self._connection = sqlite3.connect(path, timeout=30)
+        self._connection.execute(SCHEMA)
+        self._connection.commit()
+
+    def observe_cards(self, cards: dict[str, dict]) -> dict[str, str]:
+        """
+        Stores the card summaries seen on the search results pages and decides per URL whether the
+        detail page needs a visit: 'new', 'changed', 'stale' or 'unchanged'.
+        """
+        now = time.time()
+        urls = list(cards)
+        existing = {}
+        for start in range(0, len(urls), 500):  # Stay under SQLite's bound parameter limit
+            chunk = urls[start:start + 500]
+            rows = self._connection.execute(
+                f"SELECT url, scraped_card_hash, last_scraped_at FROM listing_fingerprints "
+                f"WHERE url IN ({','.join('?' * len(chunk))})", chunk)
+            existing.update({url: (scraped_card_hash, last_scraped_at) for url, scraped_card_hash, last_scraped_at in rows})
+
+        decisions = {}
+        rows_to_write = []
+        for url, card in cards.items():
+            card_hash = card_fingerprint(card)
+            scraped_card_hash, last_scraped_at = existing.get(url, (None, None))
+            if last_scraped_at is None:
+                decisions[url] = 'new'
+            elif card_hash is not None and card_hash != scraped_card_hash:
+                decisions[url] = 'changed'
+            elif now - last_scraped_at > self.stale_after_seconds:
+                decisions[url] = 'stale'  # Also catches cards that showed no price/beds to compare
+            else:
+                decisions[url] = 'unchanged'
+            rows_to_write.append((url, card_hash, now, now))
+
+        self._connection.executemany(
+            "INSERT INTO listing_fingerprints (url, card_hash, first_seen_at, last_seen_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(url) DO UPDATE SET card_hash = excluded.card_hash, last_seen_at = excluded.last_seen_at",
+            rows_to_write)
+        self._connection.commit()
+        return decisions
+
+    def record_scraped(self, url: str, listing: dict) -> bool:
+        """Marks a detail page as scraped with its current card summary. Returns True if its content changed."""
+        content_hash = content_fingerprint(listing)
+        row = self._connection.execute(
+            "SELECT content_hash FROM listing_fingerprints WHERE url = ?", (url,)).fetchone()
+        now = time.time()
+        self._connection.execute(
+            "INSERT INTO listing_fingerprints (url, scraped_card_hash, content_hash, first_seen_at, last_seen_at, last_scraped_at) "
+            "VALUES (?, NULL, ?, ?, ?, ?) "
+            "ON CONFLICT(url) DO UPDATE SET scraped_card_hash = card_hash, content_hash = excluded.content_hash, "
+            "last_scraped_at = excluded.last_scraped_at",
+            (url, content_hash, now, now, now))
+        self._connection.commit()
+        return row is None or row[0] != content_hash
+
+    def close(self):
+        self._connection.close()
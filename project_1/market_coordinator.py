@@ -0,0 +1,192 @@
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import logging
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from urllib.parse import urlparse
+
+from dump_loader import iter_listings
+
+logger = logging.getLogger(__name__)
+
+'''--- Multi-Market Coordinator ---
+Spreads a list of market search URLs (e.g. https://www.apartments.com/boston-ma/) over a pool of worker
+processes. Each worker runs apartment_scraper.main() for one market at a time with its own event loop,
+Firefox instance, run journal and output file, so one slow or crashed market never stalls the others.
+
+Prometheus metrics from every worker are aggregated through prometheus_client's multiprocess mode:
+PROMETHEUS_MULTIPROC_DIR is set before any worker starts, workers write their counters there, and the
+coordinator serves the merged view. Per-market listings are merged into one output file at the end.
+
+    python market_coordinator.py --workers 4 --markets-file markets.txt
+    python market_coordinator.py https://www.apartments.com/boston-ma/ https://www.apartments.com/austin-tx/
+'''
+
+DEFAULT_WORKERS = 4
+DEFAULT_OUTPUT_DIR = 'market_runs'
+DEFAULT_METRICS_DIR = 'prometheus_multiproc'
+DEFAULT_METRICS_PORT = 8001
+
+
+def market_slug(market_url: str) -> str:
+    """'https://www.apartments.com/boston-ma/' -> 'boston-ma', used to name per-market files."""
+    path = urlparse(market_url).path.strip('/')
+    return path.replace('/', '_') or urlparse(market_url).hostname or 'market'
+
+
+def load_markets(paths: list[str], urls: list[str]) -> list[str]:
+    """Market URLs from the command line plus one-per-line files, deduplicated in order."""
+    markets = list(urls)
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            markets.extend(line.strip() for line in f if line.strip() and not line.startswith('#'))
+    return list(dict.fromkeys(markets))
+
+
+# --- Worker ---
+def run_market(market_url: str, output_dir: str, resume: bool = True, incremental: bool = False,
+               output_format: str = 'json', adaptive: bool = False) -> dict:
+    """
+    Worker process entry point: scrapes one market end to end and returns a small summary.
+    Listings are written to the market's output file rather than sent back over the pipe.
+    """
+    # Imported here so prometheus_client picks up PROMETHEUS_MULTIPROC_DIR inherited from the coordinator
+    from apartment_scraper import main
+
+    slug = market_slug(market_url)
+    output_path = os.path.join(output_dir, f"{slug}.jsonl" if output_format == 'ndjson' else f"{slug}.json")
+    started = time.time()
+    summary = {'market': market_url, 'pid': os.getpid(), 'output_path': output_path, 'listings': 0, 'error': None}
+    try:
+        listings = asyncio.run(main(
+            resume=resume,
+            journal_path=os.path.join(output_dir, f"{slug}.journal.jsonl"),
+            main_url=market_url,
+            output_path=output_path,
+            crash_output_path=output_path,
+            incremental=incremental,
+            output_format=output_format,
+            adaptive=adaptive,
+        ))
+        summary['listings'] = len(listings)
+    except Exception as e:
+        logger.error(f"Market {market_url} failed in worker {os.getpid()}: {e}", exc_info=True)
+        summary['error'] = str(e)
+    summary['duration'] = time.time() - started
+    return summary
+
+
+# --- Metrics Aggregation ---
+def prepare_metrics_dir(metrics_dir: str):
+    """Points prometheus_client at an empty multiprocess directory. Must run before metrics.py is imported."""
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir)
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = os.path.abspath(metrics_dir)
+
+
+def serve_aggregated_metrics(port: int):
+    from prometheus_client import CollectorRegistry, start_http_server
+    from prometheus_client.multiprocess import MultiProcessCollector
+
+    registry = CollectorRegistry()
+    MultiProcessCollector(registry)
+    start_http_server(port, registry=registry)
+    logger.info(f"Serving aggregated worker metrics on port {port}")
+
+
+def mark_workers_dead(pids: set[int]):
+    """Drops live-only gauges (memory, in-flight pages) of workers that have exited."""
+    from prometheus_client import multiprocess
+
+    for pid in pids:
+        multiprocess.mark_process_dead(pid)
+
+
+# --- Results Aggregation ---
+def merge_market_outputs(summaries: list[dict], merged_path: str) -> list[dict]:
+    """Combines per-market output files into one list, keeping the first copy of each property link."""
+    merged, seen = [], set()
+    for summary in summaries:
+        if not os.path.exists(summary['output_path']):
+            continue
+        for listing in iter_listings(summary['output_path']):
+            if listing.get('property_link') not in seen:
+                seen.add(listing.get('property_link'))
+                merged.append(listing)
+    with open(merged_path, 'w', encoding='utf-8') as f:
+        json.dump(merged, f, ensure_ascii=False, indent=4)
+    return merged
+
+
+def run_markets(markets: list[str], workers: int = DEFAULT_WORKERS, output_dir: str = DEFAULT_OUTPUT_DIR,
+                resume: bool = True, incremental: bool = False, output_format: str = 'json',
+                adaptive: bool = False) -> list[dict]:
+    """Scrapes every market on a pool of `workers` processes and returns the per-market summaries as they finish."""
+    os.makedirs(output_dir, exist_ok=True)
+    summaries = []
+    # spawn, not fork: each worker starts with a clean interpreter, event loop and Playwright driver
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        futures = {pool.submit(run_market, market, output_dir, resume, incremental, output_format, adaptive): market
+                   for market in markets}
+        for future in as_completed(futures):
+            try:
+                summary = future.result()
+            except Exception as e:  # The worker process itself died (e.g. killed by the OOM killer)
+                extension = 'jsonl' if output_format == 'ndjson' else 'json'
+                summary = {'market': futures[future], 'pid': None, 'listings': 0, 'error': str(e), 'duration': 0.0,
+                           'output_path': os.path.join(output_dir, f"{market_slug(futures[future])}.{extension}")}
+            summaries.append(summary)
+            status = f"failed: {summary['error']}" if summary['error'] else f"{summary['listings']} listings"
+            logger.info(f"[{len(summaries)}/{len(markets)}] {summary['market']} {status} in {summary['duration'] / 60:.2f} minutes")
+    return summaries
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Scrape several apartments.com markets in parallel worker processes")
+    parser.add_argument('markets', nargs='*', help="Market search URLs, e.g. https://www.apartments.com/boston-ma/")
+    parser.add_argument('--markets-file', action='append', default=[], help="File with one market URL per line")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Worker processes, one browser each")
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR, help="Per-market journals and outputs")
+    parser.add_argument('--merged-output', default='apartments_data_all_markets.json')
+    parser.add_argument('--metrics-dir', default=DEFAULT_METRICS_DIR)
+    parser.add_argument('--metrics-port', type=int, default=DEFAULT_METRICS_PORT)
+    parser.add_argument('--no-resume', action='store_true', help="Ignore unfinished run journals and start over")
+    parser.add_argument('--incremental', action='store_true', help="Skip listings unchanged since their last scrape")
+    parser.add_argument('--adaptive', action='store_true',
+                        help="Pace detail pages with the adaptive concurrency controller")
+    parser.add_argument('--ndjson', action='store_true', help="Workers append listings to .jsonl files as they finish")
+    parser.add_argument('--save-db', action='store_true', help="Save the merged listings to the database")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    market_urls = load_markets(args.markets_file, args.markets)
+    if not market_urls:
+        parser.error("No markets given")
+
+    prepare_metrics_dir(args.metrics_dir)
+    serve_aggregated_metrics(args.metrics_port)
+
+    start_time = time.time()
+    market_summaries = run_markets(market_urls, workers=min(args.workers, len(market_urls)),
+                                   output_dir=args.output_dir, resume=not args.no_resume,
+                                   incremental=args.incremental, output_format='ndjson' if args.ndjson else 'json',
+                                   adaptive=args.adaptive)
+    mark_workers_dead({summary['pid'] for summary in market_summaries if summary['pid']})
+
+    all_listings = merge_market_outputs(market_summaries, args.merged_output)
+    failed_markets = [summary['market'] for summary in market_summaries if summary['error']]
+    logger.info(
+        f"Scraped {len(all_listings)} unique listings from {len(market_urls) - len(failed_markets)}/{len(market_urls)} "
+        f"markets in {(time.time() - start_time) / 60:.2f} minutes. Merged output: {args.merged_output}")
+    if failed_markets:
+        logger.warning(f"Failed markets (rerun to resume them from their journals): {failed_markets}")
+
+    if args.save_db:
+        from ingest_executor import ingest_scraped_data
+        asyncio.run(ingest_scraped_data(all_listings))
+    sys.exit(1 if failed_markets else 0)
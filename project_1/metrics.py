@@ -67,23 +67,162 @@ DB_INSERT_FAILURES = Counter(
     ["table"]
 )
 
+FLOOR_PLAN_CHANGES = Counter(
+    "floor_plan_changes_total",
+    "Floor plan rows written by operation (inserted, updated, deleted) and rows left unchanged",
+    ["operation"]
+)
+
+RENT_OBSERVATIONS = Counter(
+    "rent_observations_total",
+    "Rent history rows appended (new units and base_rent changes)"
+)
+
 RETRIES_ATTEMPTED = Counter(
     "scraper_retries_total",
     "Total retry attempts made during scraping",
     ["source"]
 )
 
+# ========================
+# Browser Context Pool Metrics
+# ========================
+
+CONTEXT_BYTES_TRANSFERRED = Counter(
+    "scraper_context_bytes_transferred_total",
+    "Bytes transferred (response headers + bodies) per browser context",
+    ["context"]
+)
+
+REQUESTS_BLOCKED = Counter(
+    "scraper_requests_blocked_total",
+    "Requests aborted by the browser context block list",
+    ["context", "reason"]
+)
+
+REQUESTS_ALLOWED = Counter(
+    "scraper_requests_allowed_total",
+    "Requests let through the browser context block list",
+    ["context"]
+)
+
+# ========================
+# Incremental Re-scrape Metrics
+# ========================
+
+INCREMENTAL_DECISIONS = Counter(
+    "scraper_incremental_decisions_total",
+    "Listings seen on the search results by incremental decision (new, changed, stale, unchanged)",
+    ["source", "decision"]
+)
+
+# ========================
+# Adaptive Concurrency Metrics
+# ========================
+
+SCRAPER_CONCURRENCY_LIMIT = Gauge(
+    "scraper_concurrency_limit",
+    "Current adaptive in-flight page limit per host",
+    ["host"],
+    multiprocess_mode="liveall"
+)
+
+SCRAPER_IN_FLIGHT = Gauge(
+    "scraper_pages_in_flight",
+    "Detail pages currently being scraped per host",
+    ["host"],
+    multiprocess_mode="livesum"
+)
+
+SCRAPE_OUTCOMES = Counter(
+    "scraper_page_outcomes_total",
+    "Detail page outcomes reported to the adaptive controller (ok, error, blocked)",
+    ["host", "outcome"]
+)
+
 # ========================
 # Resource Usage Metrics
 # ========================
 
 # Gauge → represents current values, not counters
+# multiprocess_mode only applies when PROMETHEUS_MULTIPROC_DIR is set (see market_coordinator.py)
 MEMORY_USAGE = Gauge(
     "scraper_memory_usage_mb",
-    "Current memory usage of the scraper in MB"
+    "Current memory usage of the scraper in MB",
+    multiprocess_mode="liveall"
 )
 
 CPU_USAGE = Gauge(
     "scraper_cpu_usage_percent",
-    "Current CPU usage percent of the scraper"
+    "Current CPU usage percent of the scraper",
+    multiprocess_mode="liveall"
+)
+
+# ========================
+# Database Pool Metrics
+# ========================
+
+# pool is the engine role from db_engine.py (api, ingest)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Connections currently checked out of the pool",
+    ["pool"],
+    multiprocess_mode="livesum"
+)
+
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow_connections",
+    "Connections open beyond pool_size (up to max_overflow)",
+    ["pool"],
+    multiprocess_mode="livesum"
+)
+
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_seconds",
+    "Time to get a connection from the pool, including waiting for a free one and the pre-ping",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0, 60.0)
+)
+
+DB_POOL_TIMEOUTS = Counter(
+    "db_pool_timeouts_total",
+    "Checkouts that gave up after pool_timeout because every connection was in use",
+    ["pool"]
+)
+
+# ========================
+# Concurrent Ingest Metrics
+# ========================
+
+INGEST_BATCHES = Counter(
+    "db_ingest_batches_total",
+    "Ingest executor batches by outcome (committed, retried then committed, fallback to per-row savepoints)",
+    ["outcome"]
+)
+
+INGEST_ROWS = Counter(
+    "db_ingest_rows_total",
+    "Properties committed by the ingest executor"
+)
+
+INGEST_BATCH_SECONDS = Histogram(
+    "db_ingest_batch_seconds",
+    "Time to write and commit one ingest batch, retries included",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+INGEST_ROWS_PER_SECOND = Gauge(
+    "db_ingest_rows_per_second",
+    "Throughput of the last ingest executor run",
+    multiprocess_mode="liveall"
+)
+
+# ========================
+# Analytics Metrics
+# ========================
+
+ANALYTICS_REFRESH_SECONDS = Histogram(
+    "analytics_refresh_seconds",
+    "Time to rebuild the analytics summary tables after an ingest run",
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
 )
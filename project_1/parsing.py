@@ -0,0 +1,102 @@
+import re
+import math
+from functools import lru_cache
+from typing import Any, Iterable, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+'''--- Numeric parsing for scraped fields ---
+Scraped numbers arrive as display strings: "$2,872", "$2,872 – $3,100", "1,202 Sq Ft", "1.5", "Studio",
+"Call for Rent", "N/A". parse_range() turns one of them into (min, max) with precompiled patterns and is
+memoised, since the same handful of strings ("1", "2", "N/A", "$3,600") make up most of a dump.
+parse_numeric_columns() does a whole column at once: each distinct string is parsed once and the results
+are broadcast back to every row with numpy.
+'''
+
+# A number with optional thousands separators and decimals: 2,872 / 1.5 / .5
+NUMBER_PATTERN = re.compile(r'\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?|\.\d+')
+# Two numbers joined by a hyphen, en/em dash or "to" form a range
+RANGE_SEPARATOR_PATTERN = re.compile(r'^\s*(?:-|–|—|to)\s*$', re.IGNORECASE)
+
+# Whole-value words that stand for a number
+WORD_VALUES = {'studio': 0.0}
+
+# Scraped columns parse_numeric_columns knows about, and whether they hold whole numbers
+NUMERIC_FIELDS = {
+    'bedrooms': True,
+    'bathrooms': False,
+    'sqft': True,
+    'base_rent': False,
+    'year_built': True,
+    'property_reviews': False,
+}
+
+
+class ParsedColumn(NamedTuple):
+    """Lower and upper bound of every value in a column; NaN where the value had no number."""
+    min: np.ndarray
+    max: np.ndarray
+
+
+@lru_cache(maxsize=65536)
+def parse_range(text: str) -> tuple[Optional[float], Optional[float]]:
+    """
+    Parses a display string into (min, max). Single values give min == max, ranges such as
+    "$2,872 – $3,100" give both ends, and strings without a number ("Call for Rent") give (None, None).
+    """
+    word_value = WORD_VALUES.get(text.strip().lower())
+    if word_value is not None:
+        return word_value, word_value
+
+    matches = list(NUMBER_PATTERN.finditer(text))
+    if not matches:
+        return None, None
+    first = float(matches[0].group().replace(',', ''))
+    if len(matches) >= 2:
+        separator = text[matches[0].end():matches[1].start()].replace('$', '')
+        if RANGE_SEPARATOR_PATTERN.match(separator):
+            second = float(matches[1].group().replace(',', ''))
+            return min(first, second), max(first, second)
+    return first, first
+
+
+def parse_numeric(value: Any) -> Optional[float]:
+    """Lower bound of a scraped value as a float, None if it holds no number."""
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        try:
+            return float(value)
+        except (ValueError, TypeError):
+            return None
+    return parse_range(value)[0]
+
+
+def parse_numeric_columns(records: list[dict], fields: Iterable[str] = NUMERIC_FIELDS) -> dict[str, ParsedColumn]:
+    """
+    Parses the given fields of every record in one pass per column. Each distinct raw value is parsed once
+    (pandas.factorize) and the bounds are gathered back to row order with numpy indexing.
+    """
+    columns = {}
+    for field in fields:
+        raw_values = [record.get(field) for record in records]
+        codes, uniques = pd.factorize(pd.Series(raw_values, dtype=object), use_na_sentinel=True)
+        # One slot per distinct value plus a trailing NaN that missing values (code -1) index into
+        bounds = np.full((len(uniques) + 1, 2), np.nan)
+        for i, value in enumerate(uniques):
+            if isinstance(value, str):
+                low, high = parse_range(value)
+            else:
+                low = high = parse_numeric(value)
+            if low is not None:
+                bounds[i] = (low, high)
+        gathered = bounds[codes]
+        columns[field] = ParsedColumn(min=gathered[:, 0], max=gathered[:, 1])
+    return columns
+
+
+def to_optional_list(values: np.ndarray, integer: bool = False) -> list:
+    """Converts a parsed array back to Python values for the database: NaN -> None, optionally whole numbers."""
+    cast = int if integer else float
+    return [None if math.isnan(value) else cast(value) for value in values.tolist()]
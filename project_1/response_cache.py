@@ -0,0 +1,141 @@
+import os
+import gzip
+import time
+import sqlite3
+import hashlib
+import logging
+from typing import Optional
+
+from playwright.async_api import BrowserContext, Response, Route
+
+logger = logging.getLogger(__name__)
+
+'''--- Response Cache ---
+Content-addressed on-disk cache of the HTML documents the scraper fetches (search results and detail pages).
+Bodies are gzip-compressed and stored once per content hash under blobs/; a SQLite index maps
+(url, fetched_at) to the hash, so unchanged pages fetched on different days share one blob.
+
+attach_recorder() stores every document a browser context loads. attach_replay() serves documents from
+the cache instead of the network and aborts every other request, so extraction can be re-run at CPU speed
+against a fixed corpus with no network access.
+'''
+
+DEFAULT_CACHE_DIR = 'response_cache'
+DEFAULT_TTL_DAYS = 14
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    content_hash TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    content_type TEXT,
+    PRIMARY KEY (url, fetched_at)
+)
+'''
+
+
+class ResponseCache:
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, ttl_days: float = DEFAULT_TTL_DAYS):
+        self.directory = directory
+        self.ttl_seconds = ttl_days * 24 * 3600
+        os.makedirs(os.path.join(directory, 'blobs'), exist_ok=True)
+        self._connection = sqlite3.connect(os.path.join(directory, 'index.sqlite3'), timeout=30)
+        self._connection.execute(SCHEMA)
+        self._connection.commit()
+
+    def _blob_path(self, content_hash: str) -> str:
+        return os.path.join(self.directory, 'blobs', content_hash[:2], f"{content_hash}.html.gz")
+
+    def store(self, url: str, body: bytes, status: int = 200, content_type: str = 'text/html; charset=utf-8') -> str:
+        """Stores a fetched body under its content hash and indexes it for `url`. Returns the hash."""
+        content_hash = hashlib.sha256(body).hexdigest()
+        blob_path = self._blob_path(content_hash)
+        if not os.path.exists(blob_path):
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            # Write then rename, so a crash never leaves a truncated blob behind a valid index row
+            temp_path = f"{blob_path}.{os.getpid()}.tmp"
+            with gzip.open(temp_path, 'wb') as f:
+                f.write(body)
+            os.replace(temp_path, blob_path)
+        self._connection.execute(
+            "INSERT OR REPLACE INTO responses (url, fetched_at, content_hash, status, content_type) VALUES (?, ?, ?, ?, ?)",
+            (url, time.time(), content_hash, status, content_type))
+        self._connection.commit()
+        return content_hash
+
+    def latest(self, url: str) -> Optional[tuple[bytes, int, str]]:
+        """The newest cached (body, status, content_type) for `url`, None if it was never fetched."""
+        row = self._connection.execute(
+            "SELECT content_hash, status, content_type FROM responses WHERE url = ? ORDER BY fetched_at DESC LIMIT 1",
+            (url,)).fetchone()
+        if row is None:
+            return None
+        content_hash, status, content_type = row
+        try:
+            with gzip.open(self._blob_path(content_hash), 'rb') as f:
+                return f.read(), status, content_type
+        except FileNotFoundError:
+            logger.warning(f"Cached blob {content_hash} for {url} is missing")
+            return None
+
+    def evict_expired(self) -> int:
+        """Drops index rows older than the TTL and deletes blobs no remaining row points to. Returns blobs deleted."""
+        cutoff = time.time() - self.ttl_seconds
+        self._connection.execute("DELETE FROM responses WHERE fetched_at < ?", (cutoff,))
+        self._connection.commit()
+        referenced = {row[0] for row in self._connection.execute("SELECT DISTINCT content_hash FROM responses")}
+
+        deleted = 0
+        blobs_dir = os.path.join(self.directory, 'blobs')
+        for prefix in os.listdir(blobs_dir):
+            for name in os.listdir(os.path.join(blobs_dir, prefix)):
+                if name.split('.', 1)[0] not in referenced:
+                    os.remove(os.path.join(blobs_dir, prefix, name))
+                    deleted += 1
+        if deleted:
+            logger.info(f"Evicted {deleted} cached responses older than {self.ttl_seconds / 86400:.0f} days")
+        return deleted
+
+    def stats(self) -> dict:
+        urls, rows, blobs = self._connection.execute(
+            "SELECT COUNT(DISTINCT url), COUNT(*), COUNT(DISTINCT content_hash) FROM responses").fetchone()
+        return {'urls': urls, 'fetches': rows, 'blobs': blobs}
+
+    def close(self):
+        self._connection.close()
+
+
+# --- Browser Integration ---
+async def attach_recorder(context: BrowserContext, cache: ResponseCache):
+    """Stores every successfully loaded HTML document of the context in the cache."""
+    async def handle_response(response: Response):
+        if response.request.resource_type != 'document' or response.status != 200:
+            return
+        try:
+            body = await response.body()
+        except Exception as e:
+            logger.debug(f"Could not read body of {response.url} for the cache: {e}")
+            return
+        cache.store(response.url, body, response.status, response.headers.get('content-type', 'text/html'))
+
+    context.on('response', handle_response)
+
+
+async def attach_replay(context: BrowserContext, cache: ResponseCache):
+    """
+    Serves documents from the cache and aborts every other request, including documents that were never cached.
+    Registered last, so it takes precedence over any route the context already has.
+    """
+    async def handle_route(route: Route):
+        request = route.request
+        cached = cache.latest(request.url) if request.resource_type == 'document' else None
+        if cached is None:
+            if request.resource_type == 'document':
+                logger.warning(f"Replay: {request.url} is not in the response cache")
+            await route.abort('internetdisconnected')
+            return
+        body, status, content_type = cached
+        await route.fulfill(status=status, body=body, headers={'content-type': content_type})
+
+    await context.route('**/*', handle_route)
@@ -0,0 +1,124 @@
+import os
+import json
+import time
+import logging
+from typing import Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+'''--- Run Journal ---
+Append-only JSON-lines log of a scrape run: the URL frontier discovered by scrape_all_pages, then one
+record per listing as it finishes. A crashed run is resumed by replaying the journal, skipping every
+URL that already has a result and re-trying the ones that raised.
+
+Record types:
+    {"type": "frontier", "urls": [...]}
+    {"type": "listing", "url": ..., "data": {...}}   - finished, data is what scrape_apartment_page returned
+    {"type": "stored", "url": ...}                   - committed to the database by the streaming writer
+    {"type": "failed", "url": ..., "error": ...}     - raised, will be retried on resume
+    {"type": "complete"}                             - run finished, the next run starts a new journal
+'''
+
+DEFAULT_JOURNAL_PATH = 'scrape_run.journal.jsonl'
+
+
+class RunJournal:
+    def __init__(self, path: str = DEFAULT_JOURNAL_PATH, fsync: bool = True, keep_listings: bool = True):
+        self.path = path
+        self.fsync = fsync
+        # Streaming runs only need to know which URLs are done, not hold every listing in memory
+        self.keep_listings = keep_listings
+        self._file = None
+        self._reset()
+
+    def _reset(self):
+        self.frontier: Optional[List[str]] = None
+        self.listings: dict[str, Optional[dict]] = {}
+        self.failed: dict[str, str] = {}
+        self.is_complete = False
+
+    # --- Replay ---
+    def load(self) -> "RunJournal":
+        """Replays an existing journal. A torn last line from a crash is ignored."""
+        if not os.path.exists(self.path):
+            return self
+        with open(self.path, encoding='utf-8') as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Ignoring unreadable journal line {line_number} in {self.path}")
+                    continue
+                self._apply(record)
+        logger.info(
+            f"Loaded run journal {self.path}: {len(self.frontier or [])} URLs in frontier, "
+            f"{len(self.listings)} finished, {len(self.failed)} failed")
+        return self
+
+    def _apply(self, record: dict):
+        record_type = record.get('type')
+        if record_type == 'frontier':
+            self.frontier = record['urls']
+        elif record_type in ('listing', 'stored'):
+            self.listings[record['url']] = record.get('data') if self.keep_listings else None
+            self.failed.pop(record['url'], None)
+        elif record_type == 'failed':
+            self.failed[record['url']] = record.get('error', '')
+        elif record_type == 'complete':
+            self.is_complete = True
+
+    def archive(self):
+        """Moves a finished journal aside so the next run starts from an empty one."""
+        self.close()
+        if os.path.exists(self.path):
+            archived_path = f"{self.path}.{time.strftime('%Y%m%d-%H%M%S')}"
+            os.replace(self.path, archived_path)
+            logger.info(f"Archived finished run journal to {archived_path}")
+        self._reset()
+
+    # --- Append ---
+    def _append(self, record: dict):
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+            if self._file.tell() > 0 and not self._ends_with_newline():
+                self._file.write('\n')  # Terminate a torn line left by a crash so it stays a single bad record
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._apply(record)
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    def record_frontier(self, urls: Iterable[str]):
+        self._append({'type': 'frontier', 'urls': list(urls)})
+
+    def record_listing(self, url: str, data: dict):
+        self._append({'type': 'listing', 'url': url, 'data': data})
+
+    def record_stored(self, url: str):
+        self._append({'type': 'stored', 'url': url})
+
+    def record_failure(self, url: str, error: str):
+        self._append({'type': 'failed', 'url': url, 'error': error})
+
+    def record_complete(self):
+        self._append({'type': 'complete'})
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    # --- Queries ---
+    def pending(self, urls: Iterable[str]) -> List[str]:
+        """URLs from `urls` that do not have a finished listing yet, in order."""
+        return [url for url in urls if url not in self.listings]
+
+    def successful_listings(self) -> List[dict]:
+        return [data for data in self.listings.values() if data and data.get('validation_status') == 'Success']
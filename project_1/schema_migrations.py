@@ -0,0 +1,173 @@
+import logging
+from datetime import datetime
+from typing import NamedTuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger(__name__)
+
+'''--- Schema Migrations ---
+Indexes for databases created before they were declared on the models in dbmodels.py. create_all() only
+creates missing tables, so an existing property table never picks up a new index on its own.
+Every migration is safe to re-run (IF NOT EXISTS, deletes of rows a rerun no longer finds) and applied
+migrations are recorded in schema_migration, so apply_migrations() runs on every startup.
+On PostgreSQL, processes starting together apply them one at a time under an advisory lock.
+It takes a sync connection: use it with run_sync.
+
+    python schema_migrations.py
+'''
+
+
+class Migration(NamedTuple):
+    name: str
+    # Statements per dialect name; '*' applies to every dialect
+    statements: dict
+    # Optional migrations run in a savepoint: if the database refuses them (e.g. the role may not create
+    # an extension) they are skipped with a warning and retried on the next startup instead of failing it
+    optional: bool = False
+
+
+# Older databases can hold several rows per property_link. The newest (timestamp, then id) is kept: it has the
+# latest scrape's floor plans, so the duplicates' floor plans are dropped and their rent history is moved to it.
+DEDUPE_PROPERTY_LINKS = [
+    "CREATE TEMPORARY TABLE property_link_duplicate AS "
+    "SELECT id AS duplicate_id, keeper_id FROM ("
+    "SELECT id, first_value(id) OVER (PARTITION BY property_link ORDER BY timestamp DESC, id DESC) AS keeper_id "
+    "FROM property WHERE property_link IS NOT NULL) ranked "
+    "WHERE id <> keeper_id",
+    "DELETE FROM pricing_and_floor_plans WHERE property_id IN (SELECT duplicate_id FROM property_link_duplicate)",
+    # Observations the keeper already has for the same unit and time stay behind and are deleted below
+    "UPDATE rent_observation SET property_id = "
+    "(SELECT keeper_id FROM property_link_duplicate WHERE duplicate_id = rent_observation.property_id) "
+    "WHERE property_id IN (SELECT duplicate_id FROM property_link_duplicate) AND NOT EXISTS ("
+    "SELECT 1 FROM rent_observation kept JOIN property_link_duplicate d ON kept.property_id = d.keeper_id "
+    "WHERE d.duplicate_id = rent_observation.property_id AND kept.unit_key = rent_observation.unit_key "
+    "AND kept.observed_at = rent_observation.observed_at)",
+    "DELETE FROM rent_observation WHERE property_id IN (SELECT duplicate_id FROM property_link_duplicate)",
+    "DELETE FROM property WHERE id IN (SELECT duplicate_id FROM property_link_duplicate)",
+    "DROP TABLE property_link_duplicate",
+]
+
+MIGRATIONS = [
+    # save_scraped_data_to_db looks up every listing by property_link, and ON CONFLICT (property_link) needs it
+    # unique; the only place that index is created for existing tables (db_ops' bulk paths run the migrations)
+    Migration('0001_property_link_unique', {
+        '*': DEDUPE_PROPERTY_LINKS + [
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_property_property_link ON property (property_link)",
+        ],
+    }),
+    # /properties/search filters on city ILIKE '%x%'; only a trigram index can serve a leading wildcard
+    Migration('0002_property_city_trigram', {
+        'postgresql': [
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+            "CREATE INDEX IF NOT EXISTS ix_property_city_trgm ON property USING gin (city gin_trgm_ops)",
+        ],
+    }, optional=True),
+    # Case-insensitive equality and prefix lookups on city
+    Migration('0003_property_city_lower', {
+        '*': ["CREATE INDEX IF NOT EXISTS ix_property_city_lower ON property (lower(city))"],
+    }),
+    # Floor plans of one property (the join in every property route) and its rent filter;
+    # bedrooms/base_rent filters across all properties
+    Migration('0004_floor_plan_composites', {
+        '*': [
+            "CREATE INDEX IF NOT EXISTS ix_pricing_and_floor_plans_property_id_base_rent "
+            "ON pricing_and_floor_plans (property_id, base_rent)",
+            "CREATE INDEX IF NOT EXISTS ix_pricing_and_floor_plans_bedrooms_base_rent "
+            "ON pricing_and_floor_plans (bedrooms, base_rent)",
+        ],
+    }),
+    # /this-weeks-listings filters on the scrape timestamp
+    Migration('0005_property_timestamp', {
+        '*': ["CREATE INDEX IF NOT EXISTS ix_property_timestamp ON property (timestamp)"],
+    }),
+    # /top/{x}/most-affordable-properties and most-expensive read the ends of base_rent order
+    Migration('0006_floor_plan_base_rent', {
+        '*': ["CREATE INDEX IF NOT EXISTS ix_pricing_and_floor_plans_base_rent ON pricing_and_floor_plans (base_rent)"],
+    }),
+    # /all-property-listings?order_by=timestamp pages by the (timestamp, id) keyset
+    Migration('0007_property_timestamp_id', {
+        '*': ["CREATE INDEX IF NOT EXISTS ix_property_timestamp_id ON property (timestamp, id)"],
+    }),
+    # /properties/search?city_match=prefix runs lower(city) LIKE 'x%'; btree only serves LIKE with pattern ops
+    Migration('0008_property_city_lower_prefix', {
+        'postgresql': [
+            "CREATE INDEX IF NOT EXISTS ix_property_city_lower_prefix ON property (lower(city) text_pattern_ops)",
+        ],
+    }),
+    # The row the ingest paths bump and the API search cache reads (dbmodels.Data_version)
+    Migration('0009_data_version_listings', {
+        '*': ["INSERT INTO data_version (name, version, updated_at) "
+              "SELECT 'listings', 0, CURRENT_TIMESTAMP WHERE NOT EXISTS "
+              "(SELECT 1 FROM data_version WHERE name = 'listings')"],
+    }),
+    # The row analytics.refresh_analytics() locks and counts refreshes in; 0 until the first refresh
+    Migration('0010_data_version_analytics', {
+        '*': ["INSERT INTO data_version (name, version, updated_at) "
+              "SELECT 'analytics', 0, CURRENT_TIMESTAMP WHERE NOT EXISTS "
+              "(SELECT 1 FROM data_version WHERE name = 'analytics')"],
+    }),
+]
+
+CREATE_MIGRATION_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS schema_migration (
+        name VARCHAR(100) PRIMARY KEY,
+        applied_at TIMESTAMP NOT NULL
+    )
+'''
+
+
+def lock_migrations(connection):
+    """
+    Serialises schema changes across processes until the transaction ends (PostgreSQL only). The API,
+    ingest workers and bulk loader all run create_db_and_tables on startup and may start together.
+    """
+    if connection.dialect.name == 'postgresql':
+        connection.execute(text("SELECT pg_advisory_xact_lock(hashtext('schema_migration'))"))
+
+
+def _run_statements(connection, migration: Migration) -> bool:
+    """Runs a migration's statements; returns False if an optional migration was refused and skipped."""
+    statements = migration.statements.get('*', []) + migration.statements.get(connection.dialect.name, [])
+    if not migration.optional:
+        for statement in statements:
+            connection.execute(text(statement))
+        return True
+    try:
+        with connection.begin_nested():
+            for statement in statements:
+                connection.execute(text(statement))
+    except DBAPIError as e:
+        logger.warning(f"Skipping schema migration {migration.name}, it will be retried on the next startup: {e.orig}")
+        return False
+    return True
+
+
+def apply_migrations(connection) -> list[str]:
+    """Applies the migrations not yet recorded in schema_migration, in order. Returns their names."""
+    lock_migrations(connection)
+    connection.execute(text(CREATE_MIGRATION_TABLE_SQL))
+    # Read under the lock, so a migration another process just applied is not applied twice
+    applied = set(connection.execute(text("SELECT name FROM schema_migration")).scalars())
+
+    newly_applied = []
+    for migration in MIGRATIONS:
+        if migration.name in applied:
+            continue
+        if not _run_statements(connection, migration):
+            continue
+        connection.execute(text("INSERT INTO schema_migration (name, applied_at) VALUES (:name, :applied_at)"),
+                           {'name': migration.name, 'applied_at': datetime.utcnow()})
+        newly_applied.append(migration.name)
+    if newly_applied:
+        logger.info(f"Applied schema migrations: {newly_applied}")
+    return newly_applied
+
+
+if __name__ == '__main__':
+    import asyncio
+    from db_ops import create_db_and_tables
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    asyncio.run(create_db_and_tables())
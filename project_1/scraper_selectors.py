@@ -0,0 +1,70 @@
+'''--- Selectors and record templates shared by every extraction backend ---
+Kept free of Playwright and logging setup so it can be imported cheaply by parser worker processes.
+'''
+
+# Maximum number of unit cards extracted per listing
+UNIT_CARD_LIMIT = 30
+
+# Define selectors for better maintainability
+PROPERTY_SELECTORS = {
+    'pricecontainer' : '.priceBedRangeInfoContainer',
+    'title': 'h1.propertyName',
+    'address_container': '.propertyAddressContainer',  # Container for street, city, state, zip
+    'street_address': '.delivery-address span',
+    'city_state_zip_container': '.propertyAddressContainer h2',  # Container for city, state, zip (as a block)
+    'city_span': "h2 > span.nth-of-type(2)",
+    'state_zip_container': '.stateZipContainer',  # Specific state/zip container
+    'property_reviews': '.reviewRating',
+    'listing_verification': 'span.verifedText',  # its verifed and not verified the correct spelling
+    'lease_options_container': '.feesPoliciesCard:has-text("Lease Options")',
+    'year_built_container': '.feesPoliciesCard:has-text("Property Information") .component-list .column:has-text("Built in")',
+    'unit_cards': 'li.unitContainer',
+    'apartment_name': '.modelName',
+    'rent_price_range': '.rentLabel',
+    'bedrooms_attr': 'data-beds',  # Attribute, not a selector
+    'bathrooms_attr': 'data-baths',  # Attribute, not a selector
+    'sqft_col': '.sqftColumn span:not(.screenReaderOnly)',  # Direct sqft column
+    'details_sqft_text': '.detailsTextWrapper span',  # Fallback for sqft if not in column
+    'unit': '.unitColumn span[title]',
+    'base_rent': '.pricingColumn > span:not(.screenReaderOnly)',
+    'availability': '.availableColumn .dateAvailable:not(.screenReaderOnly)',
+    'details_link_attr': 'data-unitkey'  # Attribute, not a selector
+}
+
+# Listing cards on the search results pages, used for the incremental re-scrape fingerprints
+SEARCH_CARD_SELECTORS = {
+    'link': 'a.property-link',
+    'card': 'article',  # Card that contains the property link
+    'pricing': '.property-pricing, .price-range',
+    'beds': '.property-beds, .bed-range',
+    'page_range': '.pageRange',  # "Page 1 of 28"
+}
+
+
+def empty_property_record(url: str) -> dict:
+    """Returns the default output dict for a listing before any field has been extracted."""
+    return {
+        'title': 'N/A',
+        'property_link': url,
+        'address': 'N/A',
+        'property_reviews': '0',  # Default to '0' if no reviews found
+        'listing_verification': 'N/A',
+        'lease_options': 'N/A',
+        'year_built': 'N/A',
+        'price' : "Refer to the pricing and floor plan",
+        'street': 'N/A',
+        'city': 'N/A',
+        'state': 'N/A',
+        'zip_code': 'N/A',
+        'property_type': "Apartment",  # Added for consistency
+        'pricing_and_floor_plans': []  # This will be a list of dictionaries for each floor plan
+    }
+
+
+def empty_unit_record() -> dict:
+    """Returns the default output dict for a single unit card."""
+    return {
+        'apartment_name':"N/A", 'rent_price_range': 'N/A', 'bedrooms': 'N/A',
+        'bathrooms': 'N/A', 'sqft': 'N/A', 'unit': 'N/A',
+        'base_rent': 'N/A', 'availability': 'N/A', 'details_link': 'N/A'
+    }
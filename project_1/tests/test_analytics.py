@@ -0,0 +1,121 @@
+import statistics
+
+import pytest
+
+from analytics import TopK, percentile
+from conftest import make_listing, make_floor_plan
+
+pytestmark = pytest.mark.anyio
+
+
+def plans(*rents, bedrooms='1'):
+    return [make_floor_plan(str(unit), rent if isinstance(rent, str) else f"${rent:,}", bedrooms=bedrooms)
+            for unit, rent in enumerate(rents, start=1)]
+
+
+async def ingest_run(db_ops, *listings):
+    """A whole ingest run, which ends with the analytics refresh."""
+    await db_ops.bulk_save_scraped_data_to_db(list(listings))
+
+
+async def ingest_batch(db_ops, *listings):
+    """One batch without the end-of-run refresh."""
+    async with db_ops.async_session_maker() as session:
+        await db_ops.save_batch_bulk(session, list(listings))
+
+
+def test_percentile_matches_percentile_cont():
+    assert percentile([1, 2, 3, 4], 0.5) == statistics.median([1, 2, 3, 4])
+    assert percentile([10, 20, 30, 40, 50, 60, 70, 80, 90, 100], 0.9) == pytest.approx(91.0)
+    assert percentile([5], 0.9) == 5
+
+
+def test_top_k_keeps_the_best_keys_and_breaks_ties_on_the_second_part():
+    top = TopK(k=3)
+    for floor_plan_id, rent in enumerate([300, 100, 200, 100, 50, 400], start=1):
+        top.push((rent, floor_plan_id), {'id': floor_plan_id})
+    assert [row['id'] for row in top.ranked()] == [5, 2, 4]
+
+
+async def test_top_routes_read_the_refreshed_rankings(db, api):
+    await ingest_run(db, make_listing('a', floor_plans=plans(2500, 1500)),
+                     make_listing('b', floor_plans=plans(1500, 4000, 900)))
+
+    cheapest = (await api.get('/top/3/most-affordable-properties')).json()
+    assert [(row['property_id'], row['base_rent']) for row in cheapest] == [(2, 900.0), (1, 1500.0), (2, 1500.0)]
+    expensive = (await api.get('/top/2/most-expensive-properties')).json()
+    assert [row['base_rent'] for row in expensive] == [4000.0, 2500.0]
+
+
+async def test_top_size_is_bounded(db, api):
+    assert (await api.get('/top/0/most-affordable-properties')).status_code == 422
+    assert (await api.get('/top/101/most-expensive-properties')).status_code == 422
+
+
+async def test_top_is_served_live_until_the_first_refresh(db, api):
+    await ingest_batch(db, make_listing('a', floor_plans=plans(2500, 1500, 'Call for Rent')))
+    cheapest = (await api.get('/top/5/most-affordable-properties')).json()
+    assert [row['base_rent'] for row in cheapest] == [1500.0, 2500.0]
+
+
+async def test_a_refresh_replaces_the_previous_summary(db, api):
+    await ingest_run(db, make_listing('a', floor_plans=plans(900, 2000)))
+    await ingest_run(db, make_listing('a', floor_plans=plans(1800, 2000)))
+    cheapest = (await api.get('/top/5/most-affordable-properties')).json()
+    assert [row['base_rent'] for row in cheapest] == [1800.0, 2000.0]
+
+
+async def test_city_summary_per_bedroom_count(db, api):
+    await ingest_run(db, make_listing('a', city='Boston', floor_plans=plans(1000, 2000, 3000) + plans(4000, bedrooms='2')),
+                     make_listing('b', city=' boston ', floor_plans=plans(5000, bedrooms='N/A')),
+                     make_listing('c', city='Cambridge', floor_plans=plans(9000)))
+
+    response = await api.get('/analytics/city/BOSTON')
+    assert response.status_code == 200
+    rents = {row['bedrooms']: row for row in response.json()['rents']}
+    assert list(rents) == [1, 2, None]
+    assert (rents[1]['floor_plans'], rents[1]['min_rent'], rents[1]['median_rent'], rents[1]['max_rent']) == (
+        3, 1000.0, 2000.0, 3000.0)
+    assert rents[1]['p90_rent'] == pytest.approx(2800.0)
+    assert rents[None]['floor_plans'] == 1
+
+    assert (await api.get('/analytics/city/Somerville')).status_code == 404
+
+
+async def test_city_top_only_ranks_that_city(db, api):
+    await ingest_run(db, make_listing('a', city='Boston', floor_plans=plans(3000, 1000)),
+                     make_listing('b', city='Cambridge', floor_plans=plans(500)))
+    response = await api.get('/analytics/city/boston/top', params={'ranking': 'most_expensive', 'limit': 5})
+    assert [row['base_rent'] for row in response.json()] == [3000.0, 1000.0]
+
+
+async def test_summaries_do_not_depend_on_the_stream_chunk_size(db, monkeypatch):
+    import analytics
+
+    await ingest_batch(db, *(make_listing(f"p{i}", city=city, floor_plans=plans(1000 + i, 2000 + i, bedrooms=str(i % 3)))
+                             for i, city in enumerate(['Boston', 'Cambridge', 'Quincy'] * 4)))
+    async with db.async_session_maker() as session:
+        whole = await analytics.build_analytics(session)
+    monkeypatch.setattr(analytics, 'REFRESH_YIELD_PER', 3)
+    async with db.async_session_maker() as session:
+        chunked = await analytics.build_analytics(session)
+
+    def without_time(rows):
+        return [{key: value for key, value in row.items() if key != 'refreshed_at'} for row in rows]
+
+    assert without_time(chunked[0]) == without_time(whole[0])
+    assert chunked[1] == whole[1]
+
+
+async def test_a_failed_refresh_keeps_the_previous_summary(db, api, monkeypatch):
+    import analytics
+
+    await ingest_run(db, make_listing('a', floor_plans=plans(1500)))
+
+    async def fail(session):
+        raise RuntimeError("refresh failed")
+
+    monkeypatch.setattr(analytics, 'build_analytics', fail)
+    await ingest_run(db, make_listing('b', floor_plans=plans(900)))
+    cheapest = (await api.get('/top/5/most-affordable-properties')).json()
+    assert [row['base_rent'] for row in cheapest] == [1500.0]
@@ -0,0 +1,82 @@
+import pytest
+from sqlmodel import select
+
+from conftest import make_listing, make_floor_plan
+
+pytestmark = pytest.mark.anyio
+
+
+async def upsert(db_ops, batch):
+    async with db_ops.async_session_maker() as session:
+        counts = await db_ops.bulk_upsert_batch(session, batch)
+        await session.commit()
+    return counts
+
+
+async def properties(db_ops):
+    from dbmodels import Property
+
+    async with db_ops.async_session_maker() as session:
+        return (await session.exec(select(Property).order_by(Property.property_link))).all()
+
+
+async def test_counts_inserts_and_updates(db):
+    first = await upsert(db, [make_listing('a'), make_listing('b')])
+    assert (first['inserted'], first['updated']) == (2, 0)
+
+    second = await upsert(db, [make_listing('b', title='Renamed'), make_listing('c')])
+    assert (second['inserted'], second['updated']) == (1, 1)
+    assert [p.title for p in await properties(db)] == ['Property a', 'Renamed', 'Property c']
+
+
+async def test_update_keeps_the_property_id(db):
+    await upsert(db, [make_listing('a', city='Boston')])
+    [before] = await properties(db)
+    await upsert(db, [make_listing('a', city='Cambridge')])
+    [after] = await properties(db)
+    assert (after.id, after.city) == (before.id, 'Cambridge')
+
+
+async def test_duplicate_links_in_a_batch_keep_the_last_copy(db):
+    counts = await upsert(db, [make_listing('a', title='First'), make_listing('a', title='Second')])
+    assert (counts['inserted'], counts['updated'], len(counts['saved'])) == (1, 0, 1)
+    assert [p.title for p in await properties(db)] == ['Second']
+
+
+async def test_listings_without_a_link_are_skipped(db):
+    counts = await upsert(db, [make_listing('a'), make_listing('x', property_link=None)])
+    assert counts['inserted'] == 1
+    assert len(await properties(db)) == 1
+
+
+async def test_floor_plans_are_written_with_the_property(db):
+    from dbmodels import Pricing_and_floor_plans
+
+    await upsert(db, [make_listing('a', floor_plans=[make_floor_plan('101', '$2,150'), make_floor_plan('102')])])
+    async with db.async_session_maker() as session:
+        rents = (await session.exec(
+            select(Pricing_and_floor_plans.unit, Pricing_and_floor_plans.base_rent)
+            .order_by(Pricing_and_floor_plans.unit))).all()
+    assert rents == [('101', 2150.0), ('102', 2000.0)]
+
+
+async def test_unsupported_dialect_raises_value_error(db, monkeypatch):
+    monkeypatch.setattr(db, 'DIALECT_INSERTS', {})
+    async with db.async_session_maker() as session:
+        with pytest.raises(ValueError, match=db.engine.dialect.name):
+            await db.bulk_upsert_batch(session, [make_listing('a')])
+
+
+async def test_unsupported_dialect_falls_back_to_the_orm_path(db, monkeypatch):
+    monkeypatch.setattr(db, 'DIALECT_INSERTS', {})
+    async with db.async_session_maker() as session:
+        counts = await db.save_batch_bulk(session, [make_listing('a'), make_listing('b')])
+    assert len(counts['saved']) == 2
+    assert len(await properties(db)) == 2
+
+
+@pytest.mark.postgresql
+async def test_xmax_tells_inserts_from_updates_in_one_statement(db):
+    await upsert(db, [make_listing(str(i)) for i in range(0, 50, 2)])
+    counts = await upsert(db, [make_listing(str(i)) for i in range(50)])
+    assert (counts['inserted'], counts['updated']) == (25, 25)
@@ -0,0 +1,120 @@
+import pytest
+from sqlmodel import select
+
+from conftest import make_listing, make_floor_plan
+
+pytestmark = pytest.mark.anyio
+
+
+async def save(db_ops, *listings):
+    async with db_ops.async_session_maker() as session:
+        counts = await db_ops.save_batch_bulk(session, list(listings))
+    return counts['floor_plans']
+
+
+async def stored_floor_plans(db_ops):
+    from dbmodels import Pricing_and_floor_plans
+
+    async with db_ops.async_session_maker() as session:
+        rows = (await session.exec(select(Pricing_and_floor_plans).order_by(Pricing_and_floor_plans.id))).all()
+    return [(row.id, row.unit, row.base_rent) for row in rows]
+
+
+async def rent_history(db_ops):
+    from dbmodels import Rent_observation
+
+    async with db_ops.async_session_maker() as session:
+        rows = (await session.exec(
+            select(Rent_observation).order_by(Rent_observation.unit_key, Rent_observation.observed_at))).all()
+    return [(row.unit_key, row.previous_rent, row.base_rent) for row in rows]
+
+
+async def test_unchanged_listing_writes_nothing(db):
+    listing = make_listing('a', floor_plans=[make_floor_plan('101'), make_floor_plan('102')])
+    await save(db, listing)
+    before = await stored_floor_plans(db)
+
+    counts = await save(db, listing)
+    assert (counts['unchanged'], counts['inserted'], counts['updated'], counts['deleted']) == (2, 0, 0, 0)
+    assert await stored_floor_plans(db) == before
+
+
+async def test_changed_rent_updates_the_row_in_place_and_records_history(db):
+    await save(db, make_listing('a', floor_plans=[make_floor_plan('101', '$2,000')]))
+    [(floor_plan_id, _, _)] = await stored_floor_plans(db)
+
+    counts = await save(db, make_listing('a', floor_plans=[make_floor_plan('101', '$2,100')]))
+    assert (counts['updated'], counts['rent_observations']) == (1, 1)
+    assert await stored_floor_plans(db) == [(floor_plan_id, '101', 2100.0)]
+    assert await rent_history(db) == [('unit:101:0', None, 2000.0), ('unit:101:0', 2000.0, 2100.0)]
+
+
+async def test_vanished_units_are_deleted_and_new_ones_inserted(db):
+    await save(db, make_listing('a', floor_plans=[make_floor_plan('101'), make_floor_plan('102')]))
+    [(kept_id, _, _), _] = await stored_floor_plans(db)
+
+    counts = await save(db, make_listing('a', floor_plans=[make_floor_plan('101'), make_floor_plan('103')]))
+    assert (counts['unchanged'], counts['inserted'], counts['deleted']) == (1, 1, 1)
+    stored = await stored_floor_plans(db)
+    assert [unit for _, unit, _ in stored] == ['101', '103']
+    assert stored[0][0] == kept_id
+
+
+async def test_repeated_units_are_matched_by_occurrence(db):
+    listing = make_listing('a', floor_plans=[make_floor_plan('101', '$2,000'), make_floor_plan('101', '$2,500')])
+    await save(db, listing)
+    counts = await save(db, listing)
+    assert (counts['unchanged'], counts['inserted'], counts['deleted']) == (2, 0, 0)
+    assert [rent for _, _, rent in await stored_floor_plans(db)] == [2000.0, 2500.0]
+
+
+async def test_units_without_a_number_are_matched_by_details_link(db):
+    await save(db, make_listing('a', floor_plans=[make_floor_plan(None, '$1,900', details_link='key1')]))
+    [(floor_plan_id, _, _)] = await stored_floor_plans(db)
+
+    counts = await save(db, make_listing('a', floor_plans=[make_floor_plan(None, '$1,950', details_link='key1')]))
+    assert counts['updated'] == 1
+    assert await stored_floor_plans(db) == [(floor_plan_id, None, 1950.0)]
+
+
+async def test_units_without_a_number_or_link_keep_their_row_when_the_rent_changes(db):
+    studio = {'apartment_name': 'Studio', 'sqft': '450'}
+    await save(db, make_listing('a', floor_plans=[make_floor_plan(None, '$1,900', availability='Soon', **studio),
+                                                  make_floor_plan(None, '$1,900', availability='Soon', **studio)]))
+    before = await stored_floor_plans(db)
+
+    counts = await save(db, make_listing('a', floor_plans=[
+        make_floor_plan(None, '$1,900', **studio), make_floor_plan(None, '$2,050', **studio)]))
+    assert (counts['updated'], counts['inserted'], counts['deleted']) == (2, 0, 0)
+    assert await stored_floor_plans(db) == [(before[0][0], None, 1900.0), (before[1][0], None, 2050.0)]
+    history = await rent_history(db)
+    assert len({unit_key for unit_key, _, _ in history}) == 2
+    assert (1900.0, 2050.0) in [(previous, rent) for _, previous, rent in history]
+
+
+async def test_call_for_rent_is_not_recorded_as_a_rent_change(db):
+    await save(db, make_listing('a', floor_plans=[make_floor_plan('101', 'Call for Rent')]))
+    assert await rent_history(db) == []
+    assert [rent for _, _, rent in await stored_floor_plans(db)] == [None]
+
+
+async def test_a_bad_listing_is_rolled_back_without_losing_the_batch(db):
+    await save(db, make_listing('a', floor_plans=[make_floor_plan('101')]))
+    before = await stored_floor_plans(db)
+
+    # title is NOT NULL: the set-based batch fails and is retried property by property
+    broken = make_listing('b', title=None, floor_plans=[make_floor_plan('201')])
+    counts = await save(db, broken, make_listing('c', floor_plans=[make_floor_plan('301')]))
+    assert counts['inserted'] == 1
+    assert [unit for _, unit, _ in await stored_floor_plans(db)] == [unit for _, unit, _ in before] + ['301']
+
+
+async def test_replace_mode_rewrites_every_floor_plan(db, monkeypatch):
+    monkeypatch.setattr(db, 'FLOOR_PLAN_RECONCILE', False)
+    listing = make_listing('a', floor_plans=[make_floor_plan('101')])
+    await save(db, listing)
+
+    counts = await save(db, listing)
+    assert (counts['deleted'], counts['inserted']) == (1, 1)
+    assert len(await stored_floor_plans(db)) == 1
+    assert await rent_history(db) == []
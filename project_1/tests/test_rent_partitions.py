@@ -0,0 +1,119 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from dbmodels import rent_partition_months
+
+pytestmark = pytest.mark.anyio
+
+MONTH = date(2031, 5, 1)
+
+
+class LockNotAvailable(Exception):
+    sqlstate = '55P03'
+
+
+def test_partition_months_roll_over_the_year():
+    assert rent_partition_months(date(2030, 12, 17)) == [date(2030, 12, 1), date(2031, 1, 1)]
+    assert rent_partition_months(date(2031, 5, 31), months_ahead=2) == [MONTH, date(2031, 6, 1), date(2031, 7, 1)]
+
+
+async def test_month_is_only_recorded_after_the_partition_commits(db, monkeypatch):
+    monkeypatch.setattr(db, '_rent_partition_months', set())
+
+    def fail(connection, month):
+        raise RuntimeError("partition DDL failed")
+
+    monkeypatch.setattr(db, 'create_rent_observation_partition', fail)
+    with pytest.raises(RuntimeError):
+        await db.ensure_rent_partitions([MONTH])
+    assert MONTH not in db._rent_partition_months
+
+    monkeypatch.setattr(db, 'create_rent_observation_partition', lambda connection, month: None)
+    await db.ensure_rent_partitions([date(2031, 5, 20)])
+    assert MONTH in db._rent_partition_months
+
+
+async def test_lock_timeouts_are_retried(db, monkeypatch):
+    monkeypatch.setattr(db, '_rent_partition_months', set())
+    calls = []
+
+    def locked_once(connection, month):
+        calls.append(month)
+        if len(calls) == 1:
+            raise OperationalError("CREATE TABLE ...", {}, LockNotAvailable())
+
+    monkeypatch.setattr(db, 'create_rent_observation_partition', locked_once)
+    await db.ensure_rent_partitions([MONTH])
+    assert calls == [MONTH, MONTH]
+    assert MONTH in db._rent_partition_months
+
+
+async def test_recording_observations_runs_no_ddl(db, monkeypatch):
+    def no_ddl(connection, month):
+        raise AssertionError("partition DDL inside the ingest transaction")
+
+    monkeypatch.setattr(db, '_rent_partition_months', set())
+    monkeypatch.setattr(db, 'create_rent_observation_partition', no_ddl)
+    async with db.async_session_maker() as session:
+        await session.exec(text(
+            "INSERT INTO property (id, title, property_link, address, listing_verification, timestamp) "
+            "VALUES (1, 't', 'https://example.com/a/', 'x', 'v', CURRENT_TIMESTAMP)"))
+        await db.record_rent_observations(session, [{
+            'property_id': 1, 'unit_key': 'unit:101:0', 'observed_at': datetime(2031, 5, 2), 'unit': '101',
+            'bedrooms': 1, 'city': 'Boston', 'base_rent': 2000.0, 'previous_rent': None}])
+        await session.commit()
+        assert (await session.exec(text("SELECT count(*) FROM rent_observation"))).scalar() == 1
+
+
+# --- PostgreSQL partitions ---
+async def partition_of(db_ops, observed_at: datetime) -> str:
+    async with db_ops.engine.connect() as connection:
+        return (await connection.execute(text(
+            "SELECT tableoid::regclass::text FROM rent_observation WHERE observed_at = :observed_at"),
+            {'observed_at': observed_at})).scalar()
+
+
+async def insert_observation(db_ops, observed_at: datetime):
+    async with db_ops.engine.begin() as connection:
+        await connection.execute(text(
+            "INSERT INTO property (id, title, property_link, address, listing_verification, timestamp) "
+            "VALUES (1, 't', 'https://example.com/a/', 'x', 'v', now()) ON CONFLICT DO NOTHING"))
+        await connection.execute(text(
+            "INSERT INTO rent_observation (property_id, unit_key, observed_at, base_rent) "
+            "VALUES (1, 'unit:101:0', :observed_at, 2000)"), {'observed_at': observed_at})
+
+
+async def drop_partition(db_ops, month: date):
+    async with db_ops.engine.begin() as connection:
+        await connection.execute(text(f"DROP TABLE IF EXISTS rent_observation_{month:%Y_%m}"))
+
+
+@pytest.mark.postgresql
+async def test_rows_stranded_in_the_default_partition_move_into_the_new_month(db, monkeypatch):
+    monkeypatch.setattr(db, '_rent_partition_months', set())
+    await drop_partition(db, MONTH)
+    try:
+        await insert_observation(db, datetime(2031, 5, 2))
+        assert await partition_of(db, datetime(2031, 5, 2)) == 'rent_observation_default'
+
+        await db.ensure_rent_partitions([MONTH])
+        assert await partition_of(db, datetime(2031, 5, 2)) == 'rent_observation_2031_05'
+    finally:
+        await drop_partition(db, MONTH)
+
+
+@pytest.mark.postgresql
+async def test_concurrent_workers_create_a_partition_once(db, monkeypatch):
+    import asyncio
+
+    monkeypatch.setattr(db, '_rent_partition_months', set())
+    await drop_partition(db, MONTH)
+    try:
+        await asyncio.gather(*(db.ensure_rent_partitions([MONTH]) for _ in range(4)))
+        await insert_observation(db, datetime(2031, 5, 2))
+        assert await partition_of(db, datetime(2031, 5, 2)) == 'rent_observation_2031_05'
+    finally:
+        await drop_partition(db, MONTH)
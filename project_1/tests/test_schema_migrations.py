@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, text
+
+import schema_migrations
+from schema_migrations import Migration, apply_migrations
+
+pytestmark = pytest.mark.anyio
+
+MIGRATIONS = [
+    Migration('0001_table', {'*': ["CREATE TABLE listing (id INTEGER PRIMARY KEY, city VARCHAR)"]}),
+    # Stands in for CREATE EXTENSION on a role without CREATE on the database
+    Migration('0002_refused', {'*': ["CREATE INDEX ix_listing_city ON listing (city)",
+                                     "CREATE INDEX ix_missing ON missing_table (x)"]}, optional=True),
+    Migration('0003_index', {'*': ["CREATE INDEX ix_listing_id_city ON listing (id, city)"]}),
+]
+
+
+@pytest.fixture
+def connection(monkeypatch):
+    monkeypatch.setattr(schema_migrations, 'MIGRATIONS', MIGRATIONS)
+    engine = create_engine('sqlite://')
+    with engine.connect() as connection:
+        yield connection
+    engine.dispose()
+
+
+def index_names(connection) -> set:
+    return set(connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars())
+
+
+def test_a_refused_optional_migration_is_skipped_and_retried(connection):
+    with connection.begin():
+        assert apply_migrations(connection) == ['0001_table', '0003_index']
+    # The refused migration's first statement was rolled back with its savepoint
+    assert 'ix_listing_city' not in index_names(connection)
+    assert 'ix_listing_id_city' in index_names(connection)
+
+    connection.execute(text("CREATE TABLE missing_table (x INTEGER)"))
+    connection.commit()
+    with connection.begin():
+        assert apply_migrations(connection) == ['0002_refused']
+    assert {'ix_listing_city', 'ix_missing'} <= index_names(connection)
+
+
+def test_a_required_migration_still_fails_startup(connection, monkeypatch):
+    monkeypatch.setattr(schema_migrations, 'MIGRATIONS', MIGRATIONS + [
+        Migration('0004_broken', {'*': ["CREATE INDEX ix_broken ON missing_table (y)"]})])
+    with pytest.raises(Exception):
+        with connection.begin():
+            apply_migrations(connection)
+
+
+@pytest.mark.postgresql
+async def test_processes_starting_together_apply_each_migration_once(db):
+    async with db.engine.begin() as connection:
+        await connection.execute(text("DELETE FROM schema_migration WHERE name = '0001_property_link_unique'"))
+    await asyncio.gather(*(db.create_db_and_tables() for _ in range(4)))
+    async with db.engine.connect() as connection:
+        assert (await connection.execute(text(
+            "SELECT count(*) FROM schema_migration WHERE name = '0001_property_link_unique'"))).scalar() == 1
@@ -0,0 +1,77 @@
+from contextlib import asynccontextmanager
+
+import pytest
+
+import apartment_scraper
+from bench_extraction import render_listing_html
+from html_extractor import extract_property_from_html
+
+pytestmark = pytest.mark.anyio
+
+URL = 'https://www.apartments.com/the-fixture-boston-ma/abc123/'
+LISTING = {
+    'title': 'The Fixture', 'street': '1 Main St', 'state': 'MA', 'zip_code': '02110',
+    'pricing_and_floor_plans': [{'apartment_name': 'A1', 'bedrooms': '1', 'bathrooms': '1', 'sqft': '700',
+                                 'unit': '101', 'base_rent': '$2,000', 'availability': 'Now', 'details_link': 'k1'}],
+}
+
+
+class CachedPage:
+    """A page whose document comes straight from the response cache."""
+
+    async def goto(self, url, **kwargs):
+        pass
+
+    async def wait_for_selector(self, selector, **kwargs):
+        pass
+
+    async def content(self):
+        return render_listing_html(LISTING)
+
+
+@pytest.fixture
+def delays(monkeypatch):
+    calls = []
+
+    async def record_delay(min_delay=1, max_delay=5):
+        calls.append((min_delay, max_delay))
+
+    async def parse_on_loop(html, url):
+        return extract_property_from_html(html, url)
+
+    monkeypatch.setattr(apartment_scraper, 'add_random_delay', record_delay)
+    monkeypatch.setattr(apartment_scraper, 'EXTRACTION_BACKEND', 'html')
+    monkeypatch.setattr(apartment_scraper, 'extract_html_off_loop', parse_on_loop)
+    return calls
+
+
+@asynccontextmanager
+async def cached_page():
+    yield CachedPage()
+
+
+async def test_replay_of_a_cached_page_does_not_sleep(delays):
+    scheduler = apartment_scraper.detail_scheduler(replay=True)
+    result = await apartment_scraper.scrape_with_scheduler(scheduler, cached_page, URL)
+    assert result['validation_status'] == 'Success'
+    assert delays == []
+
+
+def test_replay_scheduler_runs_the_whole_pool_without_spacing():
+    controller = apartment_scraper.detail_scheduler(replay=True).controller_for(URL)
+    assert controller.bounds is apartment_scraper.REPLAY_HOST_BOUNDS
+    assert controller.block_cooldown == 0
+
+
+async def test_a_live_page_is_still_paced(delays):
+    result = await apartment_scraper.scrape_apartment_page(CachedPage(), URL)
+    assert result['validation_status'] == 'Success'
+    assert delays == [(2, 7)]
+
+
+async def test_adaptive_scheduling_replaces_the_fixed_sleeps(delays):
+    scheduler = apartment_scraper.detail_scheduler()
+    assert scheduler.controller_for(URL).bounds is apartment_scraper.HOST_BOUNDS['www.apartments.com']
+    result = await apartment_scraper.scrape_with_scheduler(scheduler, cached_page, URL)
+    assert result['validation_status'] == 'Success'
+    assert delays == []
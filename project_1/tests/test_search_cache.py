@@ -0,0 +1,109 @@
+import pytest
+from sqlalchemy import text
+
+from conftest import make_listing, make_floor_plan
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def fresh_versions(monkeypatch):
+    """Re-read the listings data version on every search instead of once a second."""
+    import db_app
+
+    monkeypatch.setattr(db_app, 'SEARCH_VERSION_TTL_SECONDS', 0)
+
+
+async def ingest(db_ops, *listings):
+    async with db_ops.async_session_maker() as session:
+        return await db_ops.save_batch_bulk(session, list(listings))
+
+
+async def search(api, **params):
+    response = await api.get('/properties/search', params=params)
+    assert response.status_code == 200
+    return [row['id'] for row in response.json()], response.headers['x-cache']
+
+
+async def test_city_contains_is_the_default_and_prefix_exact_opt_in(db, api):
+    await ingest(db, make_listing('a', city='Los Angeles'), make_listing('b', city='Angeles Oaks'))
+    assert (await search(api, city='angeles'))[0] == [1, 2]
+    assert (await search(api, city='Angeles', city_match='prefix'))[0] == [2]
+    assert (await search(api, city='angeles oaks', city_match='exact'))[0] == [2]
+
+
+async def test_like_wildcards_in_the_city_are_literal(db, api):
+    await ingest(db, make_listing('a', city='Boston'))
+    assert (await search(api, city='B%n'))[0] == []
+    assert (await search(api, city='_oston'))[0] == []
+
+
+async def test_floor_plan_filters_must_hold_for_the_same_floor_plan(db, api):
+    await ingest(db, make_listing('a', floor_plans=[make_floor_plan('1', '$4,000', bedrooms='2'),
+                                                    make_floor_plan('2', '$2,000', bedrooms='1')]),
+                 make_listing('b', floor_plans=[make_floor_plan('1', '$2,900', bedrooms='2')]))
+    assert (await search(api, min_bedrooms=2, max_base_rent=3000))[0] == [2]
+    assert (await search(api, min_bedrooms=2))[0] == [1, 2]
+
+
+async def test_rent_sort_uses_the_cheapest_matching_plan_with_ties_on_id(db, api):
+    await ingest(db, make_listing('a', floor_plans=[make_floor_plan('1', '$3,000')]),
+                 make_listing('b', floor_plans=[make_floor_plan('1', '$2,000'), make_floor_plan('2', '$5,000')]),
+                 make_listing('c', floor_plans=[make_floor_plan('1', '$2,000')]),
+                 make_listing('d', floor_plans=[make_floor_plan('1', 'Call for Rent')]))
+    assert (await search(api, sort='rent'))[0] == [2, 3, 1, 4]
+    assert (await search(api, sort='rent', limit=2, offset=1))[0] == [3, 1]
+
+
+async def test_results_are_cached_until_the_next_ingest_commit(db, api, fresh_versions):
+    await ingest(db, make_listing('a', city='Boston'))
+    assert await search(api, city='boston') == ([1], 'miss')
+    assert await search(api, city=' Boston ') == ([1], 'hit')
+
+    await ingest(db, make_listing('b', city='Boston'))
+    assert await search(api, city='boston') == ([1, 2], 'miss')
+    assert await search(api, city='boston') == ([1, 2], 'hit')
+
+
+async def test_a_batch_that_saves_nothing_keeps_the_cache(db, api, fresh_versions):
+    await ingest(db, make_listing('a', city='Boston'))
+    await search(api, city='boston')
+
+    async with db.async_session_maker() as session:
+        assert await db.save_batch_to_db(session, [make_listing('b', property_link=None)]) == []
+    assert await search(api, city='boston') == ([1], 'hit')
+
+
+async def test_a_rolled_back_write_does_not_bump_the_version(db):
+    async with db.async_session_maker() as session:
+        version = (await session.exec(text("SELECT version FROM data_version WHERE name = 'listings'"))).scalar()
+        await session.exec(text(db.BUMP_DATA_VERSION_SQL))
+        await session.rollback()
+        assert (await session.exec(
+            text("SELECT version FROM data_version WHERE name = 'listings'"))).scalar() == version
+
+
+async def test_without_a_version_row_nothing_is_cached(db, api, fresh_versions):
+    await ingest(db, make_listing('a', city='Boston'))
+    async with db.engine.begin() as connection:
+        await connection.execute(text("DELETE FROM data_version WHERE name = 'listings'"))
+    try:
+        assert (await search(api, city='boston'))[1] == 'miss'
+        assert (await search(api, city='boston'))[1] == 'miss'
+    finally:
+        async with db.engine.begin() as connection:
+            await connection.execute(text(
+                "INSERT INTO data_version (name, version, updated_at) VALUES ('listings', 0, CURRENT_TIMESTAMP)"))
+
+
+def test_cache_evicts_the_least_recently_used_entry():
+    from db_app import SearchCache
+
+    cache = SearchCache(max_entries=2)
+    cache.put(('a',), 1, ['a'])
+    cache.put(('b',), 1, ['b'])
+    assert cache.get(('a',), 1) == ['a']
+    cache.put(('c',), 1, ['c'])
+    assert cache.get(('b',), 1) is None
+    assert cache.get(('a',), 1) == ['a']
+    assert cache.get(('a',), 2) is None
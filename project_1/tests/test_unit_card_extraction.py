@@ -0,0 +1,45 @@
+import os
+
+import pytest
+
+import apartment_scraper
+from bench_extraction import load_corpus
+from scraper_selectors import empty_property_record
+
+pytestmark = pytest.mark.anyio
+
+DUMP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'apartments_data.json')
+
+
+@pytest.fixture(scope='module')
+def corpus():
+    # Detail pages rendered from a saved scrape, the same fixtures bench_extraction.py benchmarks
+    return load_corpus([DUMP_PATH])[:15]
+
+
+@pytest.fixture
+async def page():
+    from playwright.async_api import Error as PlaywrightError, async_playwright
+
+    async with async_playwright() as p:
+        try:
+            browser = await p.firefox.launch(headless=True)
+        except PlaywrightError as e:
+            pytest.skip(f"Firefox for Playwright is not installed: {e.message.splitlines()[0]}")
+        yield await browser.new_page()
+        await browser.close()
+
+
+async def extract(page, url: str, page_html: str) -> dict:
+    await page.set_content(page_html, wait_until='domcontentloaded')
+    return await apartment_scraper.extract_with_locators(page, url, empty_property_record(url))
+
+
+async def test_single_evaluate_matches_the_locator_path(page, corpus, monkeypatch):
+    for url, page_html in corpus:
+        monkeypatch.setattr(apartment_scraper, 'USE_BULK_UNIT_EXTRACTION', False)
+        per_field = await extract(page, url, page_html)
+        monkeypatch.setattr(apartment_scraper, 'USE_BULK_UNIT_EXTRACTION', True)
+        bulk = await extract(page, url, page_html)
+        assert per_field['pricing_and_floor_plans'], url
+        assert bulk == per_field, url